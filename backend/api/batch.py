@@ -0,0 +1,153 @@
+"""
+Batch Execution Module
+This module runs many submissions through the job queue with a bounded per-batch
+concurrency and yields each item's result as soon as it finishes.
+"""
+
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import logging
+
+from backend.api.jobs import Job, JobStatus, QueueFullError
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BatchValidationError(ValueError):
+    """Raised when a batch request is malformed"""
+    pass
+
+
+@dataclass
+class BatchItem:
+    """Data class to hold one submission of a batch"""
+    item_id: Any
+    index: int
+    language: Optional[str]
+    code: str
+    stdin: Optional[str] = None
+    timeout: Optional[float] = None  # Seconds; None for the execution profile's default
+    profile: Optional[str] = None  # Execution profile name; None for the default
+    files: Optional[Dict[str, str]] = None  # Extra files next to the code, by relative path
+
+
+def parse_batch_items(data: Dict, max_items: int) -> List[BatchItem]:
+    """
+    Validate a batch request body
+
+    Args:
+        data (Dict): Request JSON with an "items" list of {id, language, code, stdin, timeout, profile, files}
+        max_items (int): Maximum number of items accepted in one batch
+
+    Returns:
+        List[BatchItem]: The parsed items; items without an id are numbered by position
+
+    Raises:
+        BatchValidationError: If the body or an item is invalid
+    """
+    items = (data or {}).get('items')
+    if not isinstance(items, list) or not items:
+        raise BatchValidationError("Request must contain a non-empty 'items' list")
+    if len(items) > max_items:
+        raise BatchValidationError(f"Too many items ({len(items)}); the limit is {max_items}")
+
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('code'), str):
+            raise BatchValidationError(f"Item {index} has no code")
+        timeout = item.get('timeout')
+        if timeout is not None:
+            try:
+                timeout = float(timeout)
+            except (TypeError, ValueError, OverflowError):
+                timeout = math.nan
+            if isinstance(item['timeout'], bool) or not (math.isfinite(timeout) and timeout > 0):
+                raise BatchValidationError(f"Item {index} has an invalid timeout; it must be a positive number")
+        parsed.append(BatchItem(
+            item_id=item.get('id', index),
+            index=index,
+            language=item.get('language'),
+            code=item['code'],
+            stdin=item.get('stdin'),
+            timeout=timeout,
+            profile=item.get('profile'),
+            files=item.get('files')
+        ))
+    return parsed
+
+
+def run_batch(items: List[BatchItem], concurrency: int,
+              submit: Callable[[BatchItem], Job]) -> Iterator[Dict]:
+    """
+    Execute batch items with at most `concurrency` in flight and yield results as they finish
+
+    Each item is queued on the shared job manager, so the per-language worker limits
+    still apply on top of the batch's own concurrency.
+
+    Args:
+        items (List[BatchItem]): Items to run
+        concurrency (int): Maximum items of this batch queued or running at once
+        submit (Callable): Queues one item and returns its Job
+
+    Yields:
+        Dict: One record per item in completion order, then a final {"summary": ...} record
+    """
+    start_time = time.time()
+
+    def run_item(item: BatchItem) -> Dict:
+        record = {'id': item.item_id, 'index': item.index, 'language': item.language}
+        item_start = time.time()
+        try:
+            job = submit(item)
+        except (QueueFullError, ValueError) as e:
+            record.update({'status': JobStatus.FAILED, 'error': str(e), 'result': None})
+            record['timing'] = {'queue_wait': 0.0, 'run_time': 0.0,
+                                'total_time': time.time() - item_start}
+            return record
+        job.wait()
+        record.update({
+            'language': job.language,
+            'status': job.status,
+            'result': job.result,
+            'error': job.error,
+            'timing': {
+                'queue_wait': job.wait_time,
+                'run_time': job.run_time,
+                'total_time': time.time() - item_start,
+            },
+        })
+        return record
+
+    completed = failed = 0
+    total_run_time = 0.0
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch")
+    try:
+        futures = [executor.submit(run_item, item) for item in items]
+        for future in as_completed(futures):
+            record = future.result()
+            if record['status'] == JobStatus.COMPLETED:
+                completed += 1
+            else:
+                failed += 1
+            total_run_time += record['timing']['run_time']
+            yield record
+    finally:
+        # A client that disconnects mid-batch cancels the items not yet queued
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    wall_time = time.time() - start_time
+    yield {'summary': {
+        'items': len(items),
+        'completed': completed,
+        'failed': failed,
+        'concurrency': concurrency,
+        'wall_time': wall_time,
+        'throughput': (len(items) / wall_time) if wall_time > 0 else 0.0,  # Items per second
+        'total_run_time': total_run_time,
+        'avg_run_time': (total_run_time / len(items)) if items else 0.0,
+    }}
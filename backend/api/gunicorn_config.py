@@ -0,0 +1,62 @@
+"""
+Gunicorn Configuration
+Production serving settings for backend.api.wsgi:application, read from environment
+variables: worker processes and threads, timeouts and the graceful drain on shutdown.
+
+Sizing (from backend/cli/web_benchmark.py; see the numbers in RAILWAY_DEPLOY.md): requests
+spend nearly all their time waiting on sandboxes, so one process with many threads keeps
+up with the sandbox concurrency, and extra processes add throughput only once the web tier
+itself is CPU-bound. Every worker process has its own job queue, warm pools, rate limiter,
+coalescing table and in-memory result cache, so with N workers:
+  - up to N x EDURUN_MAX_CONCURRENT sandboxes run at once; lower it per worker to compensate
+  - a client's rate limit is enforced per worker, so it can get up to N times the configured rate
+  - /api/jobs/<id> only finds jobs queued on the same worker; route such clients stickily
+  - set EDURUN_CACHE_SQLITE_PATH so the workers share cached results
+"""
+
+import os
+import multiprocessing
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Threads wait on sandbox runs and hold open /api/stream responses, so keep plenty per process
+workers = int(os.environ.get('EDURUN_WEB_WORKERS', 1))
+worker_class = "gthread"
+threads = int(os.environ.get('EDURUN_WEB_THREADS', 64))
+
+# Compilers, Docker clients and pool threads must be created after the fork, in each worker
+preload_app = False
+
+# gthread workers heartbeat from their main thread, so long runs and streams do not trip this
+timeout = int(os.environ.get('EDURUN_WEB_TIMEOUT', 120))
+keepalive = 5
+
+# On SIGTERM a worker stops accepting connections, finishes in-flight requests, then drains the
+# queued jobs in worker_exit; it is killed if both take longer than graceful_timeout
+DRAIN_TIMEOUT = float(os.environ.get('EDURUN_DRAIN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('EDURUN_WEB_GRACEFUL_TIMEOUT', 2 * DRAIN_TIMEOUT + 10))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get('EDURUN_WEB_LOG_LEVEL', 'info')
+
+# Recycle workers now and then to bound slow leaks; jitter keeps them from restarting together
+max_requests = int(os.environ.get('EDURUN_WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+
+def worker_exit(server, worker):
+    """Drain the worker's queued jobs and release its warm containers before it exits"""
+    from backend.api.web_interface import shutdown_compilers
+    shutdown_compilers(DRAIN_TIMEOUT)
+
+
+def when_ready(server):
+    """Log the serving layout once the master is up"""
+    logger.info(f"Serving with {workers} worker(s) x {threads} threads on {bind} "
+                f"({multiprocessing.cpu_count()} CPUs)")
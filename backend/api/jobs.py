@@ -0,0 +1,552 @@
+"""
+Asynchronous Job Queue Module
+This module provides a bounded worker pool that executes compile jobs off the request
+thread under per-language and global concurrency caps with weighted fair sharing between
+languages and deficit-round-robin fair queuing between clients, and tracks queue depth,
+wait time and run time.
+"""
+
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from backend.compilers.metrics import registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUEUE_WAIT_SECONDS = registry.histogram(
+    'edurun_queue_wait_seconds', 'Time jobs spent queued before a worker started them', ['language']
+)
+JOB_RUN_SECONDS = registry.histogram(
+    'edurun_job_run_seconds', 'Time jobs spent executing on a worker', ['language']
+)
+JOBS_TOTAL = registry.counter(
+    'edurun_jobs_total', 'Finished jobs by status: completed, failed or expired', ['language', 'status']
+)
+JOB_REJECTIONS_TOTAL = registry.counter(
+    'edurun_job_rejections_total', 'Jobs refused at admission by HTTP status code', ['language', 'status_code']
+)
+
+
+class JobStatus:
+    """Job lifecycle states"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    EXPIRED = "expired"  # Waited longer than the manager's max_wait and was never run
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is not admitted
+
+    status_code is 429 when only the requested language is saturated (other languages are
+    still served) and 503 when the whole service is; retry_after is a hint in seconds.
+    """
+
+    def __init__(self, message: str, retry_after: int = 1, status_code: int = 503):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+@dataclass
+class Job:
+    """Data class to hold a queued compile job and its outcome"""
+    job_id: str
+    language: str
+    task: Callable[[], Any] = field(repr=False)
+    client: str = "anonymous"  # Identity the job is fair-queued under
+    cost: float = 1.0  # Service units charged against the client's deficit-round-robin quantum
+    status: str = JobStatus.QUEUED
+    result: Any = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def wait_time(self) -> float:
+        """Seconds spent in the queue before a worker picked the job up"""
+        end = self.started_at if self.started_at is not None else time.time()
+        return end - self.submitted_at
+
+    @property
+    def run_time(self) -> float:
+        """Seconds spent executing"""
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return end - self.started_at
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the job finishes
+
+        Args:
+            timeout (float): Maximum seconds to wait, or None to wait forever
+
+        Returns:
+            bool: True if the job finished
+        """
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict:
+        """Convert the job to a JSON-serializable dictionary"""
+        return {
+            'job_id': self.job_id,
+            'language': self.language,
+            'status': self.status,
+            'result': self.result if self.status == JobStatus.COMPLETED else None,
+            'error': self.error,
+            'wait_time': self.wait_time,
+            'run_time': self.run_time,
+        }
+
+
+class FairQueue:
+    """
+    Per-client FIFO queues served by deficit round robin
+
+    Each time a client reaches the head of the round it is credited one quantum and may
+    dequeue jobs while its credit covers their cost, so a client with a hundred queued
+    runs gets the same share as one with a single run queued behind it.
+    """
+
+    def __init__(self, quantum: float = 1.0):
+        self.quantum = quantum
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()  # Active clients in round order
+        self._deficit: Dict[str, float] = {}
+        self._current: Optional[str] = None  # Client at the head that has had its quantum
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def queued_for(self, client: str) -> int:
+        """Number of queued jobs of one client"""
+        return len(self._queues.get(client, ()))
+
+    @property
+    def clients(self) -> int:
+        """Number of clients with queued jobs"""
+        return len(self._queues)
+
+    def ahead_of(self, client: str) -> int:
+        """Approximate number of jobs served before a new job of `client`, assuming unit costs"""
+        position = self.queued_for(client) + 1
+        return sum(min(len(pending), position) for pending in self._queues.values())
+
+    def append(self, job: Job):
+        """Queue a job behind the earlier jobs of the same client"""
+        if job.client not in self._queues:
+            self._queues[job.client] = deque()
+            self._deficit[job.client] = 0.0
+        self._queues[job.client].append(job)
+        self._size += 1
+
+    def _remove_client(self, client: str):
+        """Drop an emptied client; it starts with no credit when it returns"""
+        del self._queues[client]
+        del self._deficit[client]
+        if self._current == client:
+            self._current = None
+
+    def popleft(self) -> Job:
+        """
+        Dequeue the next job in deficit-round-robin order
+
+        Raises:
+            IndexError: If no job is queued
+        """
+        if not self._size:
+            raise IndexError("pop from an empty FairQueue")
+        while True:
+            client = next(iter(self._queues))
+            if self._current != client:
+                self._deficit[client] += self.quantum
+                self._current = client
+            pending = self._queues[client]
+            if pending[0].cost <= self._deficit[client]:
+                self._deficit[client] -= pending[0].cost
+                job = pending.popleft()
+                self._size -= 1
+                if not pending:
+                    self._remove_client(client)
+                return job
+            # Credit exhausted; keep the remainder for the client's next turn
+            self._queues.move_to_end(client)
+            self._current = None
+
+    def pop_expired(self, max_wait: float) -> List[Job]:
+        """Remove and return jobs that have waited longer than max_wait seconds"""
+        expired = []
+        for client, pending in list(self._queues.items()):
+            while pending and pending[0].wait_time > max_wait:
+                expired.append(pending.popleft())
+            if not pending:
+                self._remove_client(client)
+        self._size -= len(expired)
+        return expired
+
+
+@dataclass
+class LanguageQueueStats:
+    """Data class to hold per-language queue counters"""
+    submitted: int = 0
+    rejected: int = 0
+    completed: int = 0
+    failed: int = 0
+    expired: int = 0
+    running: int = 0
+    total_wait_time: float = 0.0
+    max_wait_time: float = 0.0
+    total_run_time: float = 0.0
+    max_run_time: float = 0.0
+
+
+class JobManager:
+    """
+    Runs compile jobs on a shared worker pool with per-language and global concurrency caps
+
+    Queued jobs wait in per-language queues. A free worker takes the next job from the
+    eligible language (one below its own cap) with the lowest weighted virtual time, so a
+    flood of one language gets at most its weighted share while other languages have work.
+    Within a language, jobs are fair-queued per client (see FairQueue).
+    """
+
+    def __init__(self,
+                 workers: Optional[Dict[str, int]] = None,
+                 default_workers: int = 2,
+                 max_queue_size: int = 100,
+                 result_ttl: float = 600.0,
+                 max_concurrent: Optional[int] = None,
+                 max_queued: Optional[int] = None,
+                 max_wait: Optional[float] = None,
+                 weights: Optional[Dict[str, float]] = None,
+                 max_client_queued: Optional[int] = None):
+        """
+        Initialize the job manager
+
+        Args:
+            workers (Dict[str, int]): Maximum concurrently running jobs per language
+            default_workers (int): Concurrency cap for languages not in `workers`
+            max_queue_size (int): Maximum queued (not yet running) jobs per language
+            result_ttl (float): Seconds finished jobs stay retrievable
+            max_concurrent (int): Maximum running jobs across all languages
+                (default: the sum of the per-language caps)
+            max_queued (int): Maximum queued jobs across all languages, or None
+            max_wait (float): Seconds a job may wait before it expires unrun, or None
+            weights (Dict[str, float]): Fair-share weight per language (default 1.0)
+            max_client_queued (int): Maximum queued jobs of one client per language, or None
+
+        Raises:
+            ValueError: If max_wait is not a positive number of seconds
+        """
+        if max_wait is not None and not max_wait > 0:  # Also rejects NaN
+            raise ValueError(f"max_wait must be a positive number of seconds or None, got {max_wait}")
+        self.workers = dict(workers or {})
+        self.default_workers = default_workers
+        self.max_queue_size = max_queue_size
+        self.result_ttl = result_ttl
+        self.max_concurrent = max_concurrent or max(sum(self.workers.values()), default_workers)
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.weights = dict(weights or {})
+        self.max_client_queued = max_client_queued
+        self._pending: Dict[str, FairQueue] = {}
+        self._stats: Dict[str, LanguageQueueStats] = {}
+        self._vtime: Dict[str, float] = {}  # Weighted count of jobs started per language
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Condition()
+        self._closed = False
+
+    def _limit(self, language: str) -> int:
+        """Concurrency cap of a language"""
+        return self.workers.get(language, self.default_workers)
+
+    def _ensure_workers(self):
+        """Start the shared worker threads (and the expiry thread) on first use"""
+        if self._threads:
+            return
+        for i in range(self.max_concurrent):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.max_wait is not None:
+            threading.Thread(target=self._expiry_loop, name="job-expiry", daemon=True).start()
+        logger.info(f"Started {self.max_concurrent} job workers")
+
+    def _ensure_language(self, language: str):
+        """Create the queue, counters and virtual clock for a language on first use"""
+        if language not in self._pending:
+            self._pending[language] = FairQueue()
+            self._stats[language] = LanguageQueueStats()
+            self._vtime[language] = 0.0
+
+    def _expire(self, job: Job):
+        """Fail a job that waited too long (caller holds the lock)"""
+        job.status = JobStatus.EXPIRED
+        job.error = f"Waited more than {self.max_wait:g} seconds in the queue; try again later"
+        job.finished_at = time.time()
+        self._stats[job.language].expired += 1
+        JOBS_TOTAL.inc(language=job.language, status=JobStatus.EXPIRED)
+        job._done.set()
+
+    def _expire_waiting(self):
+        """Expire queued jobs past max_wait (caller holds the lock)"""
+        for pending in self._pending.values():
+            for job in pending.pop_expired(self.max_wait):
+                self._expire(job)
+
+    def _next_job(self) -> Optional[Job]:
+        """Pick the next job by weighted fair share and mark it running (caller holds the lock)"""
+        if self.max_wait is not None:
+            self._expire_waiting()
+        eligible = [
+            language for language, pending in self._pending.items()
+            if pending and self._stats[language].running < self._limit(language)
+        ]
+        if not eligible:
+            return None
+        language = min(eligible, key=lambda name: self._vtime[name])
+        job = self._pending[language].popleft()
+        self._vtime[language] += 1.0 / self.weights.get(language, 1.0)
+
+        job.started_at = time.time()
+        job.status = JobStatus.RUNNING
+        stats = self._stats[language]
+        stats.running += 1
+        stats.total_wait_time += job.wait_time
+        stats.max_wait_time = max(stats.max_wait_time, job.wait_time)
+        QUEUE_WAIT_SECONDS.observe(job.wait_time, language=language)
+        return job
+
+    def _worker_loop(self):
+        """Execute jobs until shutdown, once every queue is drained"""
+        while True:
+            with self._lock:
+                job = self._next_job()
+                while job is None:
+                    if self._closed and not any(self._pending.values()):
+                        return
+                    self._lock.wait()
+                    job = self._next_job()
+            self._run_job(job)
+
+    def _expiry_loop(self):
+        """Expire waiting jobs even while every worker is busy"""
+        interval = max(0.05, min(1.0, self.max_wait / 4))  # Never a busy loop, however short max_wait
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                if self._closed and not any(self._pending.values()):
+                    return
+                self._expire_waiting()
+
+    def _run_job(self, job: Job):
+        """Execute one job and record its timings"""
+        try:
+            job.result = job.task()
+            job.status = JobStatus.COMPLETED
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {e}")
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                stats = self._stats[job.language]
+                stats.running -= 1
+                stats.total_run_time += job.run_time
+                stats.max_run_time = max(stats.max_run_time, job.run_time)
+                if job.status == JobStatus.COMPLETED:
+                    stats.completed += 1
+                else:
+                    stats.failed += 1
+                JOB_RUN_SECONDS.observe(job.run_time, language=job.language)
+                JOBS_TOTAL.inc(language=job.language, status=job.status)
+                # A freed slot may make another language's job eligible
+                self._lock.notify_all()
+            job._done.set()
+
+    def _prune_finished(self):
+        """Forget finished jobs older than result_ttl (caller holds the lock)"""
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _projected_wait(self, language: str, client: Optional[str] = None) -> float:
+        """Estimate how long a new job of a language (and client) would wait (caller holds the lock)"""
+        stats = self._stats[language]
+        finished = stats.completed + stats.failed
+        if not finished:
+            return 0.0
+        pending = self._pending[language]
+        ahead = pending.ahead_of(client) if client else len(pending)
+        slots = min(self._limit(language), self.max_concurrent)
+        return ahead * (stats.total_run_time / finished) / slots
+
+    def _retry_after(self, language: str, client: Optional[str] = None) -> int:
+        """Seconds a rejected client should wait before retrying (caller holds the lock)"""
+        return max(1, min(60, math.ceil(self._projected_wait(language, client))))
+
+    def _reject(self, language: str, message: str, status_code: int, client: Optional[str] = None):
+        """Count and raise a rejection (caller holds the lock)"""
+        self._stats[language].rejected += 1
+        JOB_REJECTIONS_TOTAL.inc(language=language, status_code=status_code)
+        raise QueueFullError(message, retry_after=self._retry_after(language, client),
+                             status_code=status_code)
+
+    def submit(self, language: str, task: Callable[[], Any],
+               client: Optional[str] = None, cost: float = 1.0) -> Job:
+        """
+        Queue a task for execution under the language's concurrency cap
+
+        Args:
+            language (str): Language key selecting the queue, cap and weight
+            task (Callable): Zero-argument callable producing the job result
+            client (str): Identity the job is fair-queued under (IP, session or API key)
+            cost (float): Service units the job is charged, e.g. more for long judging runs
+
+        Returns:
+            Job: The queued job
+
+        Raises:
+            QueueFullError: If the language, client or global queue is full, or the
+                projected wait exceeds max_wait
+        """
+        job = Job(job_id=uuid.uuid4().hex, language=language, task=task,
+                  client=client or "anonymous", cost=max(cost, 0.01))
+        with self._lock:
+            if self._closed:
+                raise QueueFullError("Job manager is shutting down", retry_after=5)
+            self._ensure_workers()
+            self._ensure_language(language)
+            self._prune_finished()
+
+            pending = self._pending[language]
+            if len(pending) >= self.max_queue_size:
+                self._reject(language, f"Too many queued {language} jobs ({self.max_queue_size}); "
+                                       f"try again later", 429)
+            if self.max_client_queued is not None and \
+                    pending.queued_for(job.client) >= self.max_client_queued:
+                self._reject(language, f"You already have {self.max_client_queued} queued {language} "
+                                       f"jobs; wait for them to finish", 429, job.client)
+            queued = sum(len(q) for q in self._pending.values())
+            if self.max_queued is not None and queued >= self.max_queued:
+                self._reject(language, f"Server is busy ({queued} jobs queued); try again later", 503)
+            if self.max_wait is not None and \
+                    self._projected_wait(language, job.client) > self.max_wait:
+                self._reject(language, f"Estimated wait for {language} exceeds {self.max_wait:g} "
+                                       f"seconds; try again later", 429, job.client)
+
+            if not pending and not self._stats[language].running:
+                # A language returning from idle starts level with the active ones instead
+                # of spending credit banked while it had no work
+                active = [self._vtime[name] for name, q in self._pending.items()
+                          if q or self._stats[name].running]
+                if active:
+                    self._vtime[language] = max(self._vtime[language], min(active))
+
+            pending.append(job)
+            self._stats[language].submitted += 1
+            self._jobs[job.job_id] = job
+            self._lock.notify_all()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job by id"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_stats(self) -> Dict:
+        """Get queue depth, wait time and run time statistics per language"""
+        result = {}
+        with self._lock:
+            for language, stats in self._stats.items():
+                finished = stats.completed + stats.failed
+                started = finished + stats.running
+                result[language] = {
+                    'limit': self._limit(language),
+                    'weight': self.weights.get(language, 1.0),
+                    'queue_depth': len(self._pending[language]),
+                    'clients': self._pending[language].clients,
+                    'running': stats.running,
+                    'submitted': stats.submitted,
+                    'rejected': stats.rejected,
+                    'expired': stats.expired,
+                    'completed': stats.completed,
+                    'failed': stats.failed,
+                    'avg_wait_time': (stats.total_wait_time / started) if started else 0.0,
+                    'max_wait_time': stats.max_wait_time,
+                    'avg_run_time': (stats.total_run_time / finished) if finished else 0.0,
+                    'max_run_time': stats.max_run_time,
+                }
+        return result
+
+    def get_load(self) -> Dict:
+        """Get current in-flight and queued counts, overall and per language"""
+        with self._lock:
+            languages = {
+                language: {
+                    'running': self._stats[language].running,
+                    'queued': len(pending),
+                    'clients': pending.clients,
+                    'limit': self._limit(language),
+                }
+                for language, pending in self._pending.items()
+            }
+        return {
+            'running': sum(entry['running'] for entry in languages.values()),
+            'queued': sum(entry['queued'] for entry in languages.values()),
+            'limit': self.max_concurrent,
+            'max_queued': self.max_queued,
+            'max_wait': self.max_wait,
+            'languages': languages,
+        }
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Stop accepting jobs and stop the workers once queued jobs are drained
+
+        Args:
+            wait (bool): If True, block until all workers have exited
+            timeout (float): Most seconds to wait for the drain, or None to wait indefinitely
+
+        Returns:
+            bool: True if every worker has exited
+        """
+        with self._lock:
+            self._closed = True
+            threads = list(self._threads)
+            self._lock.notify_all()
+        if wait:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for thread in threads:
+                thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in threads)
+
+    def in_flight(self) -> int:
+        """Get the number of jobs queued or running"""
+        with self._lock:
+            return sum(len(queue) for queue in self._pending.values()) + \
+                sum(stats.running for stats in self._stats.values())
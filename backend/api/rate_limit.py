@@ -0,0 +1,178 @@
+"""
+Per-Client Rate Limiting Module
+This module keeps a token bucket per client and limit rule so that one client re-running
+code in a loop is throttled with 429 responses instead of crowding out everyone else.
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+import logging
+
+from backend.api.jobs import QueueFullError
+from backend.compilers.metrics import registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED_TOTAL = registry.counter(
+    'edurun_rate_limited_total', 'Requests refused by a per-client rate limit rule', ['rule']
+)
+
+
+class RateLimitedError(QueueFullError):
+    """Raised when a client has used up its request budget for an endpoint"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message, retry_after=retry_after, status_code=429)
+
+
+@dataclass
+class RateLimit:
+    """Data class to hold one token-bucket rule"""
+    rate: float  # Tokens added per second
+    burst: float  # Bucket capacity, i.e. requests allowed back to back
+
+
+@dataclass
+class TokenBucket:
+    """Data class to hold the state of one client's bucket"""
+    tokens: float
+    updated: float = field(default_factory=time.monotonic)
+
+
+def parse_rate_limits(spec: str) -> Dict[str, RateLimit]:
+    """
+    Parse a rule list such as "compile=2/10,compile:cpp=0.5/4,judge=0.2/3,default=5/20"
+
+    Each rule is <key>=<rate per second>/<burst>; keys are "endpoint:language",
+    "endpoint", "language" or "default".
+
+    Args:
+        spec (str): Comma-separated rules
+
+    Returns:
+        Dict[str, RateLimit]: Rules by key
+
+    Raises:
+        ValueError: If a rule is malformed
+    """
+    limits = {}
+    for rule in spec.split(','):
+        rule = rule.strip()
+        if not rule:
+            continue
+        try:
+            key, value = rule.split('=', 1)
+            rate, burst = value.split('/', 1)
+            limits[key.strip()] = RateLimit(rate=float(rate), burst=float(burst))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit rule '{rule}'; expected key=rate/burst")
+    return limits
+
+
+class RateLimiter:
+    """
+    Thread-safe token buckets keyed by client and the rule that applies to a request
+
+    A request for an endpoint and language uses the most specific rule found among
+    "endpoint:language", "endpoint", "language" and "default"; requests that match the
+    same rule share one bucket per client.
+    """
+
+    def __init__(self, limits: Dict[str, RateLimit], idle_ttl: float = 600.0):
+        """
+        Initialize the rate limiter
+
+        Args:
+            limits (Dict[str, RateLimit]): Rules by key (see parse_rate_limits)
+            idle_ttl (float): Seconds an untouched bucket is kept before it is forgotten
+        """
+        self.limits = dict(limits)
+        self.idle_ttl = idle_ttl
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._allowed: Dict[str, int] = {}
+        self._limited: Dict[str, int] = {}
+        self._last_prune = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _find_rule(self, endpoint: str, language: Optional[str]) -> Tuple[Optional[str], Optional[RateLimit]]:
+        """Return the key and rule for a request, or (None, None) if it is unlimited"""
+        keys = [f"{endpoint}:{language}", endpoint, language] if language else [endpoint]
+        for key in keys + ['default']:
+            if key in self.limits:
+                return key, self.limits[key]
+        return None, None
+
+    def _prune(self, now: float):
+        """Forget buckets untouched for idle_ttl; they would have refilled anyway (caller holds the lock)"""
+        if now - self._last_prune < self.idle_ttl:
+            return
+        self._last_prune = now
+        stale = [key for key, bucket in self._buckets.items() if now - bucket.updated > self.idle_ttl]
+        for key in stale:
+            del self._buckets[key]
+
+    def check(self, client: str, endpoint: str, language: Optional[str] = None, cost: float = 1.0,
+              scale: float = 1.0):
+        """
+        Take `cost` tokens from the client's bucket for a request
+
+        Args:
+            client (str): Client identity (IP, session or API key)
+            endpoint (str): Endpoint name, e.g. "compile", "stream", "judge" or "batch"
+            language (str): Language key, or None for language-independent requests
+            cost (float): Tokens the request consumes
+            scale (float): Multiplier on the rule's rate and burst, for buckets shared by many
+                clients (e.g. everyone behind one address)
+
+        Raises:
+            RateLimitedError: If the bucket does not hold enough tokens
+        """
+        key, rule = self._find_rule(endpoint, language)
+        if rule is None:
+            return
+        rule = RateLimit(rate=rule.rate * scale, burst=rule.burst * scale)
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            bucket = self._buckets.get((client, key))
+            if bucket is None:
+                bucket = self._buckets[(client, key)] = TokenBucket(tokens=rule.burst, updated=now)
+            bucket.tokens = min(rule.burst, bucket.tokens + (now - bucket.updated) * rule.rate)
+            bucket.updated = now
+
+            cost = min(cost, rule.burst)  # A request larger than the bucket waits for a full one
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+                self._allowed[key] = self._allowed.get(key, 0) + 1
+                return
+            self._limited[key] = self._limited.get(key, 0) + 1
+            retry_after = math.ceil((cost - bucket.tokens) / rule.rate) if rule.rate > 0 else 60
+
+        RATE_LIMITED_TOTAL.inc(rule=key)
+        logger.info(f"Rate limited client {client} on {key}")
+        raise RateLimitedError(
+            f"Rate limit exceeded for {endpoint}: {rule.burst:g} requests then {rule.rate:g} per "
+            f"second; try again in {retry_after} seconds",
+            retry_after=max(1, retry_after)
+        )
+
+    def get_stats(self) -> Dict:
+        """Get the configured rules with allowed/limited counts and the number of tracked clients"""
+        with self._lock:
+            return {
+                'clients': len({client for client, _ in self._buckets}),
+                'rules': {
+                    key: {
+                        'rate': rule.rate,
+                        'burst': rule.burst,
+                        'allowed': self._allowed.get(key, 0),
+                        'limited': self._limited.get(key, 0),
+                    }
+                    for key, rule in self.limits.items()
+                },
+            }
@@ -0,0 +1,82 @@
+"""
+Single-Flight Submission Module
+This module coalesces concurrent identical submissions onto one queued job, so that a
+lecture hall submitting the same starter code at once triggers a single sandbox run.
+"""
+
+import threading
+from typing import Callable, Dict, Tuple
+import logging
+
+from backend.api.jobs import Job
+from backend.compilers.metrics import registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUBMISSIONS_TOTAL = registry.counter(
+    'edurun_submissions_total',
+    'Deduplicated submissions by result: leader (queued a run) or coalesced (joined one in flight)',
+    ['result']
+)
+
+
+class SingleFlight:
+    """
+    Tracks queued or running jobs by content key and hands later identical submissions
+    the job already in flight instead of queuing another one
+
+    Finished jobs are forgotten immediately; repeats after that are the result cache's job.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, Job] = {}
+        self._leaders = 0  # Submissions that queued a job
+        self._coalesced = 0  # Submissions that joined a job already in flight
+        self._lock = threading.Lock()
+
+    def _forget_finished(self):
+        """Drop entries whose job has finished (caller holds the lock)"""
+        for key in [key for key, job in self._in_flight.items() if job.done]:
+            del self._in_flight[key]
+
+    def submit(self, key: str, submit: Callable[[], Job]) -> Tuple[Job, bool]:
+        """
+        Join the in-flight job for `key`, or queue a new one
+
+        Args:
+            key (str): Content hash of everything that determines the result
+            submit (Callable): Queues the job; only called when none is in flight
+
+        Returns:
+            tuple: (job, coalesced); coalesced is True if the job was already in flight
+
+        Raises:
+            QueueFullError: Propagated from `submit`
+        """
+        with self._lock:
+            self._forget_finished()
+            job = self._in_flight.get(key)
+            if job is not None:
+                self._coalesced += 1
+                SUBMISSIONS_TOTAL.inc(result="coalesced")
+                return job, True
+            # Queuing is non-blocking, so holding the lock keeps two racing leaders from both running
+            job = submit()
+            self._in_flight[key] = job
+            self._leaders += 1
+            SUBMISSIONS_TOTAL.inc(result="leader")
+            return job, False
+
+    def get_stats(self) -> Dict:
+        """Get leader/coalesced counts and the number of jobs currently in flight"""
+        with self._lock:
+            self._forget_finished()
+            total = self._leaders + self._coalesced
+            return {
+                'leaders': self._leaders,
+                'coalesced': self._coalesced,
+                'coalesce_ratio': (self._coalesced / total) if total else 0.0,
+                'in_flight': len(self._in_flight),
+            }
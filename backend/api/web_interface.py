@@ -3,17 +3,57 @@ Unified Web Interface for Python, C++ and JavaScript Docker Compiler
 Provides both API endpoints and serves the React frontend
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Response, g, render_template, request, jsonify, send_from_directory, session, stream_with_context
 from flask_cors import CORS
 from backend.compilers.python_compiler_module import PythonDockerCompiler, format_compiler_output, CompilerResult as PythonCompilerResult
 from backend.compilers.cpp_compiler_module import CppDockerCompiler, format_cpp_compiler_output, CompilerResult as CppCompilerResult
 from backend.compilers.js_compiler_module import JsDockerCompiler, format_js_compiler_output, CompilerResult as JsCompilerResult
+from backend.compilers.container_pool import PoolConfig
+from backend.compilers.result_cache import ResultCache, make_cache_key
+from backend.compilers.artifact_store import ArtifactStore
+from backend.compilers.cpp_toolchain import CppToolchainConfig
+from backend.compilers.log_capture import OutputLimits
+from backend.compilers.output_stream import StreamEvent
+from backend.compilers.judge import TestCase
+from backend.compilers.execution_backend import LocalBackend, LocalSandboxConfig, SHM_DIR
+from backend.compilers.docker_client import DockerClientManager, DockerClientConfig
+from backend.compilers.image_manager import parse_image_pins
+from backend.compilers.sandbox_reaper import SandboxReaper, ReaperConfig
+from backend.compilers.execution_profiles import ProfileSet, UnknownProfileError, DEFAULT_PROFILE, parse_profile_overrides
+from backend.compilers.submission_files import SubmissionFileError, normalize_submission_files
+from backend.compilers.metrics import registry as metrics_registry
+from backend.compilers.resource_usage import usage_distributions
+from backend.api.jobs import JobManager, JobStatus, QueueFullError
+from backend.api.batch import BatchItem, BatchValidationError, parse_batch_items, run_batch
+from backend.api.rate_limit import RateLimiter, parse_rate_limits
+from backend.api.single_flight import SingleFlight
+import atexit
+import hashlib
 import json
 import logging
+import math
 import os
+import queue
+import secrets
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-here'
+# Signs the session cookie that identifies clients for rate limiting; a known key lets anyone forge ids
+app.config['SECRET_KEY'] = os.environ.get('EDURUN_SECRET_KEY')
+if not app.config['SECRET_KEY']:
+    app.config['SECRET_KEY'] = secrets.token_hex(32)
+    logger.warning("EDURUN_SECRET_KEY is not set; using a random key, so sessions end on restart "
+                   "and are not shared between workers")
 
 # Enable CORS for frontend integration (production URLs)
 CORS(app, origins=[
@@ -25,10 +65,6 @@ CORS(app, origins=[
     "https://*.vercel.app"    # If frontend deployed separately
 ])
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
 # Global compiler instances
 python_compiler = None
 cpp_compiler = None
@@ -38,37 +74,476 @@ js_compiler = None
 # Frontend configuration
 FRONTEND_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'edurun-ai-code-buddy-76', 'dist')
 
-def init_compilers():
-    """Initialize Python, C++ and JavaScript Docker compilers"""
-    global python_compiler, cpp_compiler, js_compiler
+# Warm container pool configuration (set EDURUN_POOL_ENABLED=0 to use cold containers)
+POOL_ENABLED = os.environ.get('EDURUN_POOL_ENABLED', '1') != '0'
+
+def get_pool_config() -> PoolConfig:
+    """Build the warm container pool configuration from environment variables"""
+    return PoolConfig(
+        min_size=int(os.environ.get('EDURUN_POOL_MIN_SIZE', 1)),
+        max_size=int(os.environ.get('EDURUN_POOL_MAX_SIZE', 4)),
+        idle_ttl=float(os.environ.get('EDURUN_POOL_IDLE_TTL', 300)),
+        max_runs=int(os.environ.get('EDURUN_POOL_MAX_RUNS', 50)),
+        max_lifetime=float(os.environ.get('EDURUN_POOL_MAX_LIFETIME', 3600)),
+        acquire_timeout=float(os.environ.get('EDURUN_POOL_ACQUIRE_TIMEOUT', 10)),
+        health_check_interval=float(os.environ.get('EDURUN_POOL_HEALTH_INTERVAL', 30))
+    )
+
+def create_result_cache():
+    """Build the shared result cache from environment variables (EDURUN_CACHE_ENABLED=0 disables it)"""
+    if os.environ.get('EDURUN_CACHE_ENABLED', '1') == '0':
+        return None
+    return ResultCache(
+        max_entries=int(os.environ.get('EDURUN_CACHE_MAX_ENTRIES', 1000)),
+        max_bytes=int(os.environ.get('EDURUN_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        ttl=float(os.environ.get('EDURUN_CACHE_TTL', 3600)),
+        sqlite_path=os.environ.get('EDURUN_CACHE_SQLITE_PATH') or None
+    )
+
+# Content-addressed cache of deterministic run results, shared by all compilers
+result_cache = create_result_cache()
+
+def create_artifact_store():
+    """Build the C++ compiled-binary store from environment variables (EDURUN_ARTIFACTS_ENABLED=0 disables it)"""
+    if os.environ.get('EDURUN_ARTIFACTS_ENABLED', '1') == '0':
+        return None
+    return ArtifactStore(
+        root_dir=os.environ.get('EDURUN_ARTIFACT_DIR') or None,
+        max_bytes=int(os.environ.get('EDURUN_ARTIFACT_MAX_BYTES', 256 * 1024 * 1024))
+    )
+
+def get_toolchain_config():
+    """Build the C++ precompiled header / ccache configuration from environment variables"""
+    config = CppToolchainConfig(
+        pch_enabled=os.environ.get('EDURUN_CPP_PCH', '1') != '0',
+        ccache_enabled=os.environ.get('EDURUN_CPP_CCACHE', '0') == '1'
+    )
+    if os.environ.get('EDURUN_CPP_PCH_HEADERS'):
+        config.pch_headers = [h.strip() for h in os.environ['EDURUN_CPP_PCH_HEADERS'].split(',') if h.strip()]
+    if not config.pch_enabled and not config.ccache_enabled:
+        return None
+    return config
+
+def get_output_limits() -> Optional[OutputLimits]:
+    """
+    Build deployment-wide captured output limits from environment variables
     
-    success = True
+    Returns None unless EDURUN_OUTPUT_MAX_BYTES or EDURUN_OUTPUT_MAX_LINES is set, so each
+    run is held to its execution profile's output caps.
+    """
+    if 'EDURUN_OUTPUT_MAX_BYTES' not in os.environ and 'EDURUN_OUTPUT_MAX_LINES' not in os.environ:
+        return None
+    return OutputLimits(
+        max_bytes=int(os.environ.get('EDURUN_OUTPUT_MAX_BYTES', 1024 * 1024)),
+        max_lines=int(os.environ.get('EDURUN_OUTPUT_MAX_LINES', 10000))
+    )
+
+def create_profile_set() -> ProfileSet:
+    """Build the execution profiles from environment variables (EDURUN_PROFILES holds JSON overrides)"""
+    return ProfileSet(
+        overrides=parse_profile_overrides(os.environ.get('EDURUN_PROFILES', '')),
+        default_profile=os.environ.get('EDURUN_DEFAULT_PROFILE', DEFAULT_PROFILE)
+    )
+
+# Named resource limits ("quick", "standard", "heavy") requests choose with "profile"
+execution_profiles = create_profile_set()
+
+# Where submissions run: "docker" (default) or "local" host subprocesses for trusted grading hosts
+EXECUTION_BACKEND = os.environ.get('EDURUN_BACKEND', 'docker')
+
+def get_docker_client_config() -> DockerClientConfig:
+    """Build the shared Docker client's pool, retry and circuit breaker settings from environment variables"""
+    return DockerClientConfig(
+        pool_size=int(os.environ.get('EDURUN_DOCKER_POOL_SIZE', 32)),
+        timeout=int(os.environ.get('EDURUN_DOCKER_TIMEOUT', 60)),
+        retries=int(os.environ.get('EDURUN_DOCKER_RETRIES', 2)),
+        failure_threshold=int(os.environ.get('EDURUN_DOCKER_FAILURE_THRESHOLD', 5)),
+        reset_timeout=float(os.environ.get('EDURUN_DOCKER_RESET_TIMEOUT', 30)),
+        pull_missing_images=os.environ.get('EDURUN_IMAGE_PULL', '1') != '0',
+        image_pins=parse_image_pins(os.environ.get('EDURUN_IMAGE_PINS', '')),
+        image_index_ttl=float(os.environ.get('EDURUN_IMAGE_INDEX_TTL', 60))
+    )
+
+# One Docker client for all compilers; it connects when the first compiler starts, after any fork
+docker_clients = DockerClientManager(get_docker_client_config())
+
+def docker_available() -> bool:
+    """Tell whether runs are admitted: always on the local backend, otherwise unless the Docker circuit is open"""
+    return EXECUTION_BACKEND == 'local' or docker_clients.available()
+
+# Sandbox image per language; each is pulled if missing and pinned to its digest when its compiler starts
+LANGUAGE_IMAGES = {
+    'python': os.environ.get('EDURUN_IMAGE_PYTHON', 'python:3.9-slim'),
+    'cpp': os.environ.get('EDURUN_IMAGE_CPP', 'gcc:latest'),
+    'js': os.environ.get('EDURUN_IMAGE_JS', 'node:18-slim'),
+}
+
+def language_ready(language: str) -> bool:
+    """
+    Tell whether a language can be served without waiting for its image to be pulled
     
-    try:
-        python_compiler = PythonDockerCompiler()
-        logger.info("Python Docker compiler initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize Python compiler: {e}")
-        python_compiler = None
-        success = False
+    A language whose image is not local yet is refused rather than served from a user's
+    request; its compiler (and so the pull) is started in the background instead.
+    """
+    key = normalize_language(language)
+    if EXECUTION_BACKEND == 'local' or compiler_status[key] == 'running':
+        return True
+    if docker_clients.images.state(LANGUAGE_IMAGES[key]) == 'ready':
+        return True
+    if compiler_status[key] != 'starting':
+        threading.Thread(target=ensure_compiler, args=(key,), name=f'compiler-init-{key}', daemon=True).start()
+    return False
+
+def image_unavailable_message(language: str) -> str:
+    """Describe why a language is not served yet: its image is being pulled, or the pull failed"""
+    key = normalize_language(language)
+    image = LANGUAGE_IMAGES[key]
+    status = docker_clients.images.status(image) or {}
+    if status.get('state') == 'failed':
+        return f"The {COMPILER_NAMES[key]} sandbox image {image} could not be prepared: {status.get('error')}"
+    if status.get('state') == 'pulling':
+        progress = f" ({status['percent']:.0f}% downloaded)" if 'percent' in status else ""
+        return f"The {COMPILER_NAMES[key]} sandbox image {image} is being pulled{progress}; try again shortly"
+    return f"The {COMPILER_NAMES[key]} sandbox image {image} is being prepared; try again shortly"
+
+def image_unavailable_response(language: str):
+    """Build the 503 response for a language whose image is not local yet"""
+    key = normalize_language(language)
+    return jsonify({
+        'success': False,
+        'error': image_unavailable_message(language),
+        'image': docker_clients.images.status(LANGUAGE_IMAGES[key]),
+        'retry_after': 10
+    }), 503, {'Retry-After': '10'}
+
+def docker_unavailable_response():
+    """Build the 503 response for a run refused while the Docker daemon is failing"""
+    retry_after = max(1, round(docker_clients.breaker.retry_after()))
+    return jsonify({
+        'success': False,
+        'error': 'Code execution is temporarily unavailable: the Docker daemon is not responding',
+        'retry_after': retry_after
+    }), 503, {'Retry-After': str(retry_after)}
+
+def get_reaper_config() -> ReaperConfig:
+    """Build the leaked sandbox reaper settings from environment variables"""
+    max_age = float(os.environ.get('EDURUN_SANDBOX_MAX_AGE', 900))
+    scratch_dirs = [tempfile.gettempdir(), SHM_DIR]
+    if os.environ.get('EDURUN_LOCAL_SCRATCH_DIR'):
+        scratch_dirs.append(os.environ['EDURUN_LOCAL_SCRATCH_DIR'])
+    return ReaperConfig(
+        enabled=os.environ.get('EDURUN_REAPER_ENABLED', '1') != '0',
+        interval=float(os.environ.get('EDURUN_REAPER_INTERVAL', 60)),
+        max_age=max_age,
+        pool_max_age=get_pool_config().max_lifetime + max_age,  # A pooled container may start a run just before it expires
+        scratch_dirs=scratch_dirs
+    )
+
+# Removes sandboxes a crashed process left behind (at start-up) and any that leak later
+sandbox_reaper = SandboxReaper(get_reaper_config(), docker_clients if EXECUTION_BACKEND != 'local' else None)
+
+def get_local_sandbox_config() -> LocalSandboxConfig:
+    """Build the local subprocess sandbox limits from environment variables"""
+    memory_bytes = int(os.environ.get('EDURUN_LOCAL_MEMORY_BYTES', 1024 * 1024 * 1024))
+    max_processes = int(os.environ.get('EDURUN_LOCAL_MAX_PROCESSES', 0))
+    return LocalSandboxConfig(
+        memory_bytes=memory_bytes or None,
+        max_file_bytes=int(os.environ.get('EDURUN_LOCAL_MAX_FILE_BYTES', 64 * 1024 * 1024)),
+        max_processes=max_processes or None,
+        isolate_network=os.environ.get('EDURUN_LOCAL_ISOLATE_NETWORK', '1') != '0',
+        scratch_dir=os.environ.get('EDURUN_LOCAL_SCRATCH_DIR') or None
+    )
+
+def create_backend(language: str):
+    """Build the execution backend for a language, or None to let the compiler use Docker"""
+    if EXECUTION_BACKEND != 'local':
+        return None
+    tools = {
+        'python': {'python': os.environ.get('EDURUN_LOCAL_PYTHON', sys.executable)},
+        'cpp': {'g++': os.environ.get('EDURUN_LOCAL_GXX', 'g++')},
+        'js': {'node': os.environ.get('EDURUN_LOCAL_NODE', 'node')},
+    }
+    return LocalBackend(language, tools[language], get_local_sandbox_config())
+
+def get_worker_config() -> dict:
+    """Build the per-language concurrency caps from environment variables"""
+    return {
+        'python': int(os.environ.get('EDURUN_WORKERS_PYTHON', 4)),
+        'cpp': int(os.environ.get('EDURUN_WORKERS_CPP', 2)),
+        'js': int(os.environ.get('EDURUN_WORKERS_JS', 4))
+    }
+
+def get_weight_config() -> dict:
+    """Build the per-language fair-share weights from environment variables"""
+    return {
+        'python': float(os.environ.get('EDURUN_WEIGHT_PYTHON', 1)),
+        'cpp': float(os.environ.get('EDURUN_WEIGHT_CPP', 1)),
+        'js': float(os.environ.get('EDURUN_WEIGHT_JS', 1))
+    }
+
+# Streaming runs: cap on forwarded output bytes and on events buffered for a slow client
+STREAM_MAX_BYTES = int(os.environ.get('EDURUN_STREAM_MAX_BYTES', 1024 * 1024))
+STREAM_BUFFER_EVENTS = int(os.environ.get('EDURUN_STREAM_BUFFER_EVENTS', 64))
+
+# Batch runs: items accepted per request and the ceiling on per-batch concurrency
+BATCH_MAX_ITEMS = int(os.environ.get('EDURUN_BATCH_MAX_ITEMS', 500))
+BATCH_MAX_CONCURRENCY = int(os.environ.get('EDURUN_BATCH_MAX_CONCURRENCY', 8))
+
+# Judging runs: test cases accepted per request, per-case time limit ceiling and in-sandbox parallelism
+JUDGE_MAX_CASES = int(os.environ.get('EDURUN_JUDGE_MAX_CASES', 200))
+JUDGE_MAX_TIME_LIMIT = float(os.environ.get('EDURUN_JUDGE_MAX_TIME_LIMIT', 10))
+JUDGE_MIN_TIME_LIMIT = 0.1  # `timeout 0s` would disable the per-case limit altogether
+JUDGE_MAX_PARALLELISM = int(os.environ.get('EDURUN_JUDGE_MAX_PARALLELISM', 4))
+
+# Bounded worker pool that executes compile jobs off the request thread
+job_manager = JobManager(
+    workers=get_worker_config(),
+    max_queue_size=int(os.environ.get('EDURUN_JOB_QUEUE_SIZE', 100)),
+    result_ttl=float(os.environ.get('EDURUN_JOB_RESULT_TTL', 600)),
+    max_concurrent=int(os.environ.get('EDURUN_MAX_CONCURRENT', 8)),
+    max_queued=int(os.environ.get('EDURUN_JOB_MAX_QUEUED', 200)),
+    max_wait=float(os.environ.get('EDURUN_JOB_MAX_WAIT', 60)),
+    weights=get_weight_config(),
+    max_client_queued=int(os.environ.get('EDURUN_JOB_MAX_QUEUED_PER_CLIENT', 10))
+)
+
+# Per-client token buckets: key=rate/burst rules for "endpoint:language", "endpoint", "language" or "default"
+DEFAULT_RATE_LIMITS = "compile=1/10,compile:cpp=0.5/6,stream=1/10,judge=0.2/5,batch=0.05/2,default=2/20"
+
+def create_rate_limiter():
+    """Build the per-client rate limiter from environment variables (EDURUN_RATE_LIMIT_ENABLED=0 disables it)"""
+    if os.environ.get('EDURUN_RATE_LIMIT_ENABLED', '1') == '0':
+        return None
+    return RateLimiter(parse_rate_limits(os.environ.get('EDURUN_RATE_LIMITS', DEFAULT_RATE_LIMITS)))
+
+rate_limiter = create_rate_limiter()
+
+# Concurrent identical submissions share one run (EDURUN_COALESCE_ENABLED=0 disables it)
+single_flight = SingleFlight() if os.environ.get('EDURUN_COALESCE_ENABLED', '1') != '0' else None
+
+def submit_coalesced(key_parts: dict, coalesce: bool, submit):
+    """
+    Queue a job through single-flight deduplication unless the request opted out
     
-    try:
-        cpp_compiler = CppDockerCompiler()
-        logger.info("C++ Docker compiler initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize C++ compiler: {e}")
-        cpp_compiler = None
-        success = False
+    Returns:
+        tuple: (job, coalesced)
+    """
+    if not single_flight or not coalesce:
+        return submit(), False
+    return single_flight.submit(make_cache_key(**key_parts), submit)
+
+# Honour X-Forwarded-For only when running behind a trusted reverse proxy
+TRUST_PROXY = os.environ.get('EDURUN_TRUST_PROXY', '0') == '1'
+
+# API keys that get their own rate limit bucket (comma-separated); any other X-API-Key is ignored
+API_KEYS = {key.strip() for key in os.environ.get('EDURUN_API_KEYS', '').split(',') if key.strip()}
+
+# Every session and API key behind one address also shares an address-wide bucket this many times larger
+ADDRESS_RATE_SCALE = float(os.environ.get('EDURUN_RATE_LIMIT_ADDRESS_SCALE', 10))
+
+def client_address() -> str:
+    """Get the remote address of the current request (the proxy's client address if trusted)"""
+    address = request.remote_addr or 'unknown'
+    if TRUST_PROXY and request.headers.get('X-Forwarded-For'):
+        address = request.headers['X-Forwarded-For'].split(',')[0].strip()
+    return address
+
+def client_id() -> str:
+    """
+    Identify the client of the current request for rate limiting and fair queuing
     
-    try:
-        js_compiler = JsDockerCompiler()
-        logger.info("JavaScript Docker compiler initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize JavaScript compiler: {e}")
-        js_compiler = None
-        success = False
+    An allow-listed X-API-Key wins; otherwise a session id set by an earlier accepted
+    response, so that a classroom behind one NAT address is not treated as one client;
+    otherwise the remote address. Requests without the cookie are given one only if they are
+    accepted (see issue_client_session), so refused requests cannot mint fresh buckets.
+    """
+    api_key = request.headers.get('X-API-Key')
+    if api_key and api_key in API_KEYS:
+        return 'key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+    if 'client_id' in session:
+        return 'session:' + session['client_id']
+    g.issue_client_id = True
+    return 'ip:' + client_address()
+
+@app.after_request
+def issue_client_session(response):
+    """Give a cookieless client its session id once one of its submissions has been accepted"""
+    if g.get('issue_client_id') and response.status_code < 400:
+        session['client_id'] = uuid.uuid4().hex
+    return response
+
+def check_rate_limit(client: str, endpoint: str, language: str = None):
+    """
+    Charge one request to the client's bucket and to its address's shared bucket
+    
+    The address bucket caps what any number of sessions or keys from one address can run,
+    however many cookies a client collects.
+    
+    Raises:
+        RateLimitedError: If either bucket is empty
+    """
+    if rate_limiter:
+        address = 'ip:' + client_address()
+        if client != address:
+            rate_limiter.check('net:' + address, endpoint, language, scale=ADDRESS_RATE_SCALE)
+        rate_limiter.check(client, endpoint, language)
+
+# Compiler startup: "eager" builds every language in the background as soon as the app is
+# created, "lazy" builds each on its first request; either way requests wait for their own language only
+COMPILER_INIT = os.environ.get('EDURUN_COMPILER_INIT', 'eager')
+
+# Seconds before a compiler that failed to start is tried again by a request
+COMPILER_RETRY_INTERVAL = float(os.environ.get('EDURUN_COMPILER_RETRY_INTERVAL', 10))
+
+COMPILER_NAMES = {'python': 'Python', 'cpp': 'C++', 'js': 'JavaScript'}
+
+# Startup state per language: pending, starting, running or failed, and how long the last attempt took
+compiler_status = {language: 'pending' for language in COMPILER_NAMES}
+compiler_init_seconds = {language: None for language in COMPILER_NAMES}
+_compiler_locks = {language: threading.Lock() for language in COMPILER_NAMES}
+_compiler_failed_at = {}
+
+def create_compiler(language: str):
+    """Construct the compiler for 'python', 'cpp' or 'js'; blocks on the daemon, image and warm pool"""
+    if language == 'cpp':
+        return CppDockerCompiler(docker_image=LANGUAGE_IMAGES['cpp'],
+                                 use_pool=POOL_ENABLED, pool_config=get_pool_config(),
+                                 result_cache=result_cache,
+                                 artifact_store=create_artifact_store(),
+                                 toolchain_config=get_toolchain_config(),
+                                 output_limits=get_output_limits(),
+                                 backend=create_backend('cpp'),
+                                 profiles=execution_profiles,
+                                 docker_clients=docker_clients)
+    if language == 'js':
+        return JsDockerCompiler(docker_image=LANGUAGE_IMAGES['js'],
+                                use_pool=POOL_ENABLED, pool_config=get_pool_config(),
+                                result_cache=result_cache,
+                                output_limits=get_output_limits(),
+                                backend=create_backend('js'),
+                                profiles=execution_profiles,
+                                docker_clients=docker_clients)
+    return PythonDockerCompiler(docker_image=LANGUAGE_IMAGES['python'],
+                                use_pool=POOL_ENABLED, pool_config=get_pool_config(),
+                                result_cache=result_cache,
+                                output_limits=get_output_limits(),
+                                backend=create_backend('python'),
+                                profiles=execution_profiles,
+                                docker_clients=docker_clients)
+
+def ensure_compiler(language: str) -> bool:
+    """
+    Start a language's compiler unless it is running, waiting if another thread is starting it
+    
+    Args:
+        language (str): 'python', 'cpp' or 'js'
+    
+    Returns:
+        bool: True if the compiler is running
+    """
+    global python_compiler, cpp_compiler, js_compiler
+    with _compiler_locks[language]:
+        if compiler_status[language] == 'running':
+            return True
+        if time.monotonic() - _compiler_failed_at.get(language, float('-inf')) < COMPILER_RETRY_INTERVAL:
+            return False
+        compiler_status[language] = 'starting'
+        start = time.monotonic()
+        try:
+            compiler = create_compiler(language)
+        except Exception as e:
+            compiler_init_seconds[language] = round(time.monotonic() - start, 3)
+            logger.error(f"Failed to initialize {COMPILER_NAMES[language]} compiler: {e}")
+            compiler_status[language] = 'failed'
+            _compiler_failed_at[language] = time.monotonic()
+            return False
+        if _shut_down:
+            compiler.shutdown()  # Finished starting after the process began shutting down
+            return False
+        if language == 'cpp':
+            cpp_compiler = compiler
+        elif language == 'js':
+            js_compiler = compiler
+        else:
+            python_compiler = compiler
+        compiler_init_seconds[language] = round(time.monotonic() - start, 3)
+        compiler_status[language] = 'running'
+        logger.info(f"{COMPILER_NAMES[language]} Docker compiler initialized successfully "
+                    f"in {compiler_init_seconds[language]:.2f}s")
+        return True
+
+def init_compilers():
+    """Initialize the Python, C++ and JavaScript compilers concurrently"""
+    with ThreadPoolExecutor(max_workers=len(COMPILER_NAMES), thread_name_prefix='compiler-init') as pool:
+        return all(pool.map(ensure_compiler, COMPILER_NAMES))
+
+# Seconds shutdown waits for queued and running jobs before releasing the sandboxes
+DRAIN_TIMEOUT = float(os.environ.get('EDURUN_DRAIN_TIMEOUT', 30))
+
+# Set while this process drains before exiting; health answers 503 so load balancers stop routing here
+draining = threading.Event()
+_lifecycle_lock = threading.Lock()
+_initialized = False
+_shut_down = False
+
+def create_app() -> Flask:
+    """
+    Application factory for production WSGI servers (see backend/api/wsgi.py)
+    
+    Starts this process's compilers, Docker clients and warm pools once, however many times
+    it is called: in a background thread (EDURUN_COMPILER_INIT=eager), so health checks are
+    answered while images and pools warm up, or on each language's first request (lazy).
+    Also starts the sandbox reaper, whose first pass cleans up after a crashed predecessor.
+    Pre-fork servers must call it in each worker after the fork (gunicorn without --preload):
+    Docker connections and pool threads do not survive a fork.
     
-    return success
+    Returns:
+        Flask: The application
+    """
+    global _initialized
+    with _lifecycle_lock:
+        if not _initialized:
+            sandbox_reaper.start()
+            if COMPILER_INIT != 'lazy':
+                threading.Thread(target=prewarm_compilers, name='compiler-prewarm', daemon=True).start()
+            _initialized = True
+    return app
+
+def prewarm_compilers():
+    """Start every compiler in the background, logging how long the process took to be ready"""
+    start = time.monotonic()
+    if init_compilers():
+        logger.info(f"All compilers ready {time.monotonic() - start:.2f}s after pre-warm began")
+    else:
+        logger.warning("Some compilers failed to initialize; requests for them will retry")
+
+def shutdown_compilers(drain_timeout: Optional[float] = DRAIN_TIMEOUT):
+    """
+    Drain queued and running jobs, then release warm pooled containers held by the compilers
+    
+    New submissions are refused with 503 and health reports "draining" meanwhile. Safe to
+    call more than once; the WSGI server's worker exit hook and atexit both call it.
+    
+    Args:
+        drain_timeout (float): Most seconds to wait for in-flight jobs, or None to wait for all
+    """
+    global _shut_down
+    with _lifecycle_lock:
+        if _shut_down:
+            return
+        _shut_down = True
+    draining.set()
+    sandbox_reaper.stop()
+    in_flight = job_manager.in_flight()
+    if in_flight:
+        logger.info(f"Draining {in_flight} queued or running jobs")
+    if not job_manager.shutdown(timeout=drain_timeout):
+        logger.warning(f"Jobs still running after the {drain_timeout:g}s drain timeout; stopping anyway")
+    for compiler in (python_compiler, cpp_compiler, js_compiler):
+        if compiler:
+            compiler.shutdown()
+
+atexit.register(shutdown_compilers)
 
 def detect_language(code):
     """Detect programming language based on code content"""
@@ -163,88 +638,552 @@ def serve_frontend(path):
     else:
         return "Frontend build not found", 404
 
+def normalize_language(language: str) -> str:
+    """Map a request language name onto a compiler key: 'python', 'cpp' or 'js'"""
+    if language == 'cpp':
+        return 'cpp'
+    if language in ('js', 'javascript'):
+        return 'js'
+    return 'python'
+
+def positive_int(value) -> Optional[int]:
+    """Parse a client-supplied count or size; None unless it is a positive integer"""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return number if number > 0 else None
+
+def positive_number(value) -> Optional[float]:
+    """Parse a client-supplied duration; None unless it is a finite positive number"""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return number if math.isfinite(number) and number > 0 else None
+
+def timeout_error_response():
+    """Build the 400 response for a request whose timeout is not a positive number"""
+    return jsonify({
+        'success': False,
+        'error': "'timeout' must be a positive number of seconds"
+    }), 400
+
+def submission_error_response(error: ValueError):
+    """Build the 400 response for a request with an unknown profile or malformed extra files"""
+    payload = {
+        'success': False,
+        'error': str(error)
+    }
+    if isinstance(error, UnknownProfileError):
+        payload['profiles'] = execution_profiles.names()
+    return jsonify(payload), 400
+
+def validate_submission(compiler, language: str, profile: Optional[str], files) -> None:
+    """
+    Check a request's profile and extra files before it is queued
+    
+    Raises:
+        UnknownProfileError: If no profile has that name
+        SubmissionFileError: If the extra files are malformed or too large
+    """
+    execution_profiles.get(profile, normalize_language(language))
+    normalize_submission_files(files, compiler.entry_file)
+
+def select_compiler(language: str):
+    """
+    Select the compiler and output formatter for a language
+    
+    Returns:
+        tuple: (compiler, format_function, error_message); error_message is None on success
+    """
+    key = normalize_language(language)
+    ensure_compiler(key)
+    if key == 'cpp':
+        if not cpp_compiler:
+            return None, None, 'C++ compiler not initialized. Make sure Docker is running.'
+        return cpp_compiler, format_cpp_compiler_output, None
+    if key == 'js':
+        if not js_compiler:
+            return None, None, 'JavaScript compiler not initialized. Make sure Docker is running.'
+        return js_compiler, format_js_compiler_output, None
+    if not python_compiler:
+        return None, None, 'Python compiler not initialized. Make sure Docker is running.'
+    return python_compiler, format_compiler_output, None
+
+def run_compile(compiler, format_function, language: str, code: str,
+                syntax_only: bool, timeout: Optional[int], use_cache: bool = True,
+                stdin: str = None, profile: Optional[str] = None, files: Optional[dict] = None) -> dict:
+    """Compile and run code and format the response for the React frontend"""
+    result = compiler.compile_and_run(code, timeout=timeout, check_syntax_only=syntax_only,
+                                      use_cache=use_cache, stdin=stdin, profile=profile,
+                                      extra_files=files)
+    
+    response = {
+        'success': result.success,
+        'output': result.output.split('\n') if result.output else [],
+        'errors': result.error.split('\n') if result.error else [],
+        'exit_code': result.exit_code,
+        'verdict': result.verdict,  # OK, RE, CE, TLE, MLE or OLE
+        'profile': result.profile,
+        'execution_time': result.execution_time,
+        'cached': result.cached,
+        'coalesced': False,  # Set on responses that shared another request's run
+        'truncated': result.truncated,
+        'output_bytes': result.output_bytes,
+        'error_bytes': result.error_bytes,
+        'timings': result.timings,  # Seconds per phase: setup, compile, run, capture, teardown
+        'resource_usage': result.resource_usage,  # CPU time, peak memory, block I/O and processes
+        'file_transfer': result.file_transfer,  # How the files reached the sandbox and bytes written to host disk
+        'language': language,
+        'timestamp': None,  # Will be set by frontend
+        'formatted_output': format_function(result)
+    }
+    if hasattr(result, 'diagnostics'):
+        response['diagnostics'] = result.diagnostics
+    if hasattr(result, 'pch_used'):
+        response['pch_used'] = result.pch_used
+        response['ccache_hit'] = result.ccache_hit
+    return response
+
+def submit_compile_job(data, endpoint: str = 'compile'):
+    """
+    Validate a compile request, apply the client's rate limit and queue it on the job manager
+    
+    An identical request already queued or running is joined instead of queuing another run.
+    
+    Returns:
+        tuple: (job, coalesced, error_response); error_response is a Flask response tuple or None
+    """
+    if not data or 'code' not in data:
+        return None, False, (jsonify({
+            'success': False,
+            'error': 'No code provided'
+        }), 400)
+    
+    code = data['code']
+    syntax_only = data.get('syntax_only', False)
+    timeout = data.get('timeout')  # None for the execution profile's default
+    if timeout is not None:
+        timeout = positive_number(timeout)
+        if timeout is None:
+            return None, False, timeout_error_response()
+    profile = data.get('profile')
+    files = data.get('files')  # Extra files by relative path, e.g. {"utils.py": "..."}
+    language = data.get('language', None)
+    use_cache = data.get('cache', True)  # Opt out for nondeterministic programs
+    coalesce = data.get('coalesce', use_cache)  # Share an identical in-flight run
+    stdin = data.get('stdin')
+    
+    # Auto-detect language if not specified
+    if not language:
+        language = detect_language(code)
+    
+    logger.info(f"Compiling code in language: {language}")
+    
+    if not language_ready(language):
+        return None, False, image_unavailable_response(language)
+    compiler, format_function, error = select_compiler(language)
+    if error:
+        return None, False, (jsonify({
+            'success': False,
+            'error': error
+        }), 500)
+    try:
+        validate_submission(compiler, language, profile, files)
+    except (UnknownProfileError, SubmissionFileError) as e:
+        return None, False, submission_error_response(e)
+    if not docker_available():
+        return None, False, docker_unavailable_response()
+    
+    client = client_id()
+    try:
+        check_rate_limit(client, endpoint, normalize_language(language))
+        job, coalesced = submit_coalesced(
+            dict(kind='compile', language=language, code=code, syntax_only=syntax_only,
+                 timeout=timeout, stdin=stdin, profile=profile, files=files),
+            coalesce,
+            lambda: job_manager.submit(
+                normalize_language(language),
+                lambda: run_compile(compiler, format_function, language, code, syntax_only, timeout,
+                                    use_cache, stdin, profile, files),
+                client=client
+            )
+        )
+    except QueueFullError as e:
+        return None, False, admission_error_response(e)
+    return job, coalesced, None
+
+def submit_batch_item(item: BatchItem, client: str):
+    """Queue one batch item on the job manager (raises ValueError if its compiler is unavailable)"""
+    language = item.language or detect_language(item.code)
+    if not language_ready(language):
+        raise ValueError(image_unavailable_message(language))
+    compiler, format_function, error = select_compiler(language)
+    if error:
+        raise ValueError(error)
+    item.language = normalize_language(language)
+    validate_submission(compiler, language, item.profile, item.files)  # Both errors are ValueErrors
+    job, _ = submit_coalesced(
+        dict(kind='compile', language=language, code=item.code, syntax_only=False,
+             timeout=item.timeout, stdin=item.stdin, profile=item.profile, files=item.files),
+        True,
+        lambda: job_manager.submit(
+            item.language,
+            lambda: run_compile(compiler, format_function, language, item.code, False, item.timeout,
+                                True, item.stdin, item.profile, item.files),
+            client=client
+        )
+    )
+    return job
+
+def submit_judge_job(data):
+    """
+    Validate a judging request, apply the client's rate limit and queue it on the job manager
+    
+    An identical request already queued or running is joined instead of queuing another run.
+    
+    Returns:
+        tuple: (job, coalesced, error_response); error_response is a Flask response tuple or None
+    """
+    if not data or 'code' not in data:
+        return None, False, (jsonify({
+            'success': False,
+            'error': 'No code provided'
+        }), 400)
+    
+    cases = data.get('test_cases')
+    if not isinstance(cases, list) or not cases:
+        return None, False, (jsonify({
+            'success': False,
+            'error': "Request must contain a non-empty 'test_cases' list"
+        }), 400)
+    if len(cases) > JUDGE_MAX_CASES:
+        return None, False, (jsonify({
+            'success': False,
+            'error': f"Too many test cases ({len(cases)}); the limit is {JUDGE_MAX_CASES}"
+        }), 400)
+    if not all(isinstance(case, dict) for case in cases):
+        return None, False, (jsonify({
+            'success': False,
+            'error': "Each test case must be an object with 'stdin' and 'expected_output'"
+        }), 400)
+    
+    code = data['code']
+    language = data.get('language', None) or detect_language(code)
+    test_cases = [TestCase(stdin=case.get('stdin') or "", expected_output=case.get('expected_output'))
+                  for case in cases]
+    try:
+        time_limit = max(JUDGE_MIN_TIME_LIMIT, min(float(data.get('time_limit', 2)), JUDGE_MAX_TIME_LIMIT))
+        parallelism = max(1, min(int(data.get('parallelism', 1)), JUDGE_MAX_PARALLELISM))
+    except (TypeError, ValueError, OverflowError):
+        return None, False, (jsonify({
+            'success': False,
+            'error': "'time_limit' and 'parallelism' must be numbers"
+        }), 400)
+    coalesce = data.get('coalesce', True)
+    profile = data.get('profile')
+    files = data.get('files')
+    
+    if not language_ready(language):
+        return None, False, image_unavailable_response(language)
+    compiler, _, error = select_compiler(language)
+    if error:
+        return None, False, (jsonify({
+            'success': False,
+            'error': error
+        }), 500)
+    try:
+        validate_submission(compiler, language, profile, files)
+    except (UnknownProfileError, SubmissionFileError) as e:
+        return None, False, submission_error_response(e)
+    if not docker_available():
+        return None, False, docker_unavailable_response()
+    
+    logger.info(f"Judging {language} code against {len(test_cases)} test cases")
+    client = client_id()
+    try:
+        check_rate_limit(client, 'judge', normalize_language(language))
+        # Fair queuing charges a judging run for each round of parallel cases it executes
+        job, coalesced = submit_coalesced(
+            dict(kind='judge', language=language, code=code, cases=cases,
+                 time_limit=time_limit, parallelism=parallelism, profile=profile, files=files),
+            coalesce,
+            lambda: job_manager.submit(
+                normalize_language(language),
+                lambda: dict(compiler.judge(code, test_cases, time_limit=time_limit,
+                                            parallelism=parallelism, profile=profile,
+                                            extra_files=files).to_dict(),
+                             language=language, profile=profile or execution_profiles.default_profile,
+                             coalesced=False),
+                client=client,
+                cost=-(-len(test_cases) // parallelism)
+            )
+        )
+    except QueueFullError as e:
+        return None, False, admission_error_response(e)
+    return job, coalesced, None
+
+def admission_error_response(error: QueueFullError):
+    """Build the 429/503 response for a job that was not admitted, with a Retry-After hint"""
+    return jsonify({
+        'success': False,
+        'error': str(error),
+        'retry_after': error.retry_after
+    }), error.status_code, {'Retry-After': str(error.retry_after)}
+
+def expired_job_response(job):
+    """Build the 503 response for a job that waited too long in the queue and never ran"""
+    return jsonify({
+        'success': False,
+        'error': job.error,
+        'retry_after': 5
+    }), 503, {'Retry-After': '5'}
+
+def compile_error_response(error: str):
+    """Build the error payload returned by the compile endpoint"""
+    return jsonify({
+        'success': False,
+        'output': [],
+        'errors': [error],
+        'exit_code': -1,
+        'execution_time': 0.0,
+        'language': 'unknown',
+        'formatted_output': f"Error: {error}"
+    }), 500
+
+def stream_compile_job(data):
+    """
+    Validate a streaming request, apply the client's rate limit and queue it on the job manager
+    
+    The worker hands events to the response through a bounded queue, so a slow client
+    stalls the worker (and, through Docker, the program) instead of buffering output.
+    
+    Returns:
+        tuple: (job, event_queue, cancelled, error_response); error_response is a Flask response tuple or None
+    """
+    if not data or 'code' not in data:
+        return None, None, None, (jsonify({
+            'success': False,
+            'error': 'No code provided'
+        }), 400)
+    
+    code = data['code']
+    timeout = data.get('timeout')  # None for the execution profile's default
+    if timeout is not None:
+        timeout = positive_number(timeout)
+        if timeout is None:
+            return None, None, None, timeout_error_response()
+    profile = data.get('profile')
+    files = data.get('files')
+    language = data.get('language', None) or detect_language(code)
+    max_bytes = positive_int(data.get('max_output_bytes', STREAM_MAX_BYTES))
+    if max_bytes is None:
+        return None, None, None, (jsonify({
+            'success': False,
+            'error': "'max_output_bytes' must be a positive integer"
+        }), 400)
+    max_bytes = min(max_bytes, STREAM_MAX_BYTES)
+    
+    if not language_ready(language):
+        return None, None, None, image_unavailable_response(language)
+    compiler, _, error = select_compiler(language)
+    if error:
+        return None, None, None, (jsonify({
+            'success': False,
+            'error': error
+        }), 500)
+    try:
+        validate_submission(compiler, language, profile, files)
+    except (UnknownProfileError, SubmissionFileError) as e:
+        return None, None, None, submission_error_response(e)
+    if not docker_available():
+        return None, None, None, docker_unavailable_response()
+    
+    events = queue.Queue(maxsize=STREAM_BUFFER_EVENTS)
+    cancelled = threading.Event()
+    
+    def publish(event) -> bool:
+        """Block until the client takes the event; False once it has gone away"""
+        while not cancelled.is_set():
+            try:
+                events.put(event, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def task():
+        if cancelled.is_set():
+            return  # The client left while the run was queued
+        stream = None
+        try:
+            stream = compiler.stream_run(code, timeout=timeout, max_output_bytes=max_bytes, profile=profile,
+                                         extra_files=files)
+            for event in stream:
+                if not publish(event):
+                    break
+        except Exception as e:
+            publish(StreamEvent('error', {'error': str(e)}))
+            raise  # Marks the job failed
+        finally:
+            if stream is not None:
+                stream.close()
+            publish(None)  # Always end the response, even if the run never started
+    
+    client = client_id()
+    try:
+        check_rate_limit(client, 'stream', normalize_language(language))
+        job = job_manager.submit(normalize_language(language), task, client=client)
+    except QueueFullError as e:
+        return None, None, None, admission_error_response(e)
+    return job, events, cancelled, None
+
 # API Routes
 @app.route('/api/compile', methods=['POST'])
 def api_compile_code():
-    """API endpoint to compile and run Python, C++ or JavaScript code"""
+    """API endpoint to compile and run Python, C++ or JavaScript code (blocks until done)"""
     try:
-        data = request.get_json()
-        
-        if not data or 'code' not in data:
-            return jsonify({
-                'success': False,
-                'error': 'No code provided'
-            }), 400
-        
-        code = data['code']
-        syntax_only = data.get('syntax_only', False)
-        timeout = data.get('timeout', 30)
-        language = data.get('language', None)
-        
-        # Auto-detect language if not specified
-        if not language:
-            language = detect_language(code)
+        job, coalesced, error_response = submit_compile_job(request.get_json())
+        if error_response:
+            return error_response
         
-        logger.info(f"Compiling code in language: {language}")
-        
-        # Select appropriate compiler
-        if language == 'cpp':
-            if not cpp_compiler:
-                return jsonify({
-                    'success': False,
-                    'error': 'C++ compiler not initialized. Make sure Docker is running.'
-                }), 500
-            compiler = cpp_compiler
-            format_function = format_cpp_compiler_output
-        elif language == 'js' or language == 'javascript':
-            if not js_compiler:
-                return jsonify({
-                    'success': False,
-                    'error': 'JavaScript compiler not initialized. Make sure Docker is running.'
-                }), 500
-            compiler = js_compiler
-            format_function = format_js_compiler_output
-        else:
-            if not python_compiler:
-                return jsonify({
-                    'success': False,
-                    'error': 'Python compiler not initialized. Make sure Docker is running.'
-                }), 500
-            compiler = python_compiler
-            format_function = format_compiler_output
+        job.wait()
+        if job.status == JobStatus.EXPIRED:
+            return expired_job_response(job)
+        if job.status != JobStatus.COMPLETED:
+            return compile_error_response(job.error or 'Job failed')
+        return jsonify(dict(job.result, coalesced=coalesced))
         
-        # Compile and run the code
-        if syntax_only:
-            result = compiler.check_syntax(code)
-        else:
-            result = compiler.compile_and_run(code, timeout=timeout)
-        
-        # Format the response for the React frontend
-        response = {
-            'success': result.success,
-            'output': result.output.split('\n') if result.output else [],
-            'errors': result.error.split('\n') if result.error else [],
-            'exit_code': result.exit_code,
-            'execution_time': result.execution_time,
-            'language': language,
-            'timestamp': None,  # Will be set by frontend
-            'formatted_output': format_function(result)
-        }
+    except Exception as e:
+        logger.error(f"Error in compile endpoint: {e}")
+        return compile_error_response(str(e))
+
+@app.route('/api/stream', methods=['POST'])
+def api_stream_code():
+    """Run code and stream stdout/stderr chunks as Server-Sent Events while it runs"""
+    job, events, cancelled, error_response = stream_compile_job(request.get_json())
+    if error_response:
+        return error_response
+    
+    def generate():
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=15)
+                except queue.Empty:
+                    if job.status not in (JobStatus.QUEUED, JobStatus.RUNNING) and events.empty():
+                        # The job ended without handing over its final event (expired, failed or cancelled)
+                        if job.status != JobStatus.COMPLETED:
+                            yield StreamEvent('error', {'error': job.error or 'Job failed'}).to_sse()
+                        break
+                    yield ": keep-alive\n\n"  # Still queued or silent; keep proxies from closing
+                    continue
+                if event is None:
+                    break
+                yield event.to_sse()
+        finally:
+            # Client disconnected or stream ended; stops the worker and kills the run
+            cancelled.set()
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    """Run many submissions concurrently and stream one NDJSON result line per item as it finishes"""
+    data = request.get_json()
+    try:
+        items = parse_batch_items(data, BATCH_MAX_ITEMS)
+    except BatchValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    concurrency = positive_int(data.get('concurrency', BATCH_MAX_CONCURRENCY))
+    if concurrency is None:
+        return jsonify({
+            'success': False,
+            'error': "'concurrency' must be a positive integer"
+        }), 400
+    concurrency = min(concurrency, BATCH_MAX_CONCURRENCY)
+    client = client_id()
+    try:
+        check_rate_limit(client, 'batch')
+    except QueueFullError as e:
+        return admission_error_response(e)
+    logger.info(f"Running batch of {len(items)} items with concurrency {concurrency}")
+    
+    def generate():
+        for record in run_batch(items, concurrency, lambda item: submit_batch_item(item, client)):
+            yield json.dumps(record) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/judge', methods=['POST'])
+def api_judge():
+    """Compile code once and return a verdict and timing for each of many test cases"""
+    try:
+        job, coalesced, error_response = submit_judge_job(request.get_json())
+        if error_response:
+            return error_response
         
-        return jsonify(response)
+        job.wait()
+        if job.status == JobStatus.EXPIRED:
+            return expired_job_response(job)
+        if job.status != JobStatus.COMPLETED:
+            return jsonify({
+                'success': False,
+                'error': job.error or 'Job failed'
+            }), 500
+        return jsonify(dict(job.result, coalesced=coalesced))
         
     except Exception as e:
-        logger.error(f"Error in compile endpoint: {e}")
+        logger.error(f"Error in judge endpoint: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def api_submit_job():
+    """Queue code for compilation and return a job id immediately"""
+    try:
+        job, coalesced, error_response = submit_compile_job(request.get_json())
+        if error_response:
+            return error_response
+        return jsonify({
+            'job_id': job.job_id,
+            'status': job.status,
+            'coalesced': coalesced
+        }), 202
+    except Exception as e:
+        logger.error(f"Error in job submit endpoint: {e}")
         return jsonify({
             'success': False,
-            'output': [],
-            'errors': [str(e)],
-            'exit_code': -1,
-            'execution_time': 0.0,
-            'language': 'unknown',
-            'formatted_output': f"Error: {str(e)}"
+            'error': str(e)
         }), 500
 
+@app.route('/api/jobs/<job_id>')
+def api_get_job(job_id):
+    """Get the status and, once finished, the result of a queued job"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    return jsonify(job.to_dict())
+
 # Legacy endpoint for backward compatibility
 @app.route('/compile', methods=['POST'])
 def compile_code():
@@ -254,17 +1193,71 @@ def compile_code():
 @app.route('/api/health')
 def api_health_check():
     """Health check endpoint for the API"""
-    python_status = "running" if python_compiler else "not initialized"
-    cpp_status = "running" if cpp_compiler else "not initialized"
-    js_status = "running" if js_compiler else "not initialized"
+    if draining.is_set():
+        status = 'draining'
+    elif 'starting' in compiler_status.values():
+        status = 'starting'  # Pre-warm (image pulls, warm pools) still running for some language
+    elif not docker_available():
+        status = 'degraded'  # Runs fail fast until the Docker circuit closes; the worker itself is fine
+    else:
+        status = 'healthy'
     return jsonify({
-        'status': 'healthy',
+        'status': status,
+        'pid': os.getpid(),  # Which server worker answered
         'compilers': {
-            'python': python_status,
-            'cpp': cpp_status,
-            'javascript': js_status
-        }
-    })
+            'python': compiler_status['python'],
+            'cpp': compiler_status['cpp'],
+            'javascript': compiler_status['js']
+        },
+        'startup_seconds': compiler_init_seconds,  # Time each compiler took to start
+        'pools': {
+            'python': python_compiler.get_pool_stats() if python_compiler else None,
+            'cpp': cpp_compiler.get_pool_stats() if cpp_compiler else None,
+            'javascript': js_compiler.get_pool_stats() if js_compiler else None
+        },
+        'backend': EXECUTION_BACKEND,
+        'docker': docker_clients.get_stats() if EXECUTION_BACKEND != 'local' else None,
+        'images': docker_clients.images.get_stats() if EXECUTION_BACKEND != 'local' else None,  # Pull progress and pinned digests
+        'reaper': sandbox_reaper.get_stats(),  # Leaked containers and run directories removed
+        'profiles': execution_profiles.names(),
+        'default_profile': execution_profiles.default_profile,
+        'load': job_manager.get_load(),
+        'jobs': job_manager.get_stats(),
+        'rate_limits': rate_limiter.get_stats() if rate_limiter else None,
+        'coalescing': single_flight.get_stats() if single_flight else None,
+        'resource_usage': usage_distributions.summary(),  # Per-language p50/p90/p99/max, for tuning limits
+        'cache': result_cache.get_stats() if result_cache else None,
+        'artifacts': cpp_compiler.get_artifact_stats() if cpp_compiler else None
+    }), 503 if draining.is_set() else 200
+
+# Point-in-time state sampled on each scrape; the counters and histograms are updated as runs happen
+JOBS_QUEUED = metrics_registry.gauge('edurun_jobs_queued', 'Jobs waiting for a worker', ['language'])
+JOBS_RUNNING = metrics_registry.gauge('edurun_jobs_running', 'Jobs executing on a worker', ['language'])
+POOL_CONTAINERS = metrics_registry.gauge('edurun_pool_containers', 'Warm pool containers by state (idle or in_use)',
+                                         ['language', 'state'])
+CACHE_ENTRIES = metrics_registry.gauge('edurun_cache_entries', 'Entries held in the in-memory result cache')
+DOCKER_CIRCUIT_OPEN = metrics_registry.gauge('edurun_docker_circuit_open',
+                                             '1 while the Docker circuit breaker rejects runs, else 0')
+
+def update_state_gauges():
+    """Sample queue, pool and cache occupancy into the scrape-time gauges"""
+    for language, load in job_manager.get_load()['languages'].items():
+        JOBS_QUEUED.set(load['queued'], language=language)
+        JOBS_RUNNING.set(load['running'], language=language)
+    for language, compiler in (('python', python_compiler), ('cpp', cpp_compiler), ('js', js_compiler)):
+        stats = compiler.get_pool_stats() if compiler else None
+        if stats:
+            POOL_CONTAINERS.set(stats['idle'], language=language, state='idle')
+            POOL_CONTAINERS.set(stats['in_use'], language=language, state='in_use')
+    if result_cache:
+        CACHE_ENTRIES.set(result_cache.get_stats()['entries'])
+    DOCKER_CIRCUIT_OPEN.set(0 if docker_clients.available() else 1)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint: per-phase latency histograms and pipeline counters"""
+    update_state_gauges()
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/health')
 def health_check():
@@ -275,21 +1268,21 @@ def health_check():
 def api_supported_languages():
     """Get list of supported languages"""
     languages = []
-    if python_compiler:
+    if compiler_status['python'] != 'failed':
         languages.append({
             'id': 'python',
             'name': 'Python',
             'description': 'Python 3.9 with full standard library',
             'example': 'print("Hello, Python!")'
         })
-    if cpp_compiler:
+    if compiler_status['cpp'] != 'failed':
         languages.append({
             'id': 'cpp',
             'name': 'C++',
             'description': 'C++17 with GCC compiler',
             'example': '#include <iostream>\nint main() {\n    std::cout << "Hello, C++!" << std::endl;\n    return 0;\n}'
         })
-    if js_compiler:
+    if compiler_status['js'] != 'failed':
         languages.append({
             'id': 'javascript',
             'name': 'JavaScript',
@@ -302,6 +1295,11 @@ def api_supported_languages():
         'total': len(languages)
     })
 
+@app.route('/api/profiles')
+def api_execution_profiles():
+    """Get the execution profiles and the limits each applies per language"""
+    return jsonify(execution_profiles.describe(['python', 'cpp', 'js']))
+
 @app.route('/images')
 def list_images():
     """List available Docker images"""
@@ -334,12 +1332,13 @@ def list_images():
     return jsonify({'images': images_info})
 
 if __name__ == '__main__':
-    # Production configuration for Railway
+    # Flask development server; production runs under gunicorn (see backend/api/gunicorn_config.py)
     port = int(os.environ.get('PORT', 5000))
-    debug = os.environ.get('FLASK_ENV') != 'production'
+    debug = os.environ.get('FLASK_ENV') == 'development'
     
     # Initialize compilers on startup
-    logger.info("🚀 Starting Unified Docker Compiler Backend...")
+    logger.info("🚀 Starting Unified Docker Compiler Backend (development server)...")
+    sandbox_reaper.start()
     
     if init_compilers():
         logger.info("✅ All compilers initialized successfully")
@@ -348,8 +1347,14 @@ if __name__ == '__main__':
         logger.info("🔧 API Base URL: /api")
         logger.info("📖 Available endpoints:")
         logger.info("   POST /api/compile - Compile and run code")
+        logger.info("   POST /api/stream  - Run code, stream output as Server-Sent Events")
+        logger.info("   POST /api/batch   - Run many submissions, stream NDJSON results")
+        logger.info("   POST /api/jobs    - Queue code, returns a job id")
+        logger.info("   GET  /api/jobs/<id> - Job status and result")
         logger.info("   GET  /api/health  - Health check")
+        logger.info("   GET  /metrics     - Prometheus metrics")
         logger.info("   GET  /api/languages - Supported languages")
+        logger.info("   GET  /api/profiles  - Execution profiles and their limits")
         app.run(debug=debug, host='0.0.0.0', port=port)
     else:
         logger.warning("⚠️  Some compilers failed to initialize")
@@ -0,0 +1,17 @@
+"""
+WSGI Entry Point
+Exposes the production application for WSGI servers. Each worker process initializes its
+own compilers, Docker clients and warm pools on import, so load this module after the fork:
+
+    gunicorn -c backend/api/gunicorn_config.py backend.api.wsgi:application
+"""
+
+import logging
+
+from backend.api.web_interface import create_app
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+application = create_app()
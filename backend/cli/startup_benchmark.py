@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Starts the server repeatedly and measures how long it takes to answer health checks and to
+return the first successful run of each language, to compare initialization strategies.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from web_benchmark import DEFAULT_CODE
+
+DEFAULT_COMMAND = "gunicorn -c backend/api/gunicorn_config.py backend.api.wsgi:application"
+
+
+def wait_for(url, payload=None, deadline=60.0):
+    """
+    Poll a URL until it answers 200 (and, for a run, reports success)
+
+    Returns:
+        bool: False if the deadline passed first
+    """
+    body = json.dumps(payload).encode('utf-8') if payload else None
+    headers = {'Content-Type': 'application/json'}
+    end = time.perf_counter() + deadline
+    while time.perf_counter() < end:
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, body, headers), timeout=deadline) as response:
+                if payload is None or json.loads(response.read()).get('success'):
+                    return True
+        except (urllib.error.URLError, OSError, ValueError):
+            pass
+        time.sleep(0.02)
+    return False
+
+
+def measure_startup(command, port, languages, deadline):
+    """
+    Start the server once and time its readiness
+
+    Returns:
+        dict: Seconds from launch to the first health answer and to each language's first run,
+            None where the deadline passed
+    """
+    env = dict(os.environ, PORT=str(port))
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(shlex.split(command), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    timings = {}
+    try:
+        timings['health'] = time.perf_counter() - start if wait_for(base + '/api/health', deadline=deadline) else None
+        for language in languages:
+            payload = {'code': DEFAULT_CODE[language], 'language': language, 'cache': False, 'coalesce': False}
+            ok = wait_for(base + '/api/compile', payload, deadline)
+            timings[language] = time.perf_counter() - start if ok else None
+    finally:
+        server.terminate()
+        server.wait()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time-to-first-successful-run benchmark for the EduRun server')
+    parser.add_argument('--command', default=DEFAULT_COMMAND, help=f'Server command (default: {DEFAULT_COMMAND})')
+    parser.add_argument('--port', type=int, default=5099, help='Port the server is started on (default: 5099)')
+    parser.add_argument('-l', '--languages', default='python', help='Comma-separated languages to run, in order')
+    parser.add_argument('-n', '--runs', type=int, default=5, help='Server starts to average over (default: 5)')
+    parser.add_argument('--deadline', type=float, default=120, help='Seconds to wait for each milestone')
+    args = parser.parse_args()
+
+    languages = [language.strip() for language in args.languages.split(',') if language.strip()]
+    results = [measure_startup(args.command, args.port, languages, args.deadline) for _ in range(args.runs)]
+
+    print(f"{args.runs} server starts: {args.command}")
+    for milestone in ['health', *languages]:
+        values = [r[milestone] for r in results if r[milestone] is not None]
+        label = 'first health answer' if milestone == 'health' else f'first {milestone} run'
+        if not values:
+            print(f"  {label:22s} never within {args.deadline:g}s")
+            continue
+        print(f"  {label:22s} median {statistics.median(values) * 1000:.0f} ms  "
+              f"min {min(values) * 1000:.0f} ms  max {max(values) * 1000:.0f} ms"
+              + (f"  ({args.runs - len(values)} timed out)" if len(values) < args.runs else ""))
+    return 0 if all(all(v is not None for v in r.values()) for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
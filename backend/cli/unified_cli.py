@@ -4,10 +4,28 @@ Unified CLI for Python, C++ and JavaScript Docker Compiler
 """
 
 import argparse
+import importlib
 import sys
-from compilers.python_compiler_module import PythonDockerCompiler, format_compiler_output
-from compilers.cpp_compiler_module import CppDockerCompiler, format_cpp_compiler_output
-from compilers.js_compiler_module import JsDockerCompiler, format_js_compiler_output
+
+# Host executables used by --local for each language
+LOCAL_TOOLS = {
+    'python': {'python': sys.executable},
+    'cpp': {'g++': 'g++'},
+    'js': {'node': 'node'},
+}
+
+# Module, compiler class and formatter per language; only the one a run needs is imported
+COMPILERS = {
+    'python': ('compilers.python_compiler_module', 'PythonDockerCompiler', 'format_compiler_output'),
+    'cpp': ('compilers.cpp_compiler_module', 'CppDockerCompiler', 'format_cpp_compiler_output'),
+    'js': ('compilers.js_compiler_module', 'JsDockerCompiler', 'format_js_compiler_output'),
+}
+
+def load_compiler(language):
+    """Import a language's compiler module on demand and return (compiler class, format function)"""
+    module_name, class_name, format_name = COMPILERS[language]
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name), getattr(module, format_name)
 
 def detect_language(code):
     """Auto-detect programming language"""
@@ -68,6 +86,8 @@ def main():
                         help='Check syntax only')
     parser.add_argument('-t', '--timeout', type=int, default=30,
                         help='Execution timeout in seconds (default: 30)')
+    parser.add_argument('--local', action='store_true',
+                        help='Run in a local subprocess sandbox instead of Docker (trusted code only)')
     
     args = parser.parse_args()
     
@@ -115,15 +135,12 @@ def main():
     
     # Initialize compiler
     try:
-        if language == 'cpp':
-            compiler = CppDockerCompiler()
-            format_func = format_cpp_compiler_output
-        elif language == 'js':
-            compiler = JsDockerCompiler()
-            format_func = format_js_compiler_output
-        else:
-            compiler = PythonDockerCompiler()
-            format_func = format_compiler_output
+        compiler_class, format_func = load_compiler(language)
+        backend = None
+        if args.local:
+            from compilers.execution_backend import LocalBackend
+            backend = LocalBackend(language, LOCAL_TOOLS[language])
+        compiler = compiler_class(backend=backend)
         
         print(f"✅ {language.upper()} compiler initialized")
     except Exception as e:
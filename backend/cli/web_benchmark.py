@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Web Tier Load Benchmark
+Sends concurrent /api/compile requests to a running server and reports throughput, latency
+percentiles and rejections, to size the gunicorn worker and thread counts.
+"""
+
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CODE = {
+    'python': 'print(sum(range(1000)))',
+    'cpp': '#include <iostream>\nint main() { std::cout << 42 << std::endl; }',
+    'js': 'console.log([1, 2, 3].map(x => x * 2).join(","))',
+}
+
+
+def send_request(url, payload, client, timeout):
+    """
+    Send one compile request
+
+    Args:
+        url (str): Full /api/compile URL
+        payload (dict): JSON body
+        client (int): Virtual client number, sent as the API key; list the keys in EDURUN_API_KEYS
+            to give each its own rate limit bucket
+        timeout (float): Socket timeout in seconds
+
+    Returns:
+        tuple: (HTTP status or 0 on a connection error, latency in seconds)
+    """
+    body = json.dumps(payload).encode('utf-8')
+    headers = {'Content-Type': 'application/json', 'X-API-Key': f'web-benchmark-{client}'}
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, body, headers), timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    """Get the nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load benchmark for the EduRun web API')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Server base URL')
+    parser.add_argument('-c', '--concurrency', type=int, default=16, help='Concurrent clients (default: 16)')
+    parser.add_argument('-n', '--requests', type=int, default=200, help='Total requests (default: 200)')
+    parser.add_argument('-l', '--language', choices=sorted(DEFAULT_CODE), default='python')
+    parser.add_argument('--code', type=str, help='Program to run (default: a trivial one per language)')
+    parser.add_argument('--cache', action='store_true', help='Allow cached results (default: every request runs)')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/') + '/api/compile'
+    payload = {
+        'code': args.code or DEFAULT_CODE[args.language],
+        'language': args.language,
+        'cache': args.cache,
+        'coalesce': args.cache,
+    }
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(
+            lambda i: send_request(url, payload, i % args.concurrency, args.timeout),
+            range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for status, latency in results if status == 200)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {elapsed:.2f}s")
+    print(f"  throughput: {len(latencies) / elapsed:.1f} ok req/s")
+    print(f"  latency ms: p50 {percentile(latencies, 0.50) * 1000:.0f}  "
+          f"p95 {percentile(latencies, 0.95) * 1000:.0f}  p99 {percentile(latencies, 0.99) * 1000:.0f}")
+    print(f"  status: " + ", ".join(f"{code or 'error'}={count}" for code, count in sorted(statuses.items())))
+    return 0 if statuses.get(200, 0) == args.requests else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Compiled Artifact Store Module
+This module provides a content-addressed, size-bounded on-disk store for compiled
+executables so that unchanged sources can skip straight to running the binary.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Artifact:
+    """Data class to hold a stored executable and what it cost to build"""
+    data: bytes
+    compile_time: float
+    metadata: Dict = field(default_factory=dict)
+
+
+@dataclass
+class ArtifactStats:
+    """Data class to hold artifact store counters"""
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    compile_time_saved: float = 0.0  # Sum of original compile times of every hit
+    compile_time_spent: float = 0.0  # Sum of compile times of every stored artifact
+
+    def to_dict(self) -> Dict:
+        """Convert the counters to a JSON-serializable dictionary"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': (self.hits / lookups) if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'compile_time_saved': self.compile_time_saved,
+            'compile_time_spent': self.compile_time_spent,
+        }
+
+
+class ArtifactStore:
+    """
+    A thread-safe LRU store of compiled executables, evicted by total size
+    """
+
+    def __init__(self, root_dir: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize the store, indexing any artifacts left by a previous process
+
+        Args:
+            root_dir (str): Directory holding the artifacts (default: <tmp>/edurun-artifacts)
+            max_bytes (int): Maximum total size of stored executables
+        """
+        self.root_dir = root_dir or os.path.join(tempfile.gettempdir(), 'edurun-artifacts')
+        self.max_bytes = max_bytes
+        self.stats = ArtifactStats()
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> size, LRU order
+        self._bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._load_index()
+
+    def _paths(self, key: str):
+        """Get the binary and metadata file paths for a key"""
+        base = os.path.join(self.root_dir, key)
+        return base + '.bin', base + '.json'
+
+    def _load_index(self):
+        """Rebuild the LRU index from the files on disk, oldest first"""
+        entries = []
+        for name in os.listdir(self.root_dir):
+            if not name.endswith('.bin'):
+                continue
+            path = os.path.join(self.root_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+        self._evict()
+        if self._index:
+            logger.info(f"Artifact store loaded {len(self._index)} artifacts ({self._bytes} bytes)")
+
+    def _remove_files(self, key: str):
+        """Delete the files of one artifact"""
+        for path in self._paths(key):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Evict least recently used artifacts until under max_bytes (caller holds the lock)"""
+        while self._bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._bytes -= size
+            self._remove_files(key)
+            self.stats.evictions += 1
+
+    def get(self, key: str) -> Optional[Artifact]:
+        """
+        Look up a compiled executable
+
+        Args:
+            key (str): Content-addressed key (source hash + flags + image)
+
+        Returns:
+            Artifact: The stored executable, or None on a miss
+        """
+        bin_path, meta_path = self._paths(key)
+        with self._lock:
+            if key not in self._index:
+                self.stats.misses += 1
+                return None
+            try:
+                with open(bin_path, 'rb') as f:
+                    data = f.read()
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                os.utime(bin_path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable artifact {key}: {e}")
+                self._bytes -= self._index.pop(key)
+                self._remove_files(key)
+                self.stats.misses += 1
+                return None
+            self._index.move_to_end(key)
+            compile_time = meta.get('compile_time', 0.0)
+            self.stats.hits += 1
+            self.stats.compile_time_saved += compile_time
+        return Artifact(data=data, compile_time=compile_time, metadata=meta.get('metadata', {}))
+
+    def put(self, key: str, data: bytes, compile_time: float, metadata: Optional[Dict] = None):
+        """
+        Store a compiled executable
+
+        Args:
+            key (str): Content-addressed key (source hash + flags + image)
+            data (bytes): The executable
+            compile_time (float): Seconds the compilation took
+            metadata (Dict): Extra JSON-serializable data, e.g. compiler warnings
+        """
+        if len(data) > self.max_bytes:
+            return
+        bin_path, meta_path = self._paths(key)
+        with self._lock:
+            try:
+                meta = json.dumps({'compile_time': compile_time, 'metadata': metadata or {}})
+                for path, payload in ((meta_path, meta.encode('utf-8')), (bin_path, data)):
+                    tmp_path = path + '.tmp'
+                    with open(tmp_path, 'wb') as f:
+                        f.write(payload)
+                    os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to store artifact {key}: {e}")
+                return
+            if key in self._index:
+                self._bytes -= self._index.pop(key)
+            self._index[key] = len(data)
+            self._bytes += len(data)
+            self.stats.stores += 1
+            self.stats.compile_time_spent += compile_time
+            self._evict()
+
+    def get_stats(self) -> Dict:
+        """Get hit ratio, compile time saved, entry count and bytes held"""
+        with self._lock:
+            stats = self.stats.to_dict()
+            stats.update({
+                'entries': len(self._index),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            })
+        return stats
@@ -0,0 +1,496 @@
+"""
+Warm Container Pool Module
+This module keeps a per-language pool of pre-started, idle sandbox containers so that
+each run can be dispatched into an existing container via exec instead of paying the
+full create/start/remove cost of a cold container.
+"""
+
+import io
+import posixpath
+import tarfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import logging
+
+from .metrics import POOL_ACQUISITIONS_TOTAL
+from .sandbox_reaper import sandbox_labels
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Exit codes produced by coreutils `timeout` (124) or a SIGKILL (128 + 9)
+TIMEOUT_EXIT_CODES = (124, 137)
+
+# Unprivileged user (nobody) the submitted program runs as inside a container; the scripts
+# stay root, so what they keep outside the working directory is out of the program's reach
+SANDBOX_UID = 65534
+DROP_PRIVILEGES = f"setpriv --reuid={SANDBOX_UID} --regid={SANDBOX_UID} --clear-groups"
+
+# Directories the sandbox user can write in a container, wiped before a pooled container is reused
+WRITABLE_DIRS = ("/tmp", "/var/tmp", "/dev/shm")
+
+# Run as root between two runs in a pooled container: kill everything the sandbox user runs
+# (only it runs the submitted program), fail unless init alone is left, then wipe what it could
+# write. The pool's init (`sleep`) reaps nothing, so a killed leftover lingers as a zombie and
+# the container is retired.
+RESET_SCRIPT = """
+{drop} sh -c 'kill -9 -1' 2>/dev/null
+for attempt in 1 2 3 4 5 6 7 8 9 10; do
+  left=
+  for p in /proc/[0-9]*; do
+    case ${{p#/proc/}} in 1|$$) ;; *) left=${{p#/proc/}} ;; esac
+  done
+  [ -z "$left" ] && break
+  sleep 0.05
+done
+if [ -n "$left" ]; then echo "process $left survived the reset" >&2; exit 1; fi
+rm -rf /run/edurun
+for d in {workdir} {writable}; do
+  if [ -d "$d" ]; then find "$d" -mindepth 1 -delete || exit 1; fi
+done
+chown 0:0 {workdir} && chmod 755 {workdir}
+"""
+
+
+def privilege_drop_lines() -> List[str]:
+    """
+    Build the bash lines that set $__as_sandbox, the prefix the submitted program runs under
+
+    In a container (EDURUN_META unset) the script runs as root; if the image has `setpriv`,
+    $__as_sandbox becomes DROP_PRIVILEGES and the working directory is handed to the sandbox
+    user. Otherwise it stays empty and the program runs as the script's own user; a pool
+    does not reuse containers where that happens (see PooledContainer.can_drop_privileges).
+    """
+    return [
+        "__as_sandbox=",
+        'if [ -z "$EDURUN_META" ] && [ "$EUID" -eq 0 ] && command -v setpriv >/dev/null; then',
+        f'  __as_sandbox="{DROP_PRIVILEGES}"',
+        '  chmod -R a+rwX .',  # The program may write its working directory, nothing else of root's
+        'fi',
+    ]
+
+
+@dataclass
+class PoolConfig:
+    """Data class to hold container pool settings"""
+    min_size: int = 1  # Containers kept warm even when idle
+    max_size: int = 4  # Hard cap on containers owned by the pool
+    idle_ttl: float = 300.0  # Seconds an idle container above min_size may live
+    max_runs: int = 50  # Recycle a container after this many runs
+    max_lifetime: float = 3600.0  # Recycle a container this many seconds after it was created
+    acquire_timeout: float = 10.0  # Seconds to wait for a free container
+    health_check_interval: float = 30.0  # Seconds between maintenance passes
+    workdir: str = "/app"
+
+
+@dataclass
+class PoolStats:
+    """Data class to hold container pool counters"""
+    hits: int = 0  # Acquisitions served by an idle warm container
+    misses: int = 0  # Acquisitions that had to create a new container
+    waits: int = 0  # Acquisitions that had to wait for a busy container
+    timeouts: int = 0  # Acquisitions that gave up waiting
+    created: int = 0
+    recycled: int = 0
+    health_failures: int = 0
+    total_wait_time: float = 0.0
+
+    def to_dict(self) -> Dict:
+        """Convert the counters to a JSON-serializable dictionary"""
+        acquisitions = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': (self.hits / acquisitions) if acquisitions else 0.0,
+            'waits': self.waits,
+            'timeouts': self.timeouts,
+            'created': self.created,
+            'recycled': self.recycled,
+            'health_failures': self.health_failures,
+            'total_wait_time': self.total_wait_time,
+            'avg_wait_time': (self.total_wait_time / acquisitions) if acquisitions else 0.0,
+        }
+
+
+@dataclass
+class PooledContainer:
+    """A warm container owned by a ContainerPool"""
+    container: object
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    runs: int = 0
+    can_drop_privileges: bool = False  # Runs as root with `setpriv`, so programs ran as SANDBOX_UID
+
+
+def build_archive(files: Dict[str, bytes], mode: int = 0o644) -> bytes:
+    """
+    Build an in-memory tar archive suitable for `container.put_archive`
+
+    Args:
+        files (Dict[str, bytes]): Mapping of archive-relative file names to contents
+        mode (int): Permission bits for every file, e.g. 0o755 for executables
+
+    Returns:
+        bytes: The tar archive
+    """
+    buffer = io.BytesIO()
+    directories = set()
+    with tarfile.open(fileobj=buffer, mode='w') as tar:
+        for name, data in files.items():
+            # Entries for parent directories, so nested paths (e.g. "src/util.py") extract cleanly
+            parents = []
+            parent = posixpath.dirname(name)
+            while parent and parent not in directories:
+                directories.add(parent)
+                parents.append(parent)
+                parent = posixpath.dirname(parent)
+            for parent in reversed(parents):
+                info = tarfile.TarInfo(name=parent)
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                info.mtime = int(time.time())
+                tar.addfile(info)
+            info = tarfile.TarInfo(name=name)
+            info.size = len(data)
+            info.mode = mode
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def extract_file(container, path: str) -> bytes:
+    """
+    Read a single file out of a (running or stopped) container
+
+    Args:
+        container: Docker container
+        path (str): Absolute path of the file inside the container
+
+    Returns:
+        bytes: The file contents
+    """
+    bits, _ = container.get_archive(path)
+    with tarfile.open(fileobj=io.BytesIO(b"".join(bits)), mode='r') as tar:
+        member = tar.next()
+        if member is None or not member.isfile():
+            raise FileNotFoundError(f"{path} is not a regular file in the container")
+        return tar.extractfile(member).read()
+
+
+def extract_tree(container, path: str) -> Dict[str, bytes]:
+    """
+    Read a file, or every regular file under a directory, out of a (running or stopped) container
+
+    Args:
+        container: Docker container
+        path (str): Absolute path of the file or directory inside the container
+
+    Returns:
+        Dict[str, bytes]: Mapping of archive names (prefixed with the basename of path) to contents
+    """
+    bits, _ = container.get_archive(path)
+    files = {}
+    with tarfile.open(fileobj=io.BytesIO(b"".join(bits)), mode='r') as tar:
+        for member in tar:
+            if member.isfile():
+                files[member.name] = tar.extractfile(member).read()
+    return files
+
+
+class ContainerPool:
+    """
+    A thread-safe pool of idle, pre-started containers for a single Docker image
+    """
+
+    def __init__(self, client, docker_image: str, config: Optional[PoolConfig] = None,
+                 language: str = "generic", run_options: Optional[Dict] = None):
+        """
+        Initialize the pool
+
+        Args:
+            client: Docker client used to create containers
+            docker_image (str): Docker image the pooled containers run
+            config (PoolConfig): Pool sizing and lifecycle settings
+            language (str): Language label used in logs and container labels
+            run_options (Dict): Extra `containers.run` keyword arguments (volumes, environment, ...)
+        """
+        self.client = client
+        self.docker_image = docker_image
+        self.config = config or PoolConfig()
+        self.language = language
+        self.run_options = dict(run_options or {})
+        self.stats = PoolStats()
+        self._idle: List[PooledContainer] = []
+        self._total = 0  # Idle + checked-out containers
+        self._pending = 0  # Containers currently being created
+        self._lock = threading.Condition()
+        self._closed = False
+        self._maintenance_thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Pre-start min_size containers and launch the maintenance thread"""
+        self._fill_to_min()
+        self._maintenance_thread = threading.Thread(
+            target=self._maintenance_loop,
+            name=f"container-pool-{self.language}",
+            daemon=True
+        )
+        self._maintenance_thread.start()
+        logger.info(f"Container pool for {self.language} started with {self._total} warm containers")
+
+    def _create_container(self) -> PooledContainer:
+        """Create and start a new idle sandbox container"""
+        container = self.client.containers.run(
+            image=self.docker_image,
+            command=["sleep", "infinity"],
+            working_dir=self.config.workdir,
+            detach=True,
+            labels={
+                'edurun.pool': self.language,
+                'edurun.pool.id': uuid.uuid4().hex,
+                **sandbox_labels('pool'),
+            },
+            **self.run_options
+        )
+        with self._lock:
+            self.stats.created += 1
+        pooled = PooledContainer(container=container)
+        try:
+            probe = container.exec_run(["sh", "-c", f'[ "$(id -u)" = 0 ] && {DROP_PRIVILEGES} true'])
+            pooled.can_drop_privileges = probe.exit_code == 0
+        except Exception as e:
+            logger.warning(f"Could not probe pooled {self.language} container: {e}")
+        if not pooled.can_drop_privileges:
+            logger.warning(f"{self.docker_image} cannot run programs unprivileged (no setpriv); "
+                           f"pooled {self.language} containers are used once")
+        return pooled
+
+    def _destroy(self, pooled: PooledContainer):
+        """Remove a container and release its slot"""
+        try:
+            pooled.container.remove(force=True)
+        except Exception as e:
+            logger.warning(f"Could not remove pooled {self.language} container: {e}")
+        with self._lock:
+            self._total -= 1
+            self._lock.notify()
+
+    def _is_healthy(self, pooled: PooledContainer) -> bool:
+        """Check that a pooled container is still running"""
+        try:
+            pooled.container.reload()
+            return pooled.container.status == 'running'
+        except Exception:
+            return False
+
+    def _fill_to_min(self):
+        """Create containers until the pool holds at least min_size"""
+        while True:
+            with self._lock:
+                if self._closed or self._total + self._pending >= self.config.min_size:
+                    return
+                self._pending += 1
+            try:
+                pooled = self._create_container()
+            except Exception as e:
+                logger.error(f"Failed to pre-start {self.language} container: {e}")
+                with self._lock:
+                    self._pending -= 1
+                return
+            with self._lock:
+                self._pending -= 1
+                self._total += 1
+                self._idle.append(pooled)
+                self._lock.notify()
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledContainer:
+        """
+        Check out a warm container, creating one if the pool is below max_size
+
+        Args:
+            timeout (float): Seconds to wait for a free container
+
+        Returns:
+            PooledContainer: The checked-out container
+
+        Raises:
+            TimeoutError: If no container became available in time
+        """
+        if timeout is None:
+            timeout = self.config.acquire_timeout
+        start_time = time.time()
+        deadline = start_time + timeout
+        waited = False
+
+        while True:
+            create = False
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError(f"Container pool for {self.language} is shut down")
+                if self._idle:
+                    pooled = self._idle.pop()
+                elif self._total + self._pending < self.config.max_size:
+                    self._pending += 1
+                    create = True
+                    pooled = None
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self.stats.timeouts += 1
+                        raise TimeoutError(
+                            f"No {self.language} container available after {timeout} seconds"
+                        )
+                    if not waited:
+                        self.stats.waits += 1
+                        waited = True
+                    self._lock.wait(remaining)
+                    continue
+
+            if create:
+                try:
+                    pooled = self._create_container()
+                except Exception:
+                    with self._lock:
+                        self._pending -= 1
+                        self._lock.notify()
+                    raise
+                with self._lock:
+                    self._pending -= 1
+                    self._total += 1
+                    self.stats.misses += 1
+                    self.stats.total_wait_time += time.time() - start_time
+                POOL_ACQUISITIONS_TOTAL.inc(language=self.language, result="created")
+                return pooled
+
+            if not self._is_healthy(pooled):
+                with self._lock:
+                    self.stats.health_failures += 1
+                self._destroy(pooled)
+                continue
+
+            with self._lock:
+                self.stats.hits += 1
+                self.stats.total_wait_time += time.time() - start_time
+            POOL_ACQUISITIONS_TOTAL.inc(language=self.language, result="reused")
+            return pooled
+
+    def release(self, pooled: PooledContainer, reusable: bool = True):
+        """
+        Return a container to the pool, resetting or replacing it
+
+        A container is only reused if the program ran as the sandbox user and the reset
+        (RESET_SCRIPT) killed all it left running and wiped everywhere it could write.
+
+        Args:
+            pooled (PooledContainer): Container previously returned by acquire()
+            reusable (bool): False if the run left the container in an unknown state
+        """
+        pooled.runs += 1
+        pooled.last_used = time.time()
+
+        recycle = (not reusable or not pooled.can_drop_privileges
+                   or pooled.runs >= self.config.max_runs or self._past_lifetime(pooled))
+        if not recycle:
+            try:
+                reset = pooled.container.exec_run(["sh", "-c", RESET_SCRIPT.format(
+                    drop=DROP_PRIVILEGES, workdir=self.config.workdir, writable=" ".join(WRITABLE_DIRS))])
+                recycle = reset.exit_code != 0
+                if recycle:
+                    logger.warning(f"Reset of pooled {self.language} container failed: "
+                                   f"{reset.output.decode('utf-8', errors='replace').strip()}")
+            except Exception as e:
+                logger.warning(f"Failed to reset pooled {self.language} container: {e}")
+                recycle = True
+
+        with self._lock:
+            closed = self._closed
+            if not recycle and not closed:
+                self._idle.append(pooled)
+                self._lock.notify()
+                return
+            if recycle:
+                self.stats.recycled += 1
+
+        self._destroy(pooled)
+        if not closed:
+            self._fill_to_min()
+
+    def put_files(self, pooled: PooledContainer, files: Dict[str, bytes], mode: int = 0o644):
+        """
+        Copy files into the container's working directory
+
+        Args:
+            pooled (PooledContainer): Target container
+            files (Dict[str, bytes]): Mapping of file names to contents
+            mode (int): Permission bits for the copied files
+        """
+        if not pooled.container.put_archive(self.config.workdir, build_archive(files, mode)):
+            raise RuntimeError("Failed to copy code into sandbox container")
+
+    def _past_lifetime(self, pooled: PooledContainer) -> bool:
+        """Tell whether a container has lived past max_lifetime and should be replaced"""
+        return time.time() - pooled.created_at >= self.config.max_lifetime
+
+    def _maintenance_loop(self):
+        """Periodically health-check idle containers and expire ones past idle_ttl or max_lifetime"""
+        while not self._stop_event.wait(self.config.health_check_interval):
+            self.run_maintenance()
+
+    def run_maintenance(self):
+        """Run one health check / idle expiry pass"""
+        now = time.time()
+        with self._lock:
+            candidates = list(self._idle)
+            self._idle = []
+
+        keep = []
+        for pooled in candidates:
+            expired = (now - pooled.last_used) > self.config.idle_ttl
+            if expired and len(keep) >= self.config.min_size:
+                self._destroy(pooled)
+            elif self._past_lifetime(pooled):
+                with self._lock:
+                    self.stats.recycled += 1
+                self._destroy(pooled)
+            elif not self._is_healthy(pooled):
+                with self._lock:
+                    self.stats.health_failures += 1
+                self._destroy(pooled)
+            else:
+                keep.append(pooled)
+
+        with self._lock:
+            self._idle.extend(keep)
+            self._lock.notify_all()
+        self._fill_to_min()
+
+    def get_stats(self) -> Dict:
+        """Get pool counters and current occupancy"""
+        with self._lock:
+            stats = self.stats.to_dict()
+            stats.update({
+                'language': self.language,
+                'image': self.docker_image,
+                'idle': len(self._idle),
+                'in_use': self._total - len(self._idle),
+                'size': self._total,
+                'min_size': self.config.min_size,
+                'max_size': self.config.max_size,
+            })
+        return stats
+
+    def shutdown(self):
+        """Stop maintenance and remove all idle containers"""
+        self._stop_event.set()
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._lock.notify_all()
+        for pooled in idle:
+            self._destroy(pooled)
+        logger.info(f"Container pool for {self.language} shut down")
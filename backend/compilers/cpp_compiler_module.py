@@ -4,18 +4,38 @@ This module provides functionality to compile and run C++ code using Docker cont
 and capture the compiler/runtime messages for display.
 """
 
-import docker
-import tempfile
-import os
+import shlex
 import time
-from dataclasses import dataclass
-from typing import Dict, Optional, List
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Iterator, Optional, List, Sequence, Tuple
 import logging
 
+from .result_cache import ResultCache, make_cache_key, is_cacheable_exit_code
+from .metrics import CACHE_LOOKUPS_TOTAL
+from .container_pool import PoolConfig
+from .artifact_store import ArtifactStore
+from .cpp_toolchain import CppToolchain, CppToolchainConfig, CCACHE_LOG_NAME
+from .output_stream import StreamEvent, DEFAULT_STREAM_MAX_BYTES
+from .log_capture import OutputLimits
+from .execution_backend import ExecutionBackend, ExecutionOutcome, DockerBackend, merge_transfers
+from .docker_client import DockerClientManager
+from .execution_profiles import ExecutionProfile, ProfileSet, LimitVerdict, limit_verdict
+from .submission_files import normalize_submission_files, files_with_suffix
+from .judge import TestCase, JudgeResult, judge_in_sandbox
+from .timing import (INSTRUMENTATION_FILES, TIMING_FILE, timed_script, sandboxed_script, parse_step_times,
+                     build_timings, merge_timings, format_timings)
+from .resource_usage import build_resource_usage, format_resource_usage, usage_distributions
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Flags used when the caller does not pass compiler_flags
+DEFAULT_COMPILER_FLAGS = ["-std=c++17", "-Wall", "-Wextra"]
+
+# Extra files of a submission that are compiled and linked along with code.cpp
+SOURCE_SUFFIXES = ('.cpp', '.cc', '.cxx')
+
 @dataclass
 class CompilerResult:
     """Data class to hold compilation results"""
@@ -25,189 +45,426 @@ class CompilerResult:
     exit_code: int
     execution_time: float
     compilation_output: str = ""  # Additional field for C++ compilation messages
+    cached: bool = False  # True if served from the result cache
+    pch_used: bool = False  # True if the precompiled common header was used
+    ccache_hit: Optional[bool] = None  # None when ccache is not in use for this run
+    output_bytes: int = 0  # Bytes the program wrote to stdout, including any truncated part
+    error_bytes: int = 0  # Bytes written to stderr, including any truncated part
+    truncated: bool = False  # True if output exceeded the capture limits
+    timings: Dict[str, float] = field(default_factory=dict)  # Seconds per phase: setup, compile, run, capture, teardown
+    resource_usage: Dict = field(default_factory=dict)  # CPU time, peak memory, block I/O and processes of the run
+    profile: str = ""  # Execution profile the run was held to
+    verdict: str = ""  # OK, RE, CE, TLE, MLE or OLE; empty if the sandbox itself failed
+    file_transfer: Dict = field(default_factory=dict)  # How the files reached the sandbox: method, files, bytes, host_disk_bytes
 
 class CppDockerCompiler:
     """
     A class to compile and run C++ code using Docker containers
     """
     
-    def __init__(self, docker_image: str = "gcc:latest"):
+    entry_file = "code.cpp"  # Name of the submitted code in the sandbox; extra files sit next to it
+    
+    def __init__(self, docker_image: str = "gcc:latest",
+                 use_pool: bool = False,
+                 pool_config: Optional[PoolConfig] = None,
+                 result_cache: Optional[ResultCache] = None,
+                 artifact_store: Optional[ArtifactStore] = None,
+                 toolchain_config: Optional[CppToolchainConfig] = None,
+                 output_limits: Optional[OutputLimits] = None,
+                 backend: Optional[ExecutionBackend] = None,
+                 profiles: Optional[ProfileSet] = None,
+                 docker_clients: Optional[DockerClientManager] = None):
         """
         Initialize the compiler with a Docker image
         
         Args:
             docker_image (str): Docker image to use for compilation/execution
+            use_pool (bool): If True, dispatch runs into warm pooled containers
+            pool_config (PoolConfig): Sizing and lifecycle settings for the pool
+            result_cache (ResultCache): Optional cache for deterministic run results
+            artifact_store (ArtifactStore): Optional store of compiled binaries; when set,
+                compilation is split from execution and unchanged sources skip g++
+            toolchain_config (CppToolchainConfig): Enables precompiled headers and ccache
+            output_limits (OutputLimits): Per-stream byte and line limits for captured output;
+                overrides the execution profile's output caps
+            backend (ExecutionBackend): Where code runs; defaults to Docker containers of docker_image.
+                The toolchain (PCH/ccache volumes) only applies to the Docker backend.
+            profiles (ProfileSet): Execution profiles requests can select
+            docker_clients (DockerClientManager): Docker client shared with the other compilers
         """
         self.docker_image = docker_image
-        self.client = None
-        self._init_docker_client()
+        self.result_cache = result_cache
+        self.artifact_store = artifact_store
+        self.toolchain = None
+        self.output_limits = output_limits
+        self.profiles = profiles or ProfileSet()
+        self.backend = backend or DockerBackend(docker_image, language="cpp",
+                                                clients=docker_clients)
+        self.client = getattr(self.backend, 'client', None)
+        if toolchain_config and isinstance(self.backend, DockerBackend):
+            self.toolchain = CppToolchain(self.client, self.backend.docker_image, self.backend.image_id(),
+                                          toolchain_config)
+            self.toolchain.prepare(DEFAULT_COMPILER_FLAGS)
+            self.backend.run_options = self.toolchain.container_options()
+        if use_pool and isinstance(self.backend, DockerBackend):
+            self.backend.start_pool(pool_config, self.profiles.get(None, "cpp"))
     
-    def _init_docker_client(self):
-        """Initialize Docker client"""
-        try:
-            self.client = docker.from_env()
-            # Test if Docker is running
-            self.client.ping()
-            logger.info("Docker client initialized successfully for C++")
-        except Exception as e:
-            logger.error(f"Failed to initialize Docker client: {e}")
-            raise ConnectionError("Docker is not running or not accessible")
+    def _build_steps(self, cpp_code: str, timeout: int, check_syntax_only: bool,
+                     compiler_flags: List[str] = None,
+                     has_stdin: bool = False,
+                     sources: Sequence[str] = ()) -> Tuple[List[Tuple[str, str]], bool]:
+        """
+        Build the (step name, shell command) pairs that check or run code.cpp
+        
+        Returns:
+            tuple: (steps, True if the precompiled header is force-included)
+        """
+        if check_syntax_only:
+            # Only compile, don't run
+            command, pch_used = self._compile_command(cpp_code, compiler_flags, check_syntax_only=True,
+                                                      sources=sources)
+            return [('compile', command)], pch_used
+        
+        # Compile and run
+        command, pch_used = self._compile_command(cpp_code, compiler_flags, sources=sources)
+        redirect = " < input.txt" if has_stdin else ""
+        return [('compile', command), ('run', f"timeout {timeout}s ./program{redirect}")], pch_used
+    
+    def _compile_command(self, cpp_code: str, compiler_flags: List[str] = None,
+                         check_syntax_only: bool = False,
+                         sources: Sequence[str] = ()) -> Tuple[str, bool]:
+        """
+        Build the shell command that compiles code.cpp, and any extra sources, to program
+        
+        Returns:
+            tuple: (command, True if the precompiled header is force-included)
+        """
+        # Default compiler flags
+        if compiler_flags is None:
+            compiler_flags = DEFAULT_COMPILER_FLAGS
+        flags = ' '.join(compiler_flags)
+        
+        pch_header = self.toolchain.pch_for(cpp_code, compiler_flags) if self.toolchain else None
+        pch_flags = f" -include {pch_header} -Winvalid-pch" if pch_header else ""
+        
+        inputs = " ".join(["code.cpp", *map(shlex.quote, sources)])
+        
+        if check_syntax_only:
+            return f"g++ {flags}{pch_flags} -fsyntax-only {inputs}", bool(pch_header)
+        if self.toolchain and self.toolchain.ccache_enabled:
+            # ccache only caches compile-only invocations, so compile each source and link separately
+            objects = [("code.cpp", "code.o")] + [(shlex.quote(source), shlex.quote(f"{source}.o"))
+                                                  for source in sources]
+            compiles = [f"ccache g++ {flags}{pch_flags} -c {source} -o {obj}" for source, obj in objects]
+            return (
+                " && ".join(compiles) + " && "
+                f"g++ {flags} {' '.join(obj for _, obj in objects)} -o program"
+            ), bool(pch_header)
+        return f"g++ {flags}{pch_flags} {inputs} -o program", bool(pch_header)
+    
+    def _collect_paths(self, *paths: str) -> List[str]:
+        """Files to read back after a compilation: the given paths, the step timings/usage and the ccache log"""
+        if self.toolchain and self.toolchain.ccache_enabled:
+            return list(paths) + INSTRUMENTATION_FILES + [CCACHE_LOG_NAME]
+        return list(paths) + INSTRUMENTATION_FILES
+    
+    def _build_info(self, outcome: ExecutionOutcome, pch_requested: bool, error: str,
+                    check_syntax_only: bool = False) -> Dict:
+        """Work out whether the PCH and ccache were actually hit for a compilation"""
+        return {
+            'pch_used': pch_requested and "[-Winvalid-pch]" not in error,
+            'ccache_hit': None if check_syntax_only or not self.toolchain
+            else self.toolchain.read_ccache_hit(outcome.files.get(CCACHE_LOG_NAME)),
+        }
     
-    def _create_temp_file(self, code: str, extension: str = ".cpp") -> str:
+    def _error_result(self, error: str) -> CompilerResult:
+        """Build the result returned when the sandbox itself failed"""
+        return CompilerResult(
+            success=False,
+            output="",
+            error=error,
+            exit_code=-1,
+            execution_time=0.0,
+            compilation_output=""
+        )
+    
+    def _timeout_result(self, timeout: int, outcome: ExecutionOutcome, timings: Dict[str, float],
+                        resource_usage: Optional[Dict] = None,
+                        profile: Optional[ExecutionProfile] = None) -> CompilerResult:
+        """Build the result returned when the backend killed the run"""
+        return CompilerResult(
+            success=False,
+            output=outcome.captured.stdout,
+            error=f"Execution timed out after {timeout} seconds",
+            exit_code=-1,
+            execution_time=outcome.execution_time,
+            compilation_output="",
+            timings=timings,
+            resource_usage=resource_usage or {},
+            profile=profile.name if profile else "",
+            verdict=LimitVerdict.TLE,
+            file_transfer=outcome.transfer,
+            **outcome.captured.stats()
+        )
+    
+    def _build_result(self, exit_code: int, output: str, error: str,
+                      execution_time: float, check_syntax_only: bool,
+                      build_info: Optional[Dict] = None,
+                      capture_info: Optional[Dict] = None,
+                      timings: Optional[Dict[str, float]] = None,
+                      resource_usage: Optional[Dict] = None,
+                      profile: Optional[ExecutionProfile] = None,
+                      compile_failed: bool = False,
+                      file_transfer: Optional[Dict] = None) -> CompilerResult:
+        """Split captured stderr into compilation output and build the result"""
+        compilation_output = ""
+        
+        # For C++, compilation errors and runtime output can be mixed
+        # If we're just checking syntax, the error stream contains compilation info
+        if check_syntax_only:
+            compilation_output = error
+            error = error if exit_code != 0 else ""
+        else:
+            # Separate compilation errors from runtime errors
+            if "error:" in error or "warning:" in error:
+                compilation_output = error
+        
+        return CompilerResult(
+            success=exit_code == 0,
+            output=output,
+            error=error,
+            exit_code=exit_code,
+            execution_time=execution_time,
+            compilation_output=compilation_output,
+            timings=timings or {},
+            resource_usage=resource_usage or {},
+            profile=profile.name if profile else "",
+            verdict=limit_verdict(exit_code, False, (capture_info or {}).get('truncated', False), error,
+                                  resource_usage, profile,
+                                  compile_failed=compile_failed or (check_syntax_only and exit_code != 0)),
+            file_transfer=file_transfer or {},
+            **(build_info or {}),
+            **(capture_info or {})
+        )
+    
+    def _artifact_key(self, cpp_code: str, compiler_flags: List[str] = None,
+                      extra_files: Optional[Dict[str, bytes]] = None) -> str:
+        """Build the artifact store key: source hash (with extra files) + compiler flags + image"""
+        return make_cache_key(
+            artifact="cpp-binary",
+            image=self.backend.image_id(),
+            code=cpp_code,
+            flags=compiler_flags if compiler_flags is not None else DEFAULT_COMPILER_FLAGS,
+            files={path: data.decode('utf-8') for path, data in (extra_files or {}).items()}
+        )
+    
+    def _execute_with_artifacts(self, cpp_code: str, timeout: int,
+                                compiler_flags: List[str] = None,
+                                stdin: Optional[str] = None,
+                                profile: Optional[ExecutionProfile] = None,
+                                extra_files: Optional[Dict[str, bytes]] = None) -> CompilerResult:
         """
-        Create a temporary C++ file with the provided code
+        Compile and run C++ code as two separate steps, reusing a stored binary if possible
         
         Args:
-            code (str): C++ code to write to file
-            extension (str): File extension (.cpp, .c, .cc)
+            cpp_code (str): C++ code to compile and run
+            timeout (int): Timeout in seconds for execution
+            compiler_flags (List[str]): Additional compiler flags
+            stdin (str): Text fed to the program's standard input
+            profile (ExecutionProfile): Limits both steps are held to
+            extra_files (Dict[str, bytes]): Headers, sources and data files placed next to code.cpp;
+                they are part of the artifact key and also available to the run step
             
         Returns:
-            str: Path to the temporary file
+            CompilerResult: Object containing compilation/execution results
         """
-        with tempfile.NamedTemporaryFile(mode='w', suffix=extension, delete=False, encoding='utf-8') as f:
-            f.write(code)
-            return f.name
+        limits = self.output_limits or profile.output_limits()
+        start_time = time.time()
+        extra_files = extra_files or {}
+        key = self._artifact_key(cpp_code, compiler_flags, extra_files)
+        artifact = self.artifact_store.get(key)
+        build_info = None
+        compile_timings = {}
+        compile_transfer = {}
+        
+        if artifact is None:
+            command, pch_requested = self._compile_command(cpp_code, compiler_flags,
+                                                           sources=files_with_suffix(extra_files, SOURCE_SUFFIXES))
+            compiled = self.backend.run(
+                {**extra_files, 'code.cpp': cpp_code.encode('utf-8')},
+                timed_script([('compile', command)], self.backend.cgroup_stats),
+                timeout,
+                grace=10,
+                limits=limits,
+                collect=self._collect_paths('program'),
+                profile=profile
+            )
+            compile_timings = build_timings(compiled, ['compile'])
+            compile_transfer = compiled.transfer
+            if compiled.timed_out:
+                return self._timeout_result(timeout, compiled, compile_timings, profile=profile)
+            compile_output = compiled.captured.stderr
+            build_info = self._build_info(compiled, pch_requested, compile_output)
+            if compiled.exit_code != 0:
+                return self._build_result(compiled.exit_code, "", compile_output,
+                                          time.time() - start_time, False, build_info,
+                                          compiled.captured.stats(), compile_timings,
+                                          profile=profile, compile_failed=True,
+                                          file_transfer=compile_transfer)
+            binary = compiled.files.get('program')
+            if binary is None:
+                raise RuntimeError("Compiled program could not be read back from the sandbox")
+            self.artifact_store.put(key, binary, compiled.execution_time,
+                                    {'compile_output': compile_output})
+        else:
+            binary = artifact.data
+            compile_output = artifact.metadata.get('compile_output', "")
+        
+        # Sources are compiled in; data files the program opens at run time go along with the binary
+        files = {path: data for path, data in extra_files.items() if not path.endswith(SOURCE_SUFFIXES)}
+        redirect = ""
+        if stdin is not None:
+            files['input.txt'] = stdin.encode('utf-8')
+            redirect = " < input.txt"
+        executed = self.backend.run(
+            files,
+            timed_script([('run', f"timeout -k 5 {timeout}s ./program{redirect}")],
+                         self.backend.cgroup_stats),
+            timeout,
+            grace=5,
+            limits=limits,
+            executables={'program': binary},
+            collect=INSTRUMENTATION_FILES,
+            profile=profile
+        )
+        timings = merge_timings(compile_timings, build_timings(executed, ['run']))
+        resource_usage = build_resource_usage(executed.files, 'run', executed.rusage)
+        executed.transfer = merge_transfers(compile_transfer, executed.transfer)
+        if executed.timed_out:
+            return self._timeout_result(timeout, executed, timings, resource_usage, profile)
+        return self._build_result(executed.exit_code, executed.captured.stdout,
+                                  compile_output + executed.captured.stderr,
+                                  time.time() - start_time, False, build_info,
+                                  executed.captured.stats(), timings, resource_usage, profile,
+                                  file_transfer=executed.transfer)
     
-    def _cleanup_temp_file(self, file_path: str):
-        """Clean up temporary file"""
-        try:
-            os.unlink(file_path)
-        except OSError:
-            pass
+    def _cache_key(self, cpp_code: str, timeout: int, check_syntax_only: bool,
+                   compiler_flags: List[str] = None, stdin: Optional[str] = None,
+                   profile: Optional[ExecutionProfile] = None,
+                   extra_files: Optional[Dict[str, bytes]] = None) -> str:
+        """Build the result cache key for a run"""
+        return make_cache_key(
+            language="cpp",
+            image=self.backend.image_id(),
+            code=cpp_code,
+            flags=compiler_flags,
+            stdin=stdin,
+            timeout=timeout,
+            syntax_only=check_syntax_only,
+            profile=profile.to_dict() if profile else None,
+            files={path: data.decode('utf-8') for path, data in (extra_files or {}).items()}
+        )
     
     def compile_and_run(self, 
                        cpp_code: str, 
-                       timeout: int = 30,
+                       timeout: Optional[int] = None,
                        check_syntax_only: bool = False,
-                       compiler_flags: List[str] = None) -> CompilerResult:
+                       compiler_flags: List[str] = None,
+                       use_cache: bool = True,
+                       stdin: Optional[str] = None,
+                       profile: Optional[str] = None,
+                       extra_files: Optional[Dict[str, str]] = None) -> CompilerResult:
         """
         Compile and run C++ code in a Docker container
         
         Args:
             cpp_code (str): C++ code to compile and run
-            timeout (int): Timeout in seconds for execution
+            timeout (int): Timeout in seconds for execution; defaults to the profile's and is
+                capped at its max_timeout
             check_syntax_only (bool): If True, only check syntax without execution
             compiler_flags (List[str]): Additional compiler flags
+            use_cache (bool): If False, bypass the result cache (for nondeterministic programs)
+            stdin (str): Text fed to the program's standard input
+            profile (str): Execution profile name; None for the default
+            extra_files (Dict[str, str]): Headers, sources (.cpp/.cc/.cxx, compiled and linked with
+                code.cpp) and data files placed next to code.cpp, by relative path
             
         Returns:
             CompilerResult: Object containing compilation/execution results
+            
+        Raises:
+            UnknownProfileError: If no profile has that name
+            SubmissionFileError: If extra_files is malformed or too large
         """
-        temp_file = None
-        container = None
+        limits = self.profiles.get(profile, "cpp")
+        timeout = limits.resolve_timeout(timeout)
+        extra = normalize_submission_files(extra_files, self.entry_file)
+        cache_key = None
+        if self.result_cache and use_cache:
+            cache_key = self._cache_key(cpp_code, timeout, check_syntax_only, compiler_flags, stdin, limits,
+                                        extra)
+            cached = self.result_cache.get(cache_key)
+            CACHE_LOOKUPS_TOTAL.inc(language="cpp", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                cached['cached'] = True
+                return CompilerResult(**cached)
         
-        try:
-            # Create temporary file with the code
-            temp_file = self._create_temp_file(cpp_code)
-            
-            # Default compiler flags
-            if compiler_flags is None:
-                compiler_flags = ["-std=c++17", "-Wall", "-Wextra"]
-            
-            # Determine the command to run
-            if check_syntax_only:
-                # Only compile, don't run
-                command = (
-                    f"g++ {' '.join(compiler_flags)} -fsyntax-only /app/code.cpp"
-                )
-            else:
-                # Compile and run
-                command = (
-                    f"g++ {' '.join(compiler_flags)} /app/code.cpp -o /app/program && "
-                    f"timeout {timeout}s /app/program"
-                )
-            
-            # Run the container
-            start_time = time.time()
-            
-            container = self.client.containers.run(
-                image=self.docker_image,
-                command=["bash", "-c", command],
-                volumes={temp_file: {'bind': '/app/code.cpp', 'mode': 'ro'}},
-                working_dir='/app',
-                detach=True,
-                stdout=True,
-                stderr=True,
-                remove=False  # Don't auto-remove so we can get logs
-            )
-            
-            # Wait for container to finish with timeout
+        result = self._execute(cpp_code, timeout, check_syntax_only, compiler_flags, stdin, limits, extra)
+        usage_distributions.record("cpp", result.resource_usage)
+        if cache_key and is_cacheable_exit_code(result.exit_code):
+            self.result_cache.put(cache_key, asdict(result))
+        return result
+    
+    def _execute(self, cpp_code: str, timeout: int, check_syntax_only: bool,
+                 compiler_flags: List[str] = None, stdin: Optional[str] = None,
+                 profile: Optional[ExecutionProfile] = None,
+                 extra_files: Optional[Dict[str, bytes]] = None) -> CompilerResult:
+        """Run C++ code without consulting the result cache"""
+        if self.artifact_store and not check_syntax_only:
             try:
-                result = container.wait(timeout=timeout + 10)  # Extra time for compilation
-                exit_code = result['StatusCode']
+                return self._execute_with_artifacts(cpp_code, timeout, compiler_flags, stdin, profile,
+                                                    extra_files)
             except Exception as e:
-                try:
-                    container.kill()
-                except:
-                    pass
-                raise TimeoutError(f"Execution timed out after {timeout} seconds")
-            
-            execution_time = time.time() - start_time
-            
-            # Get output and error logs
-            try:
-                logs = container.logs(stdout=True, stderr=True, stream=False).decode('utf-8')
-                output = logs
-                error = ""
-                compilation_output = ""
-                
-                # Try to get separate streams if available
-                try:
-                    output = container.logs(stdout=True, stderr=False, stream=False).decode('utf-8')
-                    error = container.logs(stdout=False, stderr=True, stream=False).decode('utf-8')
-                    
-                    # For C++, compilation errors and runtime output can be mixed
-                    # If we're just checking syntax, the error stream contains compilation info
-                    if check_syntax_only:
-                        compilation_output = error
-                        error = error if exit_code != 0 else ""
-                    else:
-                        # Separate compilation errors from runtime errors
-                        if "error:" in error or "warning:" in error:
-                            compilation_output = error
-                        
-                except:
-                    # If separate streams fail, use combined logs
-                    pass
-                    
-            except Exception as log_error:
-                logger.warning(f"Could not retrieve container logs: {log_error}")
-                output = ""
-                error = f"Could not retrieve logs: {str(log_error)}"
-                compilation_output = ""
+                logger.error(f"Error during C++ compilation/execution: {e}")
+                return self._error_result(str(e))
+        
+        try:
+            files = {**(extra_files or {}), 'code.cpp': cpp_code.encode('utf-8')}
+            if stdin is not None:
+                files['input.txt'] = stdin.encode('utf-8')
             
-            success = exit_code == 0
+            steps, pch_requested = self._build_steps(cpp_code, timeout, check_syntax_only,
+                                                     compiler_flags, stdin is not None,
+                                                     files_with_suffix(extra_files or {}, SOURCE_SUFFIXES))
             
-            return CompilerResult(
-                success=success,
-                output=output,
-                error=error,
-                exit_code=exit_code,
-                execution_time=execution_time,
-                compilation_output=compilation_output
+            # Extra time for compilation on top of the program's own `timeout`
+            outcome = self.backend.run(
+                files,
+                timed_script(steps, self.backend.cgroup_stats),
+                timeout,
+                grace=10,
+                limits=self.output_limits or profile.output_limits(),
+                collect=self._collect_paths(),
+                profile=profile
             )
+            timings = build_timings(outcome, [name for name, _ in steps])
+            # Process rusage spans the whole command, so it only describes a single-step run
+            resource_usage = build_resource_usage(outcome.files, steps[-1][0],
+                                                  outcome.rusage if len(steps) == 1 else None)
+            if outcome.timed_out:
+                return self._timeout_result(timeout, outcome, timings, resource_usage, profile)
+            
+            captured = outcome.captured
+            build_info = self._build_info(outcome, pch_requested, captured.stderr, check_syntax_only)
+            compile_status = parse_step_times(outcome.files.get(TIMING_FILE)).get('compile', (0.0, 0))[1]
+            return self._build_result(outcome.exit_code, captured.stdout, captured.stderr,
+                                      outcome.execution_time, check_syntax_only, build_info,
+                                      captured.stats(), timings, resource_usage, profile,
+                                      compile_failed=compile_status != 0, file_transfer=outcome.transfer)
             
         except Exception as e:
             logger.error(f"Error during C++ compilation/execution: {e}")
-            return CompilerResult(
-                success=False,
-                output="",
-                error=str(e),
-                exit_code=-1,
-                execution_time=0.0,
-                compilation_output=""
-            )
-        
-        finally:
-            # Cleanup
-            if temp_file:
-                self._cleanup_temp_file(temp_file)
-            
-            # Remove container if it exists
-            if container:
-                try:
-                    container.remove(force=True)
-                except:
-                    pass
+            return self._error_result(str(e))
     
     def check_syntax(self, cpp_code: str) -> CompilerResult:
         """
@@ -221,18 +478,127 @@ class CppDockerCompiler:
         """
         return self.compile_and_run(cpp_code, check_syntax_only=True)
     
+    def judge(self, cpp_code: str, test_cases: List[TestCase], time_limit: float = 2.0,
+              parallelism: int = 1, compiler_flags: List[str] = None,
+              profile: Optional[str] = None,
+              extra_files: Optional[Dict[str, str]] = None) -> JudgeResult:
+        """
+        Compile C++ code once and run it against many stdin test cases inside a single sandbox
+        
+        Args:
+            cpp_code (str): C++ code to judge
+            test_cases (List[TestCase]): Inputs and expected outputs
+            time_limit (float): Seconds allowed per case
+            parallelism (int): Cases run at once inside the sandbox
+            compiler_flags (List[str]): Additional compiler flags
+            profile (str): Execution profile name; None for the default
+            extra_files (Dict[str, str]): Headers, sources and data files placed next to code.cpp
+            
+        Returns:
+            JudgeResult: Per-case verdicts (pass/fail/TLE/MLE/OLE/RE, or CE on a compile error) and timings
+            
+        Raises:
+            UnknownProfileError: If no profile has that name
+            SubmissionFileError: If extra_files is malformed or too large
+        """
+        limits = self.profiles.get(profile, "cpp")
+        extra = normalize_submission_files(extra_files, self.entry_file)
+        try:
+            key = artifact = None
+            if self.artifact_store:
+                key = self._artifact_key(cpp_code, compiler_flags, extra)
+                artifact = self.artifact_store.get(key)
+            
+            if artifact is not None:
+                # Stored binary: no compilation at all
+                data_files = {path: data for path, data in extra.items() if not path.endswith(SOURCE_SUFFIXES)}
+                result, _ = judge_in_sandbox(
+                    self.backend,
+                    files=data_files, cases=test_cases, run_command="./program",
+                    time_limit=time_limit, parallelism=parallelism,
+                    executables={'program': artifact.data},
+                    profile=limits
+                )
+                result.compile_output = artifact.metadata.get('compile_output', "")
+                return result
+            
+            compile_command, _ = self._compile_command(cpp_code, compiler_flags,
+                                                       sources=files_with_suffix(extra, SOURCE_SUFFIXES))
+            result, binary = judge_in_sandbox(
+                self.backend,
+                files={**extra, 'code.cpp': cpp_code.encode('utf-8')},
+                cases=test_cases,
+                run_command="./program",
+                time_limit=time_limit,
+                parallelism=parallelism,
+                compile_command=compile_command,
+                extract_path='program' if key else None,
+                profile=limits
+            )
+            if key and binary is not None:
+                self.artifact_store.put(key, binary, result.compile_time,
+                                        {'compile_output': result.compile_output})
+            return result
+        except Exception as e:
+            logger.error(f"Error during C++ judging: {e}")
+            return JudgeResult(success=False, passed=0, failed=len(test_cases), error=str(e))
+    
+    def stream_run(self, cpp_code: str, timeout: Optional[int] = None, compiler_flags: List[str] = None,
+                   max_output_bytes: int = DEFAULT_STREAM_MAX_BYTES,
+                   profile: Optional[str] = None,
+                   extra_files: Optional[Dict[str, str]] = None) -> Iterator[StreamEvent]:
+        """
+        Compile and run C++ code and yield compiler and program output incrementally
+        
+        Args:
+            cpp_code (str): C++ code to compile and run
+            timeout (int): Timeout in seconds for execution; defaults to the profile's
+            compiler_flags (List[str]): Additional compiler flags
+            max_output_bytes (int): Cap on stdout + stderr bytes forwarded, further capped by the profile
+            profile (str): Execution profile name; None for the default
+            extra_files (Dict[str, str]): Headers, sources and data files placed next to code.cpp
+            
+        Yields:
+            StreamEvent: stdout/stderr chunks, then an "exit" (or "error") event
+            
+        Raises:
+            UnknownProfileError: If no profile has that name
+            SubmissionFileError: If extra_files is malformed or too large
+        """
+        limits = self.profiles.get(profile, "cpp")
+        timeout = limits.resolve_timeout(timeout)
+        extra = normalize_submission_files(extra_files, self.entry_file)
+        steps, _ = self._build_steps(cpp_code, timeout, False, compiler_flags,
+                                     sources=files_with_suffix(extra, SOURCE_SUFFIXES))
+        return self.backend.stream(
+            files={**extra, 'code.cpp': cpp_code.encode('utf-8')},
+            command=sandboxed_script(steps),
+            timeout=timeout,
+            grace=10,  # Extra time for compilation
+            max_bytes=min(max_output_bytes, limits.max_output_bytes),
+            profile=limits
+        )
+    
     def get_available_images(self) -> list:
-        """Get list of available C++ Docker images"""
+        """Get list of available C++ Docker images from the cached local image index"""
         try:
-            images = self.client.images.list()
-            cpp_images = [
-                img.tags[0] for img in images 
-                if img.tags and any('gcc' in tag or 'clang' in tag or 'cpp' in tag for tag in img.tags)
-            ]
-            return cpp_images
+            return [tag for tag in self.backend.image_tags()
+                    if 'gcc' in tag or 'clang' in tag or 'cpp' in tag]
         except Exception as e:
             logger.error(f"Error getting C++ images: {e}")
             return []
+    
+    def get_pool_stats(self) -> Optional[Dict]:
+        """Get warm container pool statistics, or None if pooling is disabled"""
+        return self.backend.get_stats()
+    
+    def get_artifact_stats(self) -> Optional[Dict]:
+        """Get compiled-binary store statistics, or None if the store is disabled"""
+        return self.artifact_store.get_stats() if self.artifact_store else None
+    
+    def shutdown(self):
+        """Release pooled containers and other backend resources held by this compiler"""
+        self.backend.shutdown()
 
 def format_cpp_compiler_output(result: CompilerResult) -> str:
     """
@@ -251,6 +617,8 @@ def format_cpp_compiler_output(result: CompilerResult) -> str:
     output_lines.append(f"=== C++ COMPILATION RESULT: {status} ===")
     output_lines.append(f"Exit Code: {result.exit_code}")
     output_lines.append(f"Execution Time: {result.execution_time:.2f}s")
+    output_lines.extend(format_timings(result.timings))
+    output_lines.extend(format_resource_usage(result.resource_usage))
     output_lines.append("")
     
     # Compilation Output (warnings, errors)
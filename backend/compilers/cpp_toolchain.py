@@ -0,0 +1,212 @@
+"""
+C++ Toolchain Acceleration Module
+This module maintains precompiled headers for a common set of standard headers and a
+persistent ccache volume inside the gcc image, and decides per run whether they apply.
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from .result_cache import make_cache_key
+from .sandbox_reaper import sandbox_labels
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Mount points inside the sandbox
+PCH_MOUNT = "/opt/edurun/pch"
+CCACHE_MOUNT = "/opt/edurun/ccache"
+CCACHE_LOG_NAME = ".ccache.log"  # Written into the sandbox working directory
+CCACHE_LOG = f"/app/{CCACHE_LOG_NAME}"
+
+INCLUDE_PATTERN = re.compile(r'^\s*#\s*include\s*([<"])([^>"]+)[>"]', re.MULTILINE)
+
+
+@dataclass
+class CppToolchainConfig:
+    """Data class to hold precompiled header and ccache settings"""
+    pch_enabled: bool = True
+    pch_headers: List[str] = field(default_factory=lambda: [
+        "iostream", "string", "vector", "algorithm", "map", "set",
+        "unordered_map", "unordered_set", "queue", "stack", "utility",
+        "cmath", "cstdio", "cstdlib", "sstream", "iomanip",
+    ])
+    pch_volume: str = "edurun-cpp-pch"
+    # The ccache volume is writable by sandboxed programs, so only enable it for trusted submissions
+    ccache_enabled: bool = False
+    ccache_volume: str = "edurun-ccache"
+    ccache_max_size: str = "1G"
+
+
+def parse_includes(cpp_code: str) -> Tuple[List[str], bool]:
+    """
+    Find the headers a C++ source includes
+
+    Args:
+        cpp_code (str): C++ source code
+
+    Returns:
+        tuple: (system header names, True if any quoted "local" include is present)
+    """
+    system_headers = []
+    has_local = False
+    for delimiter, name in INCLUDE_PATTERN.findall(cpp_code):
+        if delimiter == '"':
+            has_local = True
+        else:
+            system_headers.append(name.strip())
+    return system_headers, has_local
+
+
+class CppToolchain:
+    """
+    Builds and tracks precompiled headers and ccache settings for one gcc image
+    """
+
+    def __init__(self, client, docker_image: str, image_id: str,
+                 config: Optional[CppToolchainConfig] = None):
+        """
+        Initialize the toolchain helper
+
+        Args:
+            client: Docker client
+            docker_image (str): gcc image the sandboxes run
+            image_id (str): Resolved image id, used to key PCH builds per compiler version
+            config (CppToolchainConfig): PCH and ccache settings
+        """
+        self.client = client
+        self.docker_image = docker_image
+        self.image_id = image_id
+        self.config = config or CppToolchainConfig()
+        self.ccache_enabled = False
+        self._pch_paths: Dict[str, Optional[str]] = {}  # flag key -> header path (None = build failed)
+        self._lock = threading.Lock()
+
+    def prepare(self, default_flags: List[str]):
+        """
+        Detect ccache in the image and pre-build the PCH for the default flags
+
+        Args:
+            default_flags (List[str]): Compiler flags most runs will use
+        """
+        if self.config.ccache_enabled:
+            exit_code, _ = self._run_helper("command -v ccache", volumes={})
+            self.ccache_enabled = exit_code == 0
+            if not self.ccache_enabled:
+                logger.warning(f"ccache not found in {self.docker_image}; ccache disabled")
+        if self.config.pch_enabled:
+            self._ensure_pch(default_flags)
+
+    def _run_helper(self, script: str, volumes: Dict) -> Tuple[int, str]:
+        """Run a one-off maintenance command in the gcc image"""
+        container = None
+        try:
+            container = self.client.containers.run(
+                image=self.docker_image,
+                command=["bash", "-c", script],
+                volumes=volumes,
+                labels=sandbox_labels('helper'),
+                detach=True
+            )
+            exit_code = container.wait(timeout=300)['StatusCode']
+            logs = container.logs(stdout=True, stderr=True).decode('utf-8', errors='replace')
+            return exit_code, logs
+        except Exception as e:
+            logger.error(f"C++ toolchain helper failed: {e}")
+            return -1, str(e)
+        finally:
+            if container:
+                try:
+                    container.remove(force=True)
+                except Exception:
+                    pass
+
+    def _ensure_pch(self, compiler_flags: List[str]) -> Optional[str]:
+        """Build (once per image + flag set) the precompiled common header"""
+        key = make_cache_key(image=self.image_id, flags=compiler_flags,
+                             headers=self.config.pch_headers)[:16]
+        with self._lock:
+            if key in self._pch_paths:
+                return self._pch_paths[key]
+
+            directory = f"{PCH_MOUNT}/{key}"
+            header = f"{directory}/edurun_pch.h"
+            lines = " ".join(f"'#include <{name}>'" for name in self.config.pch_headers)
+            script = (
+                f"set -e; mkdir -p {directory}; cd {directory}; "
+                f"[ -f edurun_pch.h.gch ] && exit 0; "
+                f"printf '%s\\n' {lines} > edurun_pch.h; "
+                f"g++ {' '.join(compiler_flags)} -x c++-header edurun_pch.h -o edurun_pch.h.gch.$$; "
+                f"mv edurun_pch.h.gch.$$ edurun_pch.h.gch"
+            )
+            exit_code, logs = self._run_helper(
+                script, volumes={self.config.pch_volume: {'bind': PCH_MOUNT, 'mode': 'rw'}}
+            )
+            if exit_code == 0:
+                logger.info(f"Precompiled header ready for flags {' '.join(compiler_flags)}")
+                self._pch_paths[key] = header
+            else:
+                logger.warning(f"Failed to build precompiled header: {logs.strip()}")
+                self._pch_paths[key] = None
+            return self._pch_paths[key]
+
+    def pch_for(self, cpp_code: str, compiler_flags: List[str]) -> Optional[str]:
+        """
+        Get the precompiled header to force-include, if the source's includes are covered
+
+        Args:
+            cpp_code (str): C++ source code
+            compiler_flags (List[str]): Compiler flags of this run
+
+        Returns:
+            str: Path of the header inside the sandbox, or None if PCH does not apply
+        """
+        if not self.config.pch_enabled:
+            return None
+        system_headers, has_local = parse_includes(cpp_code)
+        if has_local or not set(system_headers) <= set(self.config.pch_headers):
+            return None
+        return self._ensure_pch(compiler_flags)
+
+    def container_options(self, volumes: Optional[Dict] = None) -> Dict:
+        """
+        Get the volumes and environment a sandbox needs to use the PCH and ccache
+
+        Args:
+            volumes (Dict): Run-specific volumes to merge in
+
+        Returns:
+            Dict: Keyword arguments for `containers.run` / `containers.create`
+        """
+        merged = dict(volumes or {})
+        environment = {}
+        if self.config.pch_enabled:
+            merged[self.config.pch_volume] = {'bind': PCH_MOUNT, 'mode': 'ro'}
+        if self.ccache_enabled:
+            merged[self.config.ccache_volume] = {'bind': CCACHE_MOUNT, 'mode': 'rw'}
+            environment = {
+                'CCACHE_DIR': CCACHE_MOUNT,
+                'CCACHE_MAXSIZE': self.config.ccache_max_size,
+                'CCACHE_LOGFILE': CCACHE_LOG,
+                'CCACHE_SLOPPINESS': 'pch_defines,time_macros,include_file_mtime,include_file_ctime',
+            }
+        return {'volumes': merged, 'environment': environment}
+
+    def read_ccache_hit(self, log: Optional[bytes]) -> Optional[bool]:
+        """
+        Check the per-run ccache log for a cache hit
+
+        Args:
+            log (bytes): Contents of the ccache log read back from the sandbox, or None
+
+        Returns:
+            bool: True on a hit, False on a miss, None if ccache is off or the log is missing
+        """
+        if not self.ccache_enabled or log is None:
+            return None
+        text = log.decode('utf-8', errors='replace')
+        return 'cache hit' in text or 'cache_hit' in text
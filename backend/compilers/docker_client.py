@@ -0,0 +1,284 @@
+"""
+Docker Client Module
+This module provides one Docker client shared by all the compilers, with a connection pool
+sized for concurrent sandboxes, retries with backoff on transient daemon errors, and a
+circuit breaker that fails runs fast while the daemon is unreachable. The Docker SDK is
+imported on first connect, so local-backend processes never load it.
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+import logging
+
+from .metrics import registry
+from .image_manager import ImageManager
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DOCKER_CALLS_TOTAL = registry.counter(
+    'edurun_docker_calls_total',
+    'Guarded Docker daemon operations by result (ok, error, retried or rejected by the open circuit)',
+    ['result'])
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DockerUnavailableError(ConnectionError):
+    """Raised instead of calling the daemon while the circuit breaker is open"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class DockerClientConfig:
+    """Data class to hold the shared Docker client settings"""
+    pool_size: int = 32  # Keep-alive connections to the daemon; size to the number of concurrent sandboxes
+    timeout: int = 60  # Seconds an API call may take
+    connect_retries: int = 3  # Reconnect attempts when the daemon socket refuses or drops a connection
+    retries: int = 2  # Extra attempts of idempotent calls (ping, image lookups) on a transient error
+    backoff: float = 0.2  # First retry delay in seconds; doubles per attempt, with jitter
+    max_backoff: float = 5.0  # Ceiling on a retry delay of an idempotent call
+    failure_threshold: int = 5  # Consecutive daemon failures that open the circuit
+    reset_timeout: float = 30.0  # Seconds the circuit stays open before one probe is let through
+    pull_missing_images: bool = True  # Pull a backend's image when it starts if it is not present locally
+    image_pins: Dict[str, str] = field(default_factory=dict)  # Digests configured image tags must run at
+    image_index_ttl: float = 60.0  # Seconds the cached list of local images is reused
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Tell whether an error means the daemon itself failed, as opposed to the request
+
+    Connection failures, timeouts and 5xx responses count; a missing image (404) or a
+    name conflict (409) does not.
+    """
+    import docker
+    import requests
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, docker.errors.APIError):
+        return error.is_server_error()
+    if isinstance(error, docker.errors.DockerException) and error.__cause__ is not None:
+        return is_transient(error.__cause__)  # e.g. the API version lookup when the client connects
+    return False
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive daemon failures and, past a threshold, rejects calls for a while
+
+    Closed: calls go through. Open: calls are rejected until reset_timeout has passed.
+    Half open: a single probe call goes through; its success closes the circuit, its
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._opened_total = 0
+        self._last_error = None
+
+    def _retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self):
+        """
+        Admit a call, or reject it while the circuit is open
+
+        Raises:
+            DockerUnavailableError: If the circuit is open, or half open with a probe in flight
+        """
+        with self._lock:
+            if self._state == OPEN and self._retry_after() <= 0:
+                self._state = HALF_OPEN
+                self._probing = False
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            if self._state != CLOSED:
+                retry_after = self._retry_after() or 1.0
+                raise DockerUnavailableError(
+                    f"Docker daemon unavailable ({self._last_error}); retry in {retry_after:.0f}s",
+                    retry_after)
+
+    def record_success(self):
+        """Close the circuit after a call the daemon answered"""
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Docker daemon reachable again; closing the circuit")
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self, error: BaseException):
+        """Count a daemon failure, opening the circuit at the threshold or after a failed probe"""
+        with self._lock:
+            self._failures += 1
+            self._last_error = f"{type(error).__name__}: {error}"
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                logger.error(f"Opening the Docker circuit for {self.reset_timeout:g}s after "
+                             f"{self._failures} consecutive failures: {self._last_error}")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._opened_total += 1
+                self._probing = False
+
+    def is_open(self) -> bool:
+        """Tell whether calls are currently being rejected (False once a probe is due)"""
+        with self._lock:
+            return self._state == OPEN and self._retry_after() > 0
+
+    def retry_after(self) -> float:
+        """Get the seconds until the next probe is let through, 0 if the circuit is closed"""
+        with self._lock:
+            return self._retry_after() if self._state == OPEN else 0.0
+
+    def get_stats(self) -> Dict:
+        """Get the circuit state, failure count and the last error seen"""
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'opened_total': self._opened_total,
+                'retry_after': round(self._retry_after(), 1) if self._state == OPEN else 0.0,
+                'last_error': self._last_error,
+            }
+
+
+class DockerClientManager:
+    """
+    Owns the Docker client the compilers share and guards calls to the daemon
+    """
+
+    def __init__(self, config: Optional[DockerClientConfig] = None, client=None):
+        """
+        Initialize the manager; the client connects on first use
+
+        Args:
+            config (DockerClientConfig): Connection pool, retry and circuit breaker settings
+            client: Existing Docker client to use instead of connecting
+        """
+        self.config = config or DockerClientConfig()
+        self.breaker = CircuitBreaker(self.config.failure_threshold, self.config.reset_timeout)
+        self.images = ImageManager(self, pins=self.config.image_pins,
+                                   pull_missing=self.config.pull_missing_images,
+                                   index_ttl=self.config.image_index_ttl)
+        self._client = client
+        self._lock = threading.Lock()
+
+    def get_client(self):
+        """
+        Get the shared client, connecting and pinging the daemon on the first call
+
+        Raises:
+            ConnectionError: If Docker is not running or not accessible
+        """
+        with self._lock:
+            if self._client is None:
+                self._client = self._connect()
+            return self._client
+
+    def _connect(self):
+        """Create the client with a sized keep-alive pool and reconnect retries, then ping"""
+        import docker
+        from urllib3.util.retry import Retry
+        try:
+            client = self.call(docker.from_env, max_pool_size=self.config.pool_size, timeout=self.config.timeout)
+            # Reconnects are safe for every method: the request never reached the daemon
+            retry = Retry(total=self.config.connect_retries, connect=self.config.connect_retries,
+                          read=0, status=0, other=0, backoff_factor=self.config.backoff,
+                          raise_on_status=False)
+            for adapter in client.api.adapters.values():
+                adapter.max_retries = retry
+            self.call(client.ping)
+            logger.info(f"Docker client initialized successfully (pool of {self.config.pool_size} connections)")
+            return client
+        except Exception as e:
+            logger.error(f"Failed to initialize Docker client: {e}")
+            raise ConnectionError("Docker is not running or not accessible")
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """
+        Run a block of daemon calls under the circuit breaker
+
+        The block is rejected up front while the circuit is open. A transient error it
+        raises counts as a daemon failure; finishing, or failing for any other reason,
+        shows the daemon answered.
+
+        Raises:
+            DockerUnavailableError: If the circuit is open
+        """
+        try:
+            self.breaker.before_call()
+        except DockerUnavailableError:
+            DOCKER_CALLS_TOTAL.inc(result="rejected")
+            raise
+        try:
+            yield
+        except BaseException as e:
+            if is_transient(e):
+                self.breaker.record_failure(e)
+                DOCKER_CALLS_TOTAL.inc(result="error")
+            else:
+                self.breaker.record_success()
+                DOCKER_CALLS_TOTAL.inc(result="ok")
+            raise
+        self.breaker.record_success()
+        DOCKER_CALLS_TOTAL.inc(result="ok")
+
+    def guard_iter(self, events: Iterator) -> Iterator:
+        """Consume an iterator of daemon-backed events (a streamed run) under the circuit breaker"""
+        with self.guard():
+            yield from events
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call an idempotent daemon operation, retrying transient errors with backoff
+
+        Raises:
+            DockerUnavailableError: If the circuit is open
+        """
+        attempt = 0
+        while True:
+            try:
+                with self.guard():
+                    return fn(*args, **kwargs)
+            except DockerUnavailableError:
+                raise
+            except Exception as e:
+                if attempt >= self.config.retries or not is_transient(e):
+                    raise
+                delay = min(self.config.max_backoff, self.config.backoff * (2 ** attempt))
+                attempt += 1
+                DOCKER_CALLS_TOTAL.inc(result="retried")
+                logger.warning(f"Transient Docker error ({e}); retry {attempt} in {delay:.2f}s")
+                time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def available(self) -> bool:
+        """Tell whether runs are being admitted (the circuit is not open)"""
+        return not self.breaker.is_open()
+
+    def get_stats(self) -> Dict:
+        """Get the connection pool size and circuit breaker state"""
+        return {
+            'connected': self._client is not None,
+            'pool_size': self.config.pool_size,
+            **self.breaker.get_stats(),
+        }
@@ -0,0 +1,845 @@
+"""
+Execution Backend Module
+This module defines the interface the compilers use to run a shell command against a set
+of files in an isolated working directory, with a Docker implementation (warm pool or
+fresh containers) and a low-overhead local implementation (a subprocess under rlimits).
+"""
+
+import hashlib
+import importlib.util
+import os
+import posixpath
+import resource
+import selectors
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+
+from .container_pool import ContainerPool, PoolConfig, TIMEOUT_EXIT_CODES, build_archive, extract_tree
+from .log_capture import (OutputLimits, CapturedOutput, CaptureTimeout, capture_frames, exec_and_capture,
+                          run_and_capture)
+from .output_stream import StreamEvent, OutputCap, stream_command, DEFAULT_STREAM_MAX_BYTES
+from .result_cache import resolve_image_id
+from .metrics import PhaseTimer, SANDBOX_INPUT_BYTES_TOTAL, run_outcome
+from .execution_profiles import ExecutionProfile
+from .docker_client import DockerClientManager
+from .sandbox_reaper import sandbox_labels, scratch_prefix
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Working directory of a Docker sandbox; commands use paths relative to it
+DOCKER_WORKDIR = "/app"
+
+# Where the timed script records step timings and usage, outside the working directory the
+# program can write. In a container it is a root-only directory; a local run gets a directory
+# of its own next to its working directory, passed in EDURUN_META. `collect` paths under it
+# are read from there.
+INSTRUMENTATION_DIR = "/run/edurun"
+
+# Memory-backed directory local working directories go in when it has room, so runs write no disk
+SHM_DIR = "/dev/shm"
+MIN_SHM_FREE_BYTES = 256 * 1024 * 1024
+
+# Filesystems whose files live in memory
+MEMORY_FILESYSTEMS = ("tmpfs", "ramfs")
+
+# Syscalls a local sandbox may not make when the libseccomp bindings are installed
+DENIED_SYSCALLS = (
+    "ptrace", "mount", "umount2", "pivot_root", "chroot", "swapon", "swapoff", "reboot",
+    "kexec_load", "init_module", "finit_module", "delete_module", "bpf", "perf_event_open",
+    "keyctl", "add_key", "request_key",
+)
+
+# Installs a seccomp filter for the syscalls in argv[1], then execs argv[2:]
+SECCOMP_LAUNCHER = """
+import errno, os, sys, seccomp
+rules = seccomp.SyscallFilter(defaction=seccomp.ALLOW)
+for name in sys.argv[1].split(','):
+    try:
+        rules.add_rule(seccomp.ERRNO(errno.EPERM), name)
+    except Exception:
+        pass
+rules.load()
+os.execvp(sys.argv[2], sys.argv[2:])
+"""
+
+
+@dataclass
+class ExecutionOutcome:
+    """Data class to hold the outcome of one sandboxed command"""
+    exit_code: int
+    captured: CapturedOutput
+    execution_time: float
+    timed_out: bool = False  # True if the backend killed the command at timeout + grace
+    files: Dict[str, bytes] = field(default_factory=dict)  # Collected files, keyed by relative path
+    phases: Dict[str, float] = field(default_factory=dict)  # Seconds spent per phase (create, start, run, ...)
+    rusage: Dict[str, int] = field(default_factory=dict)  # Whole-command max_rss_bytes and block I/O, where measured
+    transfer: Dict = field(default_factory=dict)  # How the input files reached the sandbox (see record_transfer)
+
+
+def record_transfer(language: str, backend: str, method: str, files: Optional[Dict[str, bytes]],
+                    executables: Optional[Dict[str, bytes]] = None) -> Dict:
+    """
+    Count the bytes delivered into a sandbox and describe how they got there
+
+    Args:
+        language (str): Language label
+        backend (str): Backend label ("docker" or "local")
+        method (str): "archive" (in-memory tar stream), "tmpfs" or "disk" (files written on the host)
+        files (Dict[str, bytes]): Files delivered
+        executables (Dict[str, bytes]): Executables delivered
+
+    Returns:
+        Dict: method, files, bytes and host_disk_bytes (bytes written to the host's disk)
+    """
+    sizes = [len(data) for data in list((files or {}).values()) + list((executables or {}).values())]
+    total = sum(sizes)
+    SANDBOX_INPUT_BYTES_TOTAL.inc(total, language=language, backend=backend, method=method)
+    return {
+        'method': method,
+        'files': len(sizes),
+        'bytes': total,
+        'host_disk_bytes': total if method == "disk" else 0,
+    }
+
+
+def merge_transfers(*transfers: Dict) -> Dict:
+    """Add up the transfer reports of several sandbox runs that produced one result"""
+    transfers = [transfer for transfer in transfers if transfer]
+    if not transfers:
+        return {}
+    return {
+        'method': transfers[-1]['method'],
+        'files': sum(transfer['files'] for transfer in transfers),
+        'bytes': sum(transfer['bytes'] for transfer in transfers),
+        'host_disk_bytes': sum(transfer['host_disk_bytes'] for transfer in transfers),
+    }
+
+
+class ExecutionBackend:
+    """
+    Interface for running shell commands against files in an isolated working directory
+
+    Commands run under bash with the working directory as cwd and refer to their files by
+    relative path. The backend kills a command `timeout + grace` seconds after it starts;
+    commands that need a tighter limit on part of their work (e.g. the program after a
+    compilation step) enforce it themselves with `timeout`.
+    """
+
+    name = "base"
+    cgroup_stats = False  # True if each sandbox has its own cgroup, readable at /sys/fs/cgroup
+
+    def run(self, files: Dict[str, bytes], command: str, timeout: float, grace: float = 0,
+            limits: Optional[OutputLimits] = None,
+            executables: Optional[Dict[str, bytes]] = None,
+            collect: Optional[List[str]] = None,
+            profile: Optional[ExecutionProfile] = None) -> ExecutionOutcome:
+        """
+        Run a command to completion and capture its output
+
+        Args:
+            files (Dict[str, bytes]): Files written into the working directory
+            command (str): Shell command to run
+            timeout (float): Seconds the command may run
+            grace (float): Extra seconds (startup, compilation) before it is killed
+            limits (OutputLimits): Per-stream byte and line limits
+            executables (Dict[str, bytes]): Files written with mode 0755
+            collect (List[str]): Files or directories read back after the run
+            profile (ExecutionProfile): Resource limits of the sandbox; None for the backend's defaults
+
+        Returns:
+            ExecutionOutcome: Exit code, captured output and collected files
+        """
+        raise NotImplementedError
+
+    def stream(self, files: Dict[str, bytes], command: str, timeout: float, grace: float = 5,
+               max_bytes: int = DEFAULT_STREAM_MAX_BYTES,
+               profile: Optional[ExecutionProfile] = None) -> Iterator[StreamEvent]:
+        """
+        Run a command and yield its output while it runs
+
+        Yields:
+            StreamEvent: Output chunks, an optional "truncated" event, then one "exit" event
+        """
+        raise NotImplementedError
+
+    def image_id(self) -> str:
+        """Get an identifier of the runtime, used in cache keys"""
+        raise NotImplementedError
+
+    def image_tags(self) -> List[str]:
+        """Get the tags of the images available to this backend"""
+        return []
+
+    def get_stats(self) -> Optional[Dict]:
+        """Get backend statistics (e.g. warm pool counters), or None"""
+        return None
+
+    def shutdown(self):
+        """Release resources held by the backend"""
+        pass
+
+
+class DockerBackend(ExecutionBackend):
+    """
+    Runs commands in warm pooled containers via exec, or in a fresh container per run
+    """
+
+    name = "docker"
+    cgroup_stats = True
+
+    def __init__(self, docker_image: str, language: str = "generic",
+                 run_options: Optional[Dict] = None, client=None,
+                 clients: Optional[DockerClientManager] = None):
+        """
+        Initialize the backend and connect to the Docker daemon
+
+        Args:
+            docker_image (str): Image the sandboxes run
+            language (str): Language label used in logs and pool container labels
+            run_options (Dict): Extra `containers.create` options (volumes, environment)
+            client: Existing Docker client to use instead of connecting
+            clients (DockerClientManager): Shared client and circuit breaker; defaults to one
+                of this backend's own
+
+        Raises:
+            ConnectionError: If Docker is not running or not accessible
+            ImageNotReadyError: If the image is missing and cannot be pulled
+        """
+        self.docker_image = docker_image
+        self.language = language
+        self.run_options = dict(run_options or {})
+        self.pool_config = None  # Set by start_pool; None runs every command in a fresh container
+        self.pools: Dict[str, ContainerPool] = {}  # Warm pools by execution profile name
+        self._pools_lock = threading.Lock()
+        self._image_id = None
+        self.clients = clients or DockerClientManager(client=client)
+        self.client = self.clients.get_client()
+        # Pull the image now rather than in a user's run, and run the digest the tag resolves to today
+        self.docker_image = self.clients.images.prepare(docker_image)
+
+    def start_pool(self, config: Optional[PoolConfig] = None,
+                   profile: Optional[ExecutionProfile] = None):
+        """
+        Pre-start warm containers; later runs exec into them instead of creating containers
+
+        Containers are created with a profile's limits baked in, so each profile gets its
+        own pool; the one for `profile` starts now, others on their first run.
+
+        Args:
+            config (PoolConfig): Pool sizing and lifecycle settings
+            profile (ExecutionProfile): Profile whose pool is warmed up front
+        """
+        self.pool_config = config or PoolConfig()
+        self._pool_for(profile)
+
+    def _container_options(self, profile: Optional[ExecutionProfile]) -> Dict:
+        """Combine the backend's own container options with a profile's limits"""
+        return {**self.run_options, **(profile.container_options() if profile else {})}
+
+    def _pool_for(self, profile: Optional[ExecutionProfile]) -> Optional[ContainerPool]:
+        """Get (starting it if needed) the warm pool for a profile, or None if pooling is off"""
+        if self.pool_config is None:
+            return None
+        name = profile.name if profile else ""
+        with self._pools_lock:
+            pool = self.pools.get(name)
+            if pool is None:
+                label = f"{self.language}-{name}" if name else self.language
+                pool = ContainerPool(self.client, self.docker_image, self.pool_config,
+                                     language=label, run_options=self._container_options(profile))
+                pool.start()
+                self.pools[name] = pool
+            return pool
+
+    def image_id(self) -> str:
+        """Get the local image id the tag resolves to"""
+        if self._image_id is None:
+            self._image_id = self.clients.call(resolve_image_id, self.client, self.docker_image)
+        return self._image_id
+
+    def image_tags(self) -> List[str]:
+        """Get the tags of the daemon's local images, from the cached index"""
+        return self.clients.images.tags()
+
+    def _collect(self, container, paths: Optional[List[str]]) -> Dict[str, bytes]:
+        """Read files and directories back out of a container, skipping missing ones"""
+        collected = {}
+        for path in paths or []:
+            parent = os.path.dirname(path)
+            try:
+                tree = extract_tree(container, posixpath.join(DOCKER_WORKDIR, path))
+            except Exception:
+                continue
+            for name, data in tree.items():
+                collected[os.path.join(parent, name)] = data
+        return collected
+
+    def run(self, files: Dict[str, bytes], command: str, timeout: float, grace: float = 0,
+            limits: Optional[OutputLimits] = None,
+            executables: Optional[Dict[str, bytes]] = None,
+            collect: Optional[List[str]] = None,
+            profile: Optional[ExecutionProfile] = None) -> ExecutionOutcome:
+        """
+        Run a command in a pooled or fresh container (see ExecutionBackend.run)
+
+        Raises:
+            DockerUnavailableError: If recent daemon failures opened the circuit breaker
+        """
+        with self.clients.guard():
+            pool = self._pool_for(profile)
+            if pool:
+                return self._run_in_pool(pool, files, command, timeout, grace, limits, executables, collect)
+            return self._run_cold(files, command, timeout, grace, limits, executables, collect,
+                                  self._container_options(profile))
+
+    def _run_in_pool(self, pool: ContainerPool, files: Dict[str, bytes], command: str,
+                     timeout: float, grace: float,
+                     limits: Optional[OutputLimits], executables: Optional[Dict[str, bytes]],
+                     collect: Optional[List[str]]) -> ExecutionOutcome:
+        """Run a command inside a warm pooled container via exec"""
+        start_time = time.time()
+        phases = PhaseTimer()
+        with phases.phase('acquire'):
+            pooled = pool.acquire()
+        reusable = True
+        outcome = None
+
+        try:
+            with phases.phase('copy'):
+                if files:
+                    pool.put_files(pooled, files)
+                if executables:
+                    pool.put_files(pooled, executables, mode=0o755)
+            transfer = record_transfer(self.language, self.name, "archive", files, executables)
+
+            # `timeout` inside the container replaces the cold path's kill timer
+            exit_code, captured = exec_and_capture(
+                self.client, pooled.container,
+                ["timeout", "-s", "KILL", f"{timeout + grace}s", "bash", "-c", command],
+                pool.config.workdir, limits, phases
+            )
+            execution_time = time.time() - start_time
+            with phases.phase('collect'):
+                collected = self._collect(pooled.container, collect)
+
+            # A killed run may leave processes behind; replace the container
+            reusable = exit_code not in TIMEOUT_EXIT_CODES
+            outcome = ExecutionOutcome(
+                exit_code=exit_code,
+                captured=captured,
+                execution_time=execution_time,
+                timed_out=exit_code in TIMEOUT_EXIT_CODES and execution_time >= timeout + grace,
+                files=collected,
+                phases=phases.phases,
+                transfer=transfer
+            )
+            return outcome
+        except Exception:
+            reusable = False
+            raise
+        finally:
+            with phases.phase('teardown'):
+                pool.release(pooled, reusable=reusable)
+            phases.record(self.language, self.name,
+                          run_outcome(outcome.exit_code, outcome.timed_out) if outcome else "error")
+
+    def _run_cold(self, files: Dict[str, bytes], command: str, timeout: float, grace: float,
+                  limits: Optional[OutputLimits], executables: Optional[Dict[str, bytes]],
+                  collect: Optional[List[str]], options: Dict) -> ExecutionOutcome:
+        """Run a command in a fresh container that is removed afterwards"""
+        start_time = time.time()
+        phases = PhaseTimer()
+        container = None
+        outcome = None
+
+        try:
+            with phases.phase('create'):
+                container = self.client.containers.create(
+                    image=self.docker_image,
+                    command=["bash", "-c", command],
+                    working_dir=DOCKER_WORKDIR,
+                    labels=sandbox_labels('run'),
+                    **options
+                )
+            with phases.phase('copy'):
+                if files and not container.put_archive(DOCKER_WORKDIR, build_archive(files)):
+                    raise RuntimeError("Failed to copy code into sandbox container")
+                if executables and not container.put_archive(DOCKER_WORKDIR,
+                                                             build_archive(executables, mode=0o755)):
+                    raise RuntimeError("Failed to copy executable into sandbox container")
+            transfer = record_transfer(self.language, self.name, "archive", files, executables)
+
+            # Stream stdout/stderr once while the container runs, killing it on timeout
+            timed_out = False
+            try:
+                exit_code, captured = run_and_capture(container, timeout, grace, limits, phases)
+            except CaptureTimeout as e:
+                # Keep what the program printed before the kill, as the pool path does
+                timed_out = True
+                exit_code, captured = -1, e.captured
+            execution_time = time.time() - start_time
+            with phases.phase('collect'):
+                collected = self._collect(container, collect)
+
+            outcome = ExecutionOutcome(
+                exit_code=exit_code,
+                captured=captured,
+                execution_time=execution_time,
+                timed_out=timed_out,
+                files=collected,
+                phases=phases.phases,
+                transfer=transfer
+            )
+            return outcome
+        finally:
+            # Remove container if it exists
+            with phases.phase('teardown'):
+                if container:
+                    try:
+                        container.remove(force=True)
+                    except:
+                        pass
+            phases.record(self.language, self.name,
+                          run_outcome(outcome.exit_code, outcome.timed_out) if outcome else "error")
+
+    def stream(self, files: Dict[str, bytes], command: str, timeout: float, grace: float = 5,
+               max_bytes: int = DEFAULT_STREAM_MAX_BYTES,
+               profile: Optional[ExecutionProfile] = None) -> Iterator[StreamEvent]:
+        """Run a command in a pooled or fresh container and stream its output"""
+        record_transfer(self.language, self.name, "archive", files)
+        return self.clients.guard_iter(self._stream(files, command, timeout, grace, max_bytes, profile))
+
+    def _stream(self, files: Dict[str, bytes], command: str, timeout: float, grace: float,
+                max_bytes: int, profile: Optional[ExecutionProfile]) -> Iterator[StreamEvent]:
+        """Start the pool lazily inside the guarded iteration, then stream"""
+        yield from stream_command(self.client, self.docker_image, self._pool_for(profile), files, command,
+                                  timeout, grace=grace, max_bytes=max_bytes,
+                                  run_options=self._container_options(profile))
+
+    def get_stats(self) -> Optional[Dict]:
+        """
+        Get warm container pool statistics, or None if pooling is disabled
+
+        The first pool started (the default profile's) is reported at the top level;
+        pools of other profiles are listed under 'profiles'.
+        """
+        with self._pools_lock:
+            pools = list(self.pools.items())
+        if not pools:
+            return None
+        stats = pools[0][1].get_stats()
+        stats['profiles'] = {name: pool.get_stats() for name, pool in pools[1:]}
+        return stats
+
+    def shutdown(self):
+        """Release pooled containers"""
+        with self._pools_lock:
+            pools, self.pools = list(self.pools.values()), {}
+        for pool in pools:
+            pool.shutdown()
+
+
+@dataclass
+class LocalSandboxConfig:
+    """Data class to hold local subprocess sandbox limits"""
+    memory_bytes: Optional[int] = 1024 * 1024 * 1024  # Address space (ulimit -v); None = unlimited
+    max_file_bytes: int = 64 * 1024 * 1024  # Largest file a run may write (ulimit -f)
+    max_open_files: int = 256  # ulimit -n
+    max_processes: Optional[int] = None  # ulimit -u counts every process of the user, so off by default
+    isolate_network: bool = True  # Run in new user, network and PID namespaces when `unshare` allows it
+    use_seccomp: bool = True  # Deny DENIED_SYSCALLS when the libseccomp Python bindings are installed
+    scratch_dir: Optional[str] = None  # Parent of the run directories; None for SHM_DIR when it has room, else the temp dir
+
+
+def filesystem_type(path: str) -> Optional[str]:
+    """Get the type of the filesystem a path is on (e.g. "tmpfs", "ext4") from /proc/mounts, or None"""
+    path = os.path.realpath(path)
+    best, fs_type = "", None
+    try:
+        with open("/proc/mounts") as mounts:
+            for line in mounts:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount_point = parts[1].replace("\\040", " ")
+                inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+                if inside and len(mount_point) >= len(best):
+                    best, fs_type = mount_point, parts[2]
+    except OSError:
+        return None
+    return fs_type
+
+
+def _pipe_frames(process: subprocess.Popen) -> Iterator[Tuple[Optional[bytes], Optional[bytes]]]:
+    """Read a process's stdout and stderr pipes as demultiplexed (stdout, stderr) frames"""
+    selector = selectors.DefaultSelector()
+    selector.register(process.stdout, selectors.EVENT_READ, 0)
+    selector.register(process.stderr, selectors.EVENT_READ, 1)
+    try:
+        open_pipes = 2
+        while open_pipes:
+            for key, _ in selector.select():
+                chunk = os.read(key.fileobj.fileno(), 65536)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    open_pipes -= 1
+                elif key.data == 0:
+                    yield chunk, None
+                else:
+                    yield None, chunk
+    finally:
+        selector.close()
+
+
+class LocalBackend(ExecutionBackend):
+    """
+    Runs commands as host subprocesses in a throwaway directory under resource limits
+
+    There is no container start-up cost, so short runs finish in tens of milliseconds, but
+    isolation is only as strong as rlimits plus (where permitted) user/network/PID
+    namespaces and seccomp. Use it on trusted grading hosts and for development without
+    a Docker daemon.
+
+    The command never drops privileges here, so the per-run EDURUN_META directory that
+    stands in for INSTRUMENTATION_DIR is writable by the program. Step timings, usage
+    snapshots and judge status files from this backend are advisory: a program can
+    rewrite them. Only the wait4 rusage and the backend's own phase times are measured
+    outside its reach.
+    """
+
+    name = "local"
+
+    def __init__(self, language: str = "generic", tools: Optional[Dict[str, str]] = None,
+                 config: Optional[LocalSandboxConfig] = None):
+        """
+        Initialize the backend
+
+        Args:
+            language (str): Language label used in logs and the runtime id
+            tools (Dict[str, str]): Command names mapped to host executables, e.g.
+                {"python": sys.executable}; they are put first on the sandbox PATH
+            config (LocalSandboxConfig): Resource limits and isolation settings
+
+        Raises:
+            RuntimeError: If a tool cannot be found on this host
+        """
+        self.language = language
+        self.config = config or LocalSandboxConfig()
+        self.tools = {}
+        for name, executable in (tools or {}).items():
+            resolved = shutil.which(executable) if executable else None
+            if not resolved:
+                raise RuntimeError(f"'{executable or name}' not found on this host")
+            self.tools[name] = os.path.realpath(resolved)
+
+        # Shims so commands written for the Docker images ("python", "node") find the host tools
+        self._bin_dir = tempfile.mkdtemp(prefix=scratch_prefix("bin", language))
+        for name, executable in self.tools.items():
+            os.symlink(executable, os.path.join(self._bin_dir, name))
+
+        self._prefix = self._isolation_prefix()
+        self._image_id = None
+        self.scratch_dir, self.transfer_method = self._scratch_location()
+        logger.info(f"Local {language} backend ready (isolation: {' '.join(self._prefix) or 'rlimits only'}, "
+                    f"run directories: {self.scratch_dir} ({self.transfer_method}))")
+
+    def _scratch_location(self) -> Tuple[str, str]:
+        """
+        Pick the directory run directories are created in
+
+        Returns:
+            tuple: (directory, "tmpfs" if it is memory-backed else "disk")
+        """
+        scratch_dir = self.config.scratch_dir
+        if scratch_dir is None:
+            try:
+                stats = os.statvfs(SHM_DIR)
+                if stats.f_bavail * stats.f_frsize >= MIN_SHM_FREE_BYTES and os.access(SHM_DIR, os.W_OK):
+                    scratch_dir = SHM_DIR
+            except OSError:
+                pass
+        scratch_dir = scratch_dir or tempfile.gettempdir()
+        return scratch_dir, "tmpfs" if filesystem_type(scratch_dir) in MEMORY_FILESYSTEMS else "disk"
+
+    def _isolation_prefix(self) -> List[str]:
+        """Work out the seccomp/namespace wrapper commands this host supports"""
+        prefix = []
+        if self.config.use_seccomp and importlib.util.find_spec("seccomp") is not None:
+            prefix += [sys.executable, "-c", SECCOMP_LAUNCHER, ",".join(DENIED_SYSCALLS)]
+        if self.config.isolate_network and shutil.which("unshare"):
+            unshare = ["unshare", "--user", "--map-root-user", "--net", "--pid", "--fork",
+                       "--kill-child", "--"]
+            try:
+                probe = subprocess.run(unshare + ["true"], stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.DEVNULL, timeout=5)
+                if probe.returncode == 0:
+                    prefix += unshare
+                else:
+                    logger.warning("Unprivileged namespaces are not permitted; local runs keep host networking")
+            except Exception as e:
+                logger.warning(f"Could not probe unshare: {e}")
+        return prefix
+
+    def _ulimits(self, timeout: float, profile: Optional[ExecutionProfile] = None) -> str:
+        """
+        Build the ulimit prefix applied by the sandbox shell before the command
+
+        A profile can lower the file size limit, and its memory limit is applied as
+        `ulimit -d`: the data limit counts heap and other private writable memory, so an
+        allocation past it fails (MemoryError, std::bad_alloc, a V8 heap error) while the
+        address space runtimes such as V8 merely reserve does not count, as it would under
+        `ulimit -v`. CPU quota and process limits are not enforced.
+        """
+        max_file_bytes = self.config.max_file_bytes
+        if profile:
+            max_file_bytes = min(max_file_bytes, profile.max_file_bytes)
+        limits = [
+            "-c 0",
+            f"-t {int(timeout) + 1}",  # CPU seconds; the wall-clock kill timer is the real limit
+            f"-f {max_file_bytes // 1024}",
+            f"-n {self.config.max_open_files}",
+        ]
+        if profile:
+            limits.append(f"-d {profile.memory_bytes // 1024}")
+        if self.config.memory_bytes:
+            limits.append(f"-v {self.config.memory_bytes // 1024}")
+        if self.config.max_processes:
+            limits.append(f"-u {self.config.max_processes}")
+        return "ulimit " + " ".join(limits)
+
+    def _prepare(self, files: Dict[str, bytes],
+                 executables: Optional[Dict[str, bytes]] = None) -> str:
+        """Create the throwaway working directory and write the files into it"""
+        workdir = tempfile.mkdtemp(prefix=scratch_prefix("run", self.language), dir=self.scratch_dir)
+        for mode, entries in ((0o644, files), (0o755, executables or {})):
+            for name, data in entries.items():
+                path = os.path.normpath(os.path.join(workdir, name))
+                if not path.startswith(workdir + os.sep):
+                    raise ValueError(f"File name escapes the working directory: {name}")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(data)
+                os.chmod(path, mode)
+        return workdir
+
+    def _spawn(self, workdir: str, command: str, timeout: float,
+               profile: Optional[ExecutionProfile] = None,
+               meta_dir: Optional[str] = None) -> subprocess.Popen:
+        """Start the command in its own session so the whole process group can be killed"""
+        environment = {
+            'PATH': f"{self._bin_dir}{os.pathsep}{os.environ.get('PATH', os.defpath)}",
+            'HOME': workdir,
+            'TMPDIR': workdir,
+            'LANG': 'C.UTF-8',
+        }
+        if meta_dir:
+            environment['EDURUN_META'] = meta_dir  # Stands in for INSTRUMENTATION_DIR
+        return subprocess.Popen(
+            self._prefix + ["bash", "-c", f"{self._ulimits(timeout, profile)}\n{command}"],
+            cwd=workdir,
+            env=environment,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True
+        )
+
+    def _kill(self, process: subprocess.Popen):
+        """Kill the command and anything it started"""
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _exit_code(self, process: subprocess.Popen) -> int:
+        """Wait for the process and report a signal death the way a shell does (128 + signal)"""
+        code = process.wait()
+        return 128 - code if code < 0 else code
+
+    def _wait_with_rusage(self, process: subprocess.Popen) -> Tuple[int, Dict[str, int]]:
+        """
+        Reap the process with wait4 to get its resource usage along with the exit code
+
+        The rusage covers the command and every descendant it waited for; ru_maxrss is the
+        largest single process, in KiB, and block I/O is counted in 512-byte units. A forked
+        child carries this server's memory until it execs, so a peak no larger than the
+        server's own says nothing about the command and is left out.
+        """
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            return self._exit_code(process), {}
+        process.returncode = os.waitstatus_to_exitcode(status)
+        rusage = {
+            'io_read_bytes': usage.ru_inblock * 512,
+            'io_write_bytes': usage.ru_oublock * 512,
+        }
+        if usage.ru_maxrss > resource.getrusage(resource.RUSAGE_SELF).ru_maxrss:
+            rusage['max_rss_bytes'] = usage.ru_maxrss * 1024
+        return self._exit_code(process), rusage
+
+    def _collect(self, workdir: str, paths: Optional[List[str]],
+                 meta_dir: Optional[str] = None) -> Dict[str, bytes]:
+        """Read files and directories back out of the working directory (or the run's INSTRUMENTATION_DIR)"""
+        collected = {}
+        for path in paths or []:
+            base, key_base = workdir, None
+            if meta_dir and path.startswith(INSTRUMENTATION_DIR + '/'):
+                # Keyed by the path the Docker backend reports them under
+                base, key_base = meta_dir, INSTRUMENTATION_DIR
+                path = os.path.relpath(path, INSTRUMENTATION_DIR)
+            full_path = os.path.join(base, path)
+            if os.path.isdir(full_path):
+                names = [os.path.relpath(os.path.join(root, name), base)
+                         for root, _, files in os.walk(full_path) for name in files]
+            elif os.path.isfile(full_path):
+                names = [path]
+            else:
+                continue
+            for name in names:
+                with open(os.path.join(base, name), 'rb') as f:
+                    collected[os.path.join(key_base, name) if key_base else name] = f.read()
+        return collected
+
+    def run(self, files: Dict[str, bytes], command: str, timeout: float, grace: float = 0,
+            limits: Optional[OutputLimits] = None,
+            executables: Optional[Dict[str, bytes]] = None,
+            collect: Optional[List[str]] = None,
+            profile: Optional[ExecutionProfile] = None) -> ExecutionOutcome:
+        """Run a command as a sandboxed subprocess (see ExecutionBackend.run)"""
+        start_time = time.time()
+        phases = PhaseTimer()
+        workdir = None
+        meta_dir = None
+        process = None
+        outcome = None
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            self._kill(process)
+
+        timer = None
+        try:
+            with phases.phase('copy'):
+                workdir = self._prepare(files, executables)
+                meta_dir = tempfile.mkdtemp(prefix=scratch_prefix("run", f"{self.language}-meta"),
+                                            dir=self.scratch_dir)
+            transfer = record_transfer(self.language, self.name, self.transfer_method, files, executables)
+            with phases.phase('start'):
+                process = self._spawn(workdir, command, timeout + grace, profile, meta_dir)
+            timer = threading.Timer(timeout + grace, kill)
+            timer.daemon = True
+            timer.start()
+            with phases.phase('run'):
+                captured = capture_frames(_pipe_frames(process), limits)
+                exit_code, rusage = self._wait_with_rusage(process)
+            execution_time = time.time() - start_time
+            with phases.phase('collect'):
+                collected = self._collect(workdir, collect, meta_dir)
+            outcome = ExecutionOutcome(
+                exit_code=exit_code,
+                captured=captured,
+                execution_time=execution_time,
+                timed_out=timed_out.is_set(),
+                files=collected,
+                phases=phases.phases,
+                rusage=rusage,
+                transfer=transfer
+            )
+            return outcome
+        finally:
+            with phases.phase('teardown'):
+                if timer:
+                    timer.cancel()
+                if process:
+                    # Background processes left behind by the command die with the run
+                    self._kill(process)
+                    process.stdout.close()
+                    process.stderr.close()
+                    process.wait()
+                if workdir:
+                    shutil.rmtree(workdir, ignore_errors=True)
+                if meta_dir:
+                    shutil.rmtree(meta_dir, ignore_errors=True)
+            phases.record(self.language, self.name,
+                          run_outcome(outcome.exit_code, outcome.timed_out) if outcome else "error")
+
+    def stream(self, files: Dict[str, bytes], command: str, timeout: float, grace: float = 5,
+               max_bytes: int = DEFAULT_STREAM_MAX_BYTES,
+               profile: Optional[ExecutionProfile] = None) -> Iterator[StreamEvent]:
+        """Run a command as a sandboxed subprocess and stream its output"""
+        cap = OutputCap(max_bytes)
+        start_time = time.time()
+        workdir = None
+        meta_dir = None
+        process = None
+        timer = None
+
+        try:
+            workdir = self._prepare(files)
+            # Set even though nothing is collected, so the script knows it is not in a container
+            meta_dir = tempfile.mkdtemp(prefix=scratch_prefix("run", f"{self.language}-meta"),
+                                        dir=self.scratch_dir)
+            record_transfer(self.language, self.name, self.transfer_method, files)
+            process = self._spawn(workdir, command, timeout + grace, profile, meta_dir)
+            timer = threading.Timer(timeout + grace, lambda: self._kill(process))
+            timer.daemon = True
+            timer.start()
+
+            for stdout, stderr in _pipe_frames(process):
+                yield from cap.feed(stdout, stderr)
+                if cap.truncated:
+                    break
+            yield from cap.flush()
+
+            if cap.truncated:
+                exit_code = -1
+            else:
+                exit_code = self._exit_code(process)
+
+            yield StreamEvent('exit', {
+                'success': exit_code == 0,
+                'exit_code': exit_code,
+                'execution_time': time.time() - start_time,
+                'truncated': cap.truncated,
+                'bytes': cap.total_bytes,
+            })
+        except Exception as e:
+            logger.error(f"Error during streamed local execution: {e}")
+            yield StreamEvent('error', {'error': str(e)})
+        finally:
+            if timer:
+                timer.cancel()
+            if process:
+                self._kill(process)
+                process.stdout.close()
+                process.stderr.close()
+                process.wait()
+            if workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+            if meta_dir:
+                shutil.rmtree(meta_dir, ignore_errors=True)
+
+    def image_id(self) -> str:
+        """Fingerprint the host tools so cache keys change when they are upgraded"""
+        if self._image_id is None:
+            digest = hashlib.sha256(self.language.encode('utf-8'))
+            for name, executable in sorted(self.tools.items()):
+                digest.update(f"{name}={executable}:{os.stat(executable).st_mtime_ns}".encode('utf-8'))
+            self._image_id = f"local:{digest.hexdigest()[:16]}"
+        return self._image_id
+
+    def shutdown(self):
+        """Remove the tool shim directory"""
+        shutil.rmtree(self._bin_dir, ignore_errors=True)
@@ -0,0 +1,254 @@
+"""
+Execution Profiles Module
+This module defines named execution profiles ("quick", "standard", "heavy") that bundle
+the CPU quota, memory, process, tmpfs, output and timeout limits a run is held to, turns
+them into container options, and classifies limit-exceeded runs as TLE, MLE or OLE.
+"""
+
+import json
+from dataclasses import dataclass, asdict, replace
+from typing import Dict, List, Optional
+import logging
+
+from .log_capture import OutputLimits
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MIB = 1024 * 1024
+
+DEFAULT_PROFILE = "standard"
+
+# Exit code of a process killed by SIGXFSZ (128 + 25) after writing past the file size limit
+FILE_SIZE_EXIT_CODE = 153
+
+# Exit code of a process killed by SIGKILL (128 + 9) and of coreutils `timeout`
+SIGKILL_EXIT_CODE = 137
+TIMEOUT_EXIT_CODE = 124
+
+# Messages runtimes print when an allocation fails under an address-space limit
+MEMORY_ERROR_MARKERS = ("MemoryError", "std::bad_alloc", "JavaScript heap out of memory",
+                        "Array buffer allocation failed")
+
+
+class UnknownProfileError(ValueError):
+    """Raised when a request names an execution profile that does not exist"""
+
+
+class LimitVerdict:
+    """Run verdicts reported on compile results"""
+    OK = "OK"  # Exited 0 within every limit
+    RE = "RE"  # Non-zero exit code
+    CE = "CE"  # Compilation (or syntax check) failed
+    TLE = "TLE"  # Killed at the time limit
+    MLE = "MLE"  # Killed by, or failed an allocation at, the memory limit
+    OLE = "OLE"  # Output or written files exceeded their caps
+
+
+@dataclass
+class ExecutionProfile:
+    """Data class to hold the limits one class of run is held to"""
+    name: str
+    cpus: float = 1.0  # CPU quota in cores
+    memory_bytes: int = 512 * MIB  # Memory (RSS + page cache) of the whole sandbox, no swap
+    pids_limit: int = 64  # Processes and threads in the sandbox
+    tmpfs_bytes: int = 64 * MIB  # Size of the in-memory /tmp
+    max_file_bytes: int = 64 * MIB  # Largest file a run may write
+    max_output_bytes: int = 1024 * 1024  # Bytes of stdout/stderr kept per stream
+    max_output_lines: int = 10000  # Lines of stdout/stderr kept per stream
+    default_timeout: int = 30  # Seconds a run gets when the request names none
+    max_timeout: int = 60  # Longest timeout a request may ask for
+    network: bool = False  # Give the sandbox network access
+
+    def output_limits(self) -> OutputLimits:
+        """Get the per-stream capture limits"""
+        return OutputLimits(max_bytes=self.max_output_bytes, max_lines=self.max_output_lines)
+
+    def resolve_timeout(self, timeout: Optional[float]) -> int:
+        """Apply the default to a missing timeout and cap the rest at max_timeout"""
+        if timeout is None:
+            return self.default_timeout
+        return max(1, min(int(timeout), self.max_timeout))
+
+    def container_options(self) -> Dict:
+        """Build the `containers.create`/`containers.run` keyword arguments that enforce the profile"""
+        options = {
+            'mem_limit': self.memory_bytes,
+            'memswap_limit': self.memory_bytes,  # Equal to mem_limit: no swap
+            'nano_cpus': int(self.cpus * 1e9),
+            'pids_limit': self.pids_limit,
+            'tmpfs': {'/tmp': f"rw,nosuid,nodev,size={self.tmpfs_bytes}"},
+            'ulimits': [{'name': 'fsize', 'soft': self.max_file_bytes, 'hard': self.max_file_bytes}],
+        }
+        if not self.network:
+            options['network_mode'] = 'none'
+        return options
+
+    def to_dict(self) -> Dict:
+        """Convert the profile to a JSON-serializable dictionary"""
+        return asdict(self)
+
+
+# Built-in profiles; EDURUN_PROFILES-style overrides adjust them per deployment
+DEFAULT_PROFILES = {
+    'quick': ExecutionProfile(
+        name='quick', cpus=0.5, memory_bytes=256 * MIB, pids_limit=32, tmpfs_bytes=16 * MIB,
+        max_file_bytes=16 * MIB, max_output_bytes=64 * 1024, max_output_lines=1000,
+        default_timeout=5, max_timeout=10
+    ),
+    'standard': ExecutionProfile(name='standard'),
+    'heavy': ExecutionProfile(
+        name='heavy', cpus=2.0, memory_bytes=2048 * MIB, pids_limit=256, tmpfs_bytes=256 * MIB,
+        max_file_bytes=256 * MIB, max_output_bytes=8 * 1024 * 1024, max_output_lines=100000,
+        default_timeout=60, max_timeout=300
+    ),
+}
+
+# Per-language adjustments, keyed like overrides: cc1plus needs room to compile in the sandbox
+DEFAULT_LANGUAGE_OVERRIDES = {
+    'cpp:quick': {'memory_bytes': 512 * MIB},
+}
+
+
+def parse_profile_overrides(spec: str) -> Dict[str, Dict]:
+    """
+    Parse profile overrides from JSON, e.g. '{"standard": {"memory_bytes": 268435456},
+    "cpp:heavy": {"max_timeout": 600}, "exam": {"cpus": 1, "max_timeout": 20}}'
+
+    Keys are "<profile>" or "<language>:<profile>"; a profile key that is not built in
+    defines a new profile starting from the standard one.
+
+    Args:
+        spec (str): JSON object of overrides
+
+    Returns:
+        Dict[str, Dict]: Field overrides by key
+
+    Raises:
+        ValueError: If the JSON is malformed or names an unknown field
+    """
+    try:
+        overrides = json.loads(spec) if spec.strip() else {}
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid profile overrides: {e}")
+    if not isinstance(overrides, dict) or not all(isinstance(v, dict) for v in overrides.values()):
+        raise ValueError("Profile overrides must be a JSON object of objects")
+    fields = set(ExecutionProfile.__dataclass_fields__) - {'name'}
+    for key, values in overrides.items():
+        unknown = set(values) - fields
+        if unknown:
+            raise ValueError(f"Unknown fields in profile override '{key}': {', '.join(sorted(unknown))}")
+    return overrides
+
+
+class ProfileSet:
+    """
+    The execution profiles available to requests, resolved per language
+
+    A request for a profile and language gets the base profile with its "<profile>"
+    override applied, then its "<language>:<profile>" override.
+    """
+
+    def __init__(self, overrides: Optional[Dict[str, Dict]] = None,
+                 default_profile: str = DEFAULT_PROFILE):
+        """
+        Initialize the profile set
+
+        Args:
+            overrides (Dict[str, Dict]): Field overrides (see parse_profile_overrides), applied
+                on top of DEFAULT_LANGUAGE_OVERRIDES
+            default_profile (str): Profile used when a request names none
+
+        Raises:
+            UnknownProfileError: If default_profile is not defined
+        """
+        self.overrides = {**DEFAULT_LANGUAGE_OVERRIDES, **(overrides or {})}
+        self.profiles = dict(DEFAULT_PROFILES)
+        for key, values in self.overrides.items():
+            if ':' not in key:
+                base = self.profiles.get(key, DEFAULT_PROFILES[DEFAULT_PROFILE])
+                self.profiles[key] = replace(base, name=key, **values)
+        if default_profile not in self.profiles:
+            raise UnknownProfileError(f"Unknown default execution profile '{default_profile}'")
+        self.default_profile = default_profile
+
+    def names(self) -> List[str]:
+        """Get the profile names"""
+        return list(self.profiles)
+
+    def get(self, name: Optional[str], language: str) -> ExecutionProfile:
+        """
+        Resolve a profile for a language
+
+        Args:
+            name (str): Profile name, or None for the default
+            language (str): Language key ("python", "cpp" or "js")
+
+        Returns:
+            ExecutionProfile: The profile with the language's overrides applied
+
+        Raises:
+            UnknownProfileError: If no profile has that name
+        """
+        name = name or self.default_profile
+        profile = self.profiles.get(name)
+        if profile is None:
+            raise UnknownProfileError(
+                f"Unknown execution profile '{name}'; available: {', '.join(self.profiles)}"
+            )
+        language_override = self.overrides.get(f"{language}:{name}")
+        return replace(profile, **language_override) if language_override else profile
+
+    def describe(self, languages: List[str]) -> Dict:
+        """Get every profile as resolved for each language, for the API"""
+        return {
+            'default': self.default_profile,
+            'profiles': {
+                name: {language: self.get(name, language).to_dict() for language in languages}
+                for name in self.profiles
+            },
+        }
+
+
+def limit_verdict(exit_code: int, timed_out: bool, truncated: bool, stderr: str = "",
+                  resource_usage: Optional[Dict] = None,
+                  profile: Optional[ExecutionProfile] = None,
+                  compile_failed: bool = False) -> str:
+    """
+    Classify a finished run as OK, RE, CE, TLE, MLE or OLE
+
+    Every backend enforces the profile's memory limit, so a measured peak above it only
+    explains a failed run; a run that exited 0 kept within the limit as enforced (a peak
+    RSS also counts shared libraries and page cache the limit does not).
+
+    Args:
+        exit_code (int): Exit code of the run
+        timed_out (bool): True if the backend killed the run at its timeout
+        truncated (bool): True if output exceeded the capture limits
+        stderr (str): Captured standard error, checked for allocation failures
+        resource_usage (Dict): The run's usage report (peak memory, OOM kills)
+        profile (ExecutionProfile): Limits the run was held to
+        compile_failed (bool): True if compilation or the syntax check failed
+
+    Returns:
+        str: A LimitVerdict value
+    """
+    usage = resource_usage or {}
+    if compile_failed:
+        return LimitVerdict.CE
+    if timed_out or exit_code == TIMEOUT_EXIT_CODE:
+        return LimitVerdict.TLE
+    if usage.get('oom_kills'):
+        return LimitVerdict.MLE
+    if truncated or exit_code == FILE_SIZE_EXIT_CODE:
+        return LimitVerdict.OLE
+    if exit_code == 0:
+        return LimitVerdict.OK
+    peak = usage.get('peak_memory_bytes')
+    if profile and peak is not None and peak > profile.memory_bytes:
+        return LimitVerdict.MLE
+    # Nothing but the OOM killer sends SIGKILL to a run that was not timed out
+    if exit_code == SIGKILL_EXIT_CODE or any(marker in stderr for marker in MEMORY_ERROR_MARKERS):
+        return LimitVerdict.MLE
+    return LimitVerdict.RE
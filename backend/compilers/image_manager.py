@@ -0,0 +1,268 @@
+"""
+Image Manager Module
+This module makes sure the sandbox images are present before a language is served: it pulls
+missing images (tracking layer progress), pins each floating tag to the digest it resolved to,
+and keeps a cached index of the local images.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from .metrics import registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IMAGE_PULLS_TOTAL = registry.counter(
+    'edurun_image_pulls_total', 'Sandbox image pulls by result (ok or error)', ['result'])
+IMAGE_PULL_SECONDS = registry.histogram(
+    'edurun_image_pull_seconds', 'Time to pull a missing sandbox image',
+    buckets=(1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0))
+
+# Image states
+PENDING = "pending"
+PULLING = "pulling"
+READY = "ready"
+FAILED = "failed"
+
+
+class ImageNotReadyError(RuntimeError):
+    """Raised when a sandbox image is not present locally and cannot be pulled"""
+
+
+def split_reference(reference: str) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Split an image reference into repository, tag and digest
+
+    Args:
+        reference (str): e.g. "python:3.9-slim", "python:3.9-slim@sha256:ab..", "localhost:5000/gcc"
+
+    Returns:
+        tuple: (repository, tag or None, digest or None)
+    """
+    name, _, digest = reference.partition('@')
+    repository, tag = name, None
+    if ':' in name.rsplit('/', 1)[-1]:
+        repository, tag = name.rsplit(':', 1)
+    return repository, tag, digest or None
+
+
+def parse_image_pins(spec: str) -> Dict[str, str]:
+    """
+    Parse "image=digest" pins separated by commas
+
+    Example: "python:3.9-slim=sha256:ab..,gcc:latest=sha256:cd.." runs those tags at exactly
+    those digests, pulling them if needed.
+    """
+    pins = {}
+    for rule in spec.split(','):
+        if '=' in rule:
+            image, digest = rule.split('=', 1)
+            pins[image.strip()] = digest.strip()
+    return pins
+
+
+@dataclass
+class ImageStatus:
+    """Data class to hold the preparation state of one sandbox image"""
+    image: str  # Reference as configured, usually a floating tag
+    state: str = PENDING  # pending, pulling, ready or failed
+    reference: str = ""  # What sandboxes run: the tag pinned to its digest, or the tag if it has none
+    digest: Optional[str] = None  # Registry digest the tag resolved to, None for locally built images
+    image_id: Optional[str] = None
+    pulled: bool = False  # True if this process pulled it
+    pull_seconds: Optional[float] = None
+    layers: int = 0  # Pull progress: layers seen and finished, and bytes downloaded of the known total
+    layers_done: int = 0
+    bytes_downloaded: int = 0
+    bytes_total: int = 0
+    error: Optional[str] = None
+    _layer_bytes: Dict[str, Tuple[int, int]] = field(default_factory=dict, repr=False)
+
+    def to_dict(self) -> Dict:
+        """Convert the status to a JSON-serializable dictionary"""
+        data = {f.name: getattr(self, f.name) for f in fields(self) if not f.name.startswith('_')}
+        if self.state == PULLING and self.bytes_total:
+            data['percent'] = round(100.0 * self.bytes_downloaded / self.bytes_total, 1)
+        return data
+
+
+class ImageManager:
+    """
+    Pulls, pins and indexes the sandbox images of one Docker daemon
+    """
+
+    def __init__(self, clients, pins: Optional[Dict[str, str]] = None,
+                 pull_missing: bool = True, index_ttl: float = 60.0):
+        """
+        Initialize the manager; nothing is contacted until an image is prepared
+
+        Args:
+            clients (DockerClientManager): Shared client and circuit breaker
+            pins (Dict[str, str]): Digests configured tags must run at (see parse_image_pins)
+            pull_missing (bool): If False, a missing image fails instead of being pulled
+            index_ttl (float): Seconds the local image index is reused before it is listed again
+        """
+        self.clients = clients
+        self.pins = dict(pins or {})
+        self.pull_missing = pull_missing
+        self.index_ttl = index_ttl
+        self._statuses: Dict[str, ImageStatus] = {}
+        self._image_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._index: Optional[List[str]] = None
+        self._index_time = 0.0
+
+    def _status(self, image: str) -> Tuple[ImageStatus, threading.Lock]:
+        with self._lock:
+            if image not in self._statuses:
+                self._statuses[image] = ImageStatus(image=image)
+                self._image_locks[image] = threading.Lock()
+            return self._statuses[image], self._image_locks[image]
+
+    def prepare(self, image: str) -> str:
+        """
+        Make an image local and pin it, pulling it first if needed; concurrent callers wait
+
+        Args:
+            image (str): Configured image reference
+
+        Returns:
+            str: Reference sandboxes should run, "<tag>@<digest>" when the image came from a registry
+
+        Raises:
+            ImageNotReadyError: If the image is missing and pulling is disabled or fails
+        """
+        status, image_lock = self._status(image)
+        with image_lock:
+            if status.state == READY:
+                return status.reference
+            pin = self.pins.get(image)
+            target = f"{image.split('@')[0]}@{pin}" if pin else image
+            try:
+                local = self._inspect(target)
+                if local is None:
+                    if not self.pull_missing:
+                        raise ImageNotReadyError(f"Image {target} is not present locally and pulling is disabled")
+                    self._pull(status, target)
+                    local = self._inspect(target)
+                    if local is None:
+                        raise ImageNotReadyError(f"Image {target} is still missing after the pull")
+            except Exception as e:
+                status.state = FAILED
+                status.error = str(e)
+                logger.error(f"Image {image} is not ready: {e}")
+                if isinstance(e, ImageNotReadyError):
+                    raise
+                raise ImageNotReadyError(str(e)) from e
+            self._pin(status, local, pin)
+            return status.reference
+
+    def _inspect(self, reference: str):
+        """Get the local image for a reference, or None if it is not present"""
+        import docker
+        try:
+            return self.clients.call(self.clients.get_client().images.get, reference)
+        except docker.errors.ImageNotFound:
+            return None
+
+    def _pin(self, status: ImageStatus, local, pin: Optional[str]):
+        """Record the digest the image resolved to and the reference runs will use"""
+        repository = split_reference(status.image)[0]
+        digests = local.attrs.get('RepoDigests') or []
+        matching = [d for d in digests if d.split('@')[0] == repository] or digests
+        status.digest = pin or (matching[0].split('@', 1)[1] if matching else None)
+        status.image_id = local.id
+        status.reference = f"{status.image.split('@')[0]}@{status.digest}" if status.digest else status.image
+        status.state = READY
+        status.error = None
+        logger.info(f"Image {status.image} ready as {status.reference}"
+                    + ("" if status.digest else " (no registry digest; running the tag unpinned)"))
+        self.refresh_index()
+
+    def _pull(self, status: ImageStatus, reference: str):
+        """Pull an image, updating the layer and byte progress from the daemon's event stream"""
+        repository, tag, digest = split_reference(reference)
+        status.state = PULLING
+        status.error = None
+        logger.info(f"Pulling missing image {reference}")
+        start = time.monotonic()
+        try:
+            with self.clients.guard():
+                events = self.clients.get_client().api.pull(repository, tag=digest or tag or 'latest',
+                                                            stream=True, decode=True)
+                for event in events:
+                    self._record_progress(status, event)
+        except Exception:
+            IMAGE_PULLS_TOTAL.inc(result="error")
+            raise
+        status.pulled = True
+        status.pull_seconds = round(time.monotonic() - start, 1)
+        IMAGE_PULLS_TOTAL.inc(result="ok")
+        IMAGE_PULL_SECONDS.observe(status.pull_seconds)
+        logger.info(f"Pulled {reference} in {status.pull_seconds:.1f}s")
+
+    def _record_progress(self, status: ImageStatus, event: Dict):
+        """Fold one pull event into the image's progress"""
+        if 'error' in event:
+            raise ImageNotReadyError(event['error'])
+        layer = event.get('id')
+        state = event.get('status', '')
+        if not layer or state.startswith('Pulling from'):
+            return  # Messages about the whole image ("Pulling from library/python", "Digest: ...")
+        current, total = status._layer_bytes.get(layer, (0, 0))
+        detail = event.get('progressDetail') or {}
+        if state == 'Downloading':
+            current, total = detail.get('current', current), detail.get('total', total)
+        elif state in ('Download complete', 'Pull complete', 'Already exists'):
+            current = total
+        status._layer_bytes[layer] = (current, total)
+        if state in ('Pull complete', 'Already exists'):
+            status.layers_done += 1
+        status.layers = len(status._layer_bytes)
+        status.bytes_downloaded = sum(c for c, _ in status._layer_bytes.values())
+        status.bytes_total = sum(t for _, t in status._layer_bytes.values())
+
+    def state(self, image: str) -> str:
+        """Get an image's state; an image never prepared is ready if the index has it"""
+        with self._lock:
+            status = self._statuses.get(image)
+        if status and status.state != PENDING:
+            return status.state
+        return READY if image in self.tags() else PENDING
+
+    def status(self, image: str) -> Optional[Dict]:
+        """Get an image's preparation status, or None if it was never prepared"""
+        with self._lock:
+            status = self._statuses.get(image)
+        return status.to_dict() if status else None
+
+    def tags(self) -> List[str]:
+        """Get the tags of all local images, from an index refreshed at most every index_ttl seconds"""
+        with self._lock:
+            if self._index is not None and time.monotonic() - self._index_time < self.index_ttl:
+                return self._index
+        return self.refresh_index()
+
+    def refresh_index(self) -> List[str]:
+        """List the local images again and replace the cached index"""
+        try:
+            images = self.clients.call(self.clients.get_client().images.list)
+            index = sorted(tag for image in images for tag in image.tags)
+        except Exception as e:
+            logger.warning(f"Could not list local images: {e}")
+            index = []
+        with self._lock:
+            self._index = index
+            self._index_time = time.monotonic()
+        return index
+
+    def get_stats(self) -> Dict:
+        """Get every prepared image's status, keyed by configured reference"""
+        with self._lock:
+            statuses = list(self._statuses.values())
+        return {status.image: status.to_dict() for status in statuses}
@@ -4,14 +4,26 @@ This module provides functionality to run JavaScript code using Docker container
 and capture the runtime messages for display.
 """
 
-import docker
-import tempfile
-import os
 import time
-from dataclasses import dataclass
-from typing import Dict, Optional, List
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Iterator, Optional, List
 import logging
 
+from .result_cache import ResultCache, make_cache_key, is_cacheable_exit_code
+from .metrics import CACHE_LOOKUPS_TOTAL
+from .container_pool import PoolConfig
+from .js_syntax_worker import NodeSyntaxWorkerPool
+from .output_stream import StreamEvent, DEFAULT_STREAM_MAX_BYTES
+from .log_capture import OutputLimits
+from .execution_backend import ExecutionBackend, DockerBackend
+from .docker_client import DockerClientManager
+from .execution_profiles import ExecutionProfile, ProfileSet, LimitVerdict, limit_verdict
+from .submission_files import normalize_submission_files
+from .judge import TestCase, JudgeResult, judge_in_sandbox
+from .timing import (INSTRUMENTATION_FILES, timed_script, sandboxed_script, build_timings, merge_timings,
+                     format_timings)
+from .resource_usage import build_resource_usage, format_resource_usage, usage_distributions
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,164 +37,251 @@ class CompilerResult:
     exit_code: int
     execution_time: float
     syntax_output: str = ""  # Additional field for JavaScript syntax messages
+    cached: bool = False  # True if served from the result cache
+    diagnostics: List[Dict] = field(default_factory=list)  # Structured syntax errors (line, column, message)
+    output_bytes: int = 0  # Bytes the program wrote to stdout, including any truncated part
+    error_bytes: int = 0  # Bytes the program wrote to stderr, including any truncated part
+    truncated: bool = False  # True if output exceeded the capture limits
+    timings: Dict[str, float] = field(default_factory=dict)  # Seconds per phase: setup, compile, run, capture, teardown
+    resource_usage: Dict = field(default_factory=dict)  # CPU time, peak memory, block I/O and processes of the run
+    profile: str = ""  # Execution profile the run was held to
+    verdict: str = ""  # OK, RE, CE, TLE, MLE or OLE; empty if the sandbox itself failed
+    file_transfer: Dict = field(default_factory=dict)  # How the files reached the sandbox: method, files, bytes, host_disk_bytes
 
 class JsDockerCompiler:
     """
     A class to run JavaScript code using Docker containers
     """
     
-    def __init__(self, docker_image: str = "node:18-slim"):
+    entry_file = "code.js"  # Name of the submitted code in the sandbox; extra files sit next to it
+    
+    def __init__(self, docker_image: str = "node:18-slim",
+                 use_pool: bool = False,
+                 pool_config: Optional[PoolConfig] = None,
+                 result_cache: Optional[ResultCache] = None,
+                 fast_syntax_check: bool = True,
+                 syntax_workers: int = 1,
+                 output_limits: Optional[OutputLimits] = None,
+                 backend: Optional[ExecutionBackend] = None,
+                 profiles: Optional[ProfileSet] = None,
+                 docker_clients: Optional[DockerClientManager] = None):
         """
         Initialize the compiler with a Docker image
         
         Args:
             docker_image (str): Docker image to use for JavaScript execution
+            use_pool (bool): If True, dispatch runs into warm pooled containers
+            pool_config (PoolConfig): Sizing and lifecycle settings for the pool
+            result_cache (ResultCache): Optional cache for deterministic run results
+            fast_syntax_check (bool): If True, check syntax in persistent Node.js workers
+                instead of starting a container per check
+            syntax_workers (int): Number of persistent syntax-check workers
+            output_limits (OutputLimits): Per-stream byte and line limits for captured output;
+                overrides the execution profile's output caps
+            backend (ExecutionBackend): Where code runs; defaults to Docker containers of docker_image
+            profiles (ProfileSet): Execution profiles requests can select
+            docker_clients (DockerClientManager): Docker client shared with the other compilers
         """
         self.docker_image = docker_image
-        self.client = None
-        self._init_docker_client()
+        self.result_cache = result_cache
+        self.output_limits = output_limits
+        self.profiles = profiles or ProfileSet()
+        self.backend = backend or DockerBackend(docker_image, language="js",
+                                                clients=docker_clients)
+        # Worker containers, where needed, run the backend's (pinned) image through its client
+        self.syntax_workers = NodeSyntaxWorkerPool(
+            getattr(self.backend, 'docker_image', docker_image), size=syntax_workers,
+            clients=getattr(self.backend, 'clients', None)
+        ) if fast_syntax_check else None
+        self.client = getattr(self.backend, 'client', None)
+        if use_pool and isinstance(self.backend, DockerBackend):
+            self.backend.start_pool(pool_config, self.profiles.get(None, "js"))
     
-    def _init_docker_client(self):
-        """Initialize Docker client"""
-        try:
-            self.client = docker.from_env()
-            # Test if Docker is running
-            self.client.ping()
-            logger.info("Docker client initialized successfully for JavaScript")
-        except Exception as e:
-            logger.error(f"Failed to initialize Docker client: {e}")
-            raise ConnectionError("Docker is not running or not accessible")
+    def _build_command(self, timeout: int, check_syntax_only: bool,
+                       node_flags: List[str] = None, has_stdin: bool = False) -> str:
+        """Build the shell command that checks or runs code.js in the sandbox working directory"""
+        # Default Node.js flags
+        if node_flags is None:
+            node_flags = ["--no-warnings"]
+        
+        if check_syntax_only:
+            # Only check syntax, don't run
+            return (
+                f"node {' '.join(node_flags)} --check code.js"
+            )
+        else:
+            # Run the JavaScript code
+            redirect = " < input.txt" if has_stdin else ""
+            return (
+                f"timeout {timeout}s node {' '.join(node_flags)} code.js{redirect}"
+            )
     
-    def _create_temp_file(self, code: str, extension: str = ".js") -> str:
-        """
-        Create a temporary JavaScript file with the provided code
+    def _build_result(self, exit_code: int, output: str, error: str,
+                      execution_time: float, check_syntax_only: bool,
+                      capture_info: Optional[Dict] = None,
+                      timings: Optional[Dict[str, float]] = None,
+                      resource_usage: Optional[Dict] = None,
+                      profile: Optional[ExecutionProfile] = None,
+                      file_transfer: Optional[Dict] = None) -> CompilerResult:
+        """Split captured stderr into syntax output and build the result"""
+        syntax_output = ""
         
-        Args:
-            code (str): JavaScript code to write to file
-            extension (str): File extension (.js, .mjs, .ts)
-            
-        Returns:
-            str: Path to the temporary file
-        """
-        with tempfile.NamedTemporaryFile(mode='w', suffix=extension, delete=False, encoding='utf-8') as f:
-            f.write(code)
-            return f.name
+        # For JavaScript, syntax errors appear in stderr
+        if check_syntax_only:
+            syntax_output = error
+            error = error if exit_code != 0 else ""
+        else:
+            # Separate syntax errors from runtime errors
+            if "SyntaxError:" in error or "ReferenceError:" in error:
+                syntax_output = error
+        
+        return CompilerResult(
+            success=exit_code == 0,
+            output=output,
+            error=error,
+            exit_code=exit_code,
+            execution_time=execution_time,
+            syntax_output=syntax_output,
+            timings=timings or {},
+            resource_usage=resource_usage or {},
+            profile=profile.name if profile else "",
+            verdict=limit_verdict(exit_code, False, (capture_info or {}).get('truncated', False), error,
+                                  resource_usage, profile, compile_failed=check_syntax_only and exit_code != 0),
+            file_transfer=file_transfer or {},
+            **(capture_info or {})
+        )
     
-    def _cleanup_temp_file(self, file_path: str):
-        """Clean up temporary file"""
-        try:
-            os.unlink(file_path)
-        except OSError:
-            pass
+    def _cache_key(self, js_code: str, timeout: int, check_syntax_only: bool,
+                   node_flags: List[str] = None, stdin: Optional[str] = None,
+                   profile: Optional[ExecutionProfile] = None,
+                   extra_files: Optional[Dict[str, bytes]] = None) -> str:
+        """Build the result cache key for a run"""
+        return make_cache_key(
+            language="js",
+            image=self.backend.image_id(),
+            code=js_code,
+            flags=node_flags,
+            stdin=stdin,
+            timeout=timeout,
+            syntax_only=check_syntax_only,
+            profile=profile.to_dict() if profile else None,
+            files={path: data.decode('utf-8') for path, data in (extra_files or {}).items()}
+        )
     
     def compile_and_run(self, 
                        js_code: str, 
-                       timeout: int = 30,
+                       timeout: Optional[int] = None,
                        check_syntax_only: bool = False,
-                       node_flags: List[str] = None) -> CompilerResult:
+                       node_flags: List[str] = None,
+                       use_cache: bool = True,
+                       stdin: Optional[str] = None,
+                       profile: Optional[str] = None,
+                       extra_files: Optional[Dict[str, str]] = None) -> CompilerResult:
         """
         Run JavaScript code in a Docker container
         
         Args:
             js_code (str): JavaScript code to run
-            timeout (int): Timeout in seconds for execution
+            timeout (int): Timeout in seconds for execution; defaults to the profile's and is
+                capped at its max_timeout
             check_syntax_only (bool): If True, only check syntax without execution
             node_flags (List[str]): Additional Node.js flags
+            use_cache (bool): If False, bypass the result cache (for nondeterministic programs)
+            stdin (str): Text fed to the program's standard input
+            profile (str): Execution profile name; None for the default
+            extra_files (Dict[str, str]): Modules and data files placed next to code.js, by relative path;
+                a syntax check covers code.js only
             
         Returns:
             CompilerResult: Object containing execution results
+            
+        Raises:
+            UnknownProfileError: If no profile has that name
+            SubmissionFileError: If extra_files is malformed or too large
         """
-        temp_file = None
-        container = None
+        limits = self.profiles.get(profile, "js")
+        timeout = limits.resolve_timeout(timeout)
+        extra = normalize_submission_files(extra_files, self.entry_file)
+        cache_key = None
+        if self.result_cache and use_cache:
+            cache_key = self._cache_key(js_code, timeout, check_syntax_only, node_flags, stdin, limits,
+                                        extra)
+            cached = self.result_cache.get(cache_key)
+            CACHE_LOOKUPS_TOTAL.inc(language="js", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                cached['cached'] = True
+                return CompilerResult(**cached)
         
-        try:
-            # Create temporary file with the code
-            temp_file = self._create_temp_file(js_code)
-            
-            # Default Node.js flags
-            if node_flags is None:
-                node_flags = ["--no-warnings"]
-            
-            # Determine the command to run
-            if check_syntax_only:
-                # Only check syntax, don't run
-                command = (
-                    f"node {' '.join(node_flags)} --check /app/code.js"
-                )
-            else:
-                # Run the JavaScript code
-                command = (
-                    f"timeout {timeout}s node {' '.join(node_flags)} /app/code.js"
-                )
-            
-            # Run the container
-            start_time = time.time()
-            
-            container = self.client.containers.run(
-                image=self.docker_image,
-                command=["bash", "-c", command],
-                volumes={temp_file: {'bind': '/app/code.js', 'mode': 'ro'}},
-                working_dir='/app',
-                detach=True,
-                stdout=True,
-                stderr=True,
-                remove=False  # Don't auto-remove so we can get logs
-            )
-            
-            # Wait for container to finish with timeout
+        result = self._execute(js_code, timeout, check_syntax_only, node_flags, stdin, limits, extra)
+        usage_distributions.record("js", result.resource_usage)
+        if cache_key and is_cacheable_exit_code(result.exit_code):
+            self.result_cache.put(cache_key, asdict(result))
+        return result
+    
+    def _check_syntax_fast(self, js_code: str, profile: ExecutionProfile) -> CompilerResult:
+        """Parse the code in a persistent Node.js worker, without a container"""
+        start_time = time.perf_counter()
+        valid, error, diagnostics = self.syntax_workers.check(js_code)
+        elapsed = time.perf_counter() - start_time
+        result = self._build_result(0 if valid else 1, "", error, elapsed, check_syntax_only=True,
+                                    timings=merge_timings({'compile': elapsed}), profile=profile)
+        result.diagnostics = diagnostics
+        return result
+    
+    def _execute(self, js_code: str, timeout: int, check_syntax_only: bool,
+                 node_flags: Optional[List[str]], stdin: Optional[str],
+                 profile: ExecutionProfile,
+                 extra_files: Optional[Dict[str, bytes]] = None) -> CompilerResult:
+        """Run JavaScript code without consulting the result cache"""
+        # Workers parse with default flags only; custom flags may change the grammar
+        if (check_syntax_only and node_flags is None
+                and self.syntax_workers and self.syntax_workers.available):
             try:
-                result = container.wait(timeout=timeout + 5)  # Extra time for startup
-                exit_code = result['StatusCode']
+                return self._check_syntax_fast(js_code, profile)
             except Exception as e:
-                try:
-                    container.kill()
-                except:
-                    pass
-                raise TimeoutError(f"Execution timed out after {timeout} seconds")
-            
-            execution_time = time.time() - start_time
+                logger.warning(f"Fast syntax check failed, falling back to the container: {e}")
+        
+        try:
+            files = {**(extra_files or {}), 'code.js': js_code.encode('utf-8')}
+            if stdin is not None:
+                files['input.txt'] = stdin.encode('utf-8')
             
-            # Get output and error logs
-            try:
-                logs = container.logs(stdout=True, stderr=True, stream=False).decode('utf-8')
-                output = logs
-                error = ""
-                syntax_output = ""
-                
-                # Try to get separate streams if available
-                try:
-                    output = container.logs(stdout=True, stderr=False, stream=False).decode('utf-8')
-                    error = container.logs(stdout=False, stderr=True, stream=False).decode('utf-8')
-                    
-                    # For JavaScript, syntax errors appear in stderr
-                    if check_syntax_only:
-                        syntax_output = error
-                        error = error if exit_code != 0 else ""
-                    else:
-                        # Separate syntax errors from runtime errors
-                        if "SyntaxError:" in error or "ReferenceError:" in error:
-                            syntax_output = error
-                        
-                except:
-                    # If separate streams fail, use combined logs
-                    pass
-                    
-            except Exception as log_error:
-                logger.warning(f"Could not retrieve container logs: {log_error}")
-                output = ""
-                error = f"Could not retrieve logs: {str(log_error)}"
-                syntax_output = ""
+            # Extra time for startup on top of the `timeout` inside the command
+            step = 'compile' if check_syntax_only else 'run'
+            outcome = self.backend.run(
+                files,
+                timed_script([(step, self._build_command(timeout, check_syntax_only, node_flags,
+                                                         stdin is not None))],
+                             self.backend.cgroup_stats),
+                timeout,
+                grace=5,
+                limits=self.output_limits or profile.output_limits(),
+                collect=INSTRUMENTATION_FILES,
+                profile=profile
+            )
+            captured = outcome.captured
+            timings = build_timings(outcome, [step])
+            resource_usage = build_resource_usage(outcome.files, step, outcome.rusage)
             
-            success = exit_code == 0
+            if outcome.timed_out:
+                return CompilerResult(
+                    success=False,
+                    output=captured.stdout,
+                    error=f"Execution timed out after {timeout} seconds",
+                    exit_code=-1,
+                    execution_time=outcome.execution_time,
+                    syntax_output="",
+                    timings=timings,
+                    resource_usage=resource_usage,
+                    profile=profile.name,
+                    verdict=LimitVerdict.TLE,
+                    file_transfer=outcome.transfer,
+                    **captured.stats()
+                )
             
-            return CompilerResult(
-                success=success,
-                output=output,
-                error=error,
-                exit_code=exit_code,
-                execution_time=execution_time,
-                syntax_output=syntax_output
-            )
+            return self._build_result(outcome.exit_code, captured.stdout, captured.stderr,
+                                      outcome.execution_time, check_syntax_only, captured.stats(),
+                                      timings, resource_usage, profile, outcome.transfer)
             
         except Exception as e:
             logger.error(f"Error during JavaScript execution: {e}")
@@ -194,18 +293,6 @@ class JsDockerCompiler:
                 execution_time=0.0,
                 syntax_output=""
             )
-        
-        finally:
-            # Cleanup
-            if temp_file:
-                self._cleanup_temp_file(temp_file)
-            
-            # Remove container if it exists
-            if container:
-                try:
-                    container.remove(force=True)
-                except:
-                    pass
     
     def check_syntax(self, js_code: str) -> CompilerResult:
         """
@@ -219,18 +306,99 @@ class JsDockerCompiler:
         """
         return self.compile_and_run(js_code, check_syntax_only=True)
     
+    def judge(self, js_code: str, test_cases: List[TestCase], time_limit: float = 2.0,
+              parallelism: int = 1, node_flags: List[str] = None,
+              profile: Optional[str] = None,
+              extra_files: Optional[Dict[str, str]] = None) -> JudgeResult:
+        """
+        Run JavaScript code against many stdin test cases inside a single sandbox
+        
+        Args:
+            js_code (str): JavaScript code to judge
+            test_cases (List[TestCase]): Inputs and expected outputs
+            time_limit (float): Seconds allowed per case
+            parallelism (int): Cases run at once inside the sandbox
+            node_flags (List[str]): Additional Node.js flags
+            profile (str): Execution profile name; None for the default
+            extra_files (Dict[str, str]): Modules and data files placed next to code.js, by relative path
+            
+        Returns:
+            JudgeResult: Per-case verdicts (pass/fail/TLE/MLE/OLE/RE, or CE on a syntax error) and timings
+            
+        Raises:
+            UnknownProfileError: If no profile has that name
+            SubmissionFileError: If extra_files is malformed or too large
+        """
+        limits = self.profiles.get(profile, "js")
+        extra = normalize_submission_files(extra_files, self.entry_file)
+        flags = ' '.join(node_flags if node_flags is not None else ["--no-warnings"])
+        try:
+            result, _ = judge_in_sandbox(
+                self.backend,
+                files={**extra, 'code.js': js_code.encode('utf-8')},
+                cases=test_cases,
+                run_command=f"node {flags} code.js",
+                time_limit=time_limit,
+                parallelism=parallelism,
+                compile_command=f"node {flags} --check code.js",
+                profile=limits
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Error during JavaScript judging: {e}")
+            return JudgeResult(success=False, passed=0, failed=len(test_cases), error=str(e))
+    
+    def stream_run(self, js_code: str, timeout: Optional[int] = None, node_flags: List[str] = None,
+                   max_output_bytes: int = DEFAULT_STREAM_MAX_BYTES,
+                   profile: Optional[str] = None,
+                   extra_files: Optional[Dict[str, str]] = None) -> Iterator[StreamEvent]:
+        """
+        Run JavaScript code and yield its output incrementally instead of after it exits
+        
+        Args:
+            js_code (str): JavaScript code to run
+            timeout (int): Timeout in seconds for execution; defaults to the profile's
+            node_flags (List[str]): Additional Node.js flags
+            max_output_bytes (int): Cap on stdout + stderr bytes forwarded, further capped by the profile
+            profile (str): Execution profile name; None for the default
+            extra_files (Dict[str, str]): Modules and data files placed next to code.js, by relative path
+            
+        Yields:
+            StreamEvent: stdout/stderr chunks, then an "exit" (or "error") event
+            
+        Raises:
+            UnknownProfileError: If no profile has that name
+            SubmissionFileError: If extra_files is malformed or too large
+        """
+        limits = self.profiles.get(profile, "js")
+        timeout = limits.resolve_timeout(timeout)
+        extra = normalize_submission_files(extra_files, self.entry_file)
+        return self.backend.stream(
+            files={**extra, 'code.js': js_code.encode('utf-8')},
+            command=sandboxed_script([('run', self._build_command(timeout, False, node_flags))]),
+            timeout=timeout,
+            max_bytes=min(max_output_bytes, limits.max_output_bytes),
+            profile=limits
+        )
+    
     def get_available_images(self) -> list:
-        """Get list of available JavaScript Docker images"""
+        """Get list of available JavaScript Docker images from the cached local image index"""
         try:
-            images = self.client.images.list()
-            js_images = [
-                img.tags[0] for img in images 
-                if img.tags and any('node' in tag or 'javascript' in tag or 'js' in tag for tag in img.tags)
-            ]
-            return js_images
+            return [tag for tag in self.backend.image_tags()
+                    if 'node' in tag or 'javascript' in tag or 'js' in tag]
         except Exception as e:
             logger.error(f"Error getting JavaScript images: {e}")
             return []
+    
+    def get_pool_stats(self) -> Optional[Dict]:
+        """Get warm container pool statistics, or None if pooling is disabled"""
+        return self.backend.get_stats()
+    
+    def shutdown(self):
+        """Release pooled containers, syntax workers and other backend resources held by this compiler"""
+        self.backend.shutdown()
+        if self.syntax_workers:
+            self.syntax_workers.shutdown()
 
 def format_js_compiler_output(result: CompilerResult) -> str:
     """
@@ -249,6 +417,8 @@ def format_js_compiler_output(result: CompilerResult) -> str:
     output_lines.append(f"=== JAVASCRIPT EXECUTION RESULT: {status} ===")
     output_lines.append(f"Exit Code: {result.exit_code}")
     output_lines.append(f"Execution Time: {result.execution_time:.2f}s")
+    output_lines.extend(format_timings(result.timings))
+    output_lines.extend(format_resource_usage(result.resource_usage))
     output_lines.append("")
     
     # Syntax Output (syntax errors, warnings)
@@ -0,0 +1,54 @@
+'use strict';
+// JavaScript syntax-check worker.
+// Reads newline-delimited JSON requests {id, source} on stdin and writes one
+// JSON response {id, ok, error, diagnostics} per line on stdout. Sources are
+// compiled with the CommonJS wrapper parameters (like `node --check`) but are
+// never executed.
+
+const vm = require('vm');
+const readline = require('readline');
+
+const FILENAME = '/app/code.js';
+const WRAPPER_PARAMS = ['exports', 'require', 'module', '__filename', '__dirname'];
+
+function diagnose(error) {
+  const stack = String(error.stack || error);
+  const header = stack.split('\n\n')[0];
+  const lines = header.split('\n');
+  const location = /:(\d+)$/.exec(lines[0] || '');
+  const caretLine = lines.find((line) => /^\s*\^+\s*$/.test(line));
+  const message = `${error.name}: ${error.message}`;
+  return {
+    error: location ? `${header}\n\n${message}\n` : `${message}\n`,
+    diagnostic: {
+      type: error.name,
+      line: location ? Number(location[1]) : null,
+      column: caretLine ? caretLine.indexOf('^') + 1 : null,
+      end_line: location ? Number(location[1]) : null,
+      end_column: caretLine ? caretLine.lastIndexOf('^') + 2 : null,
+      message: error.message,
+    },
+  };
+}
+
+function check(request) {
+  try {
+    vm.compileFunction(String(request.source), WRAPPER_PARAMS, { filename: FILENAME });
+    return { id: request.id, ok: true, error: '', diagnostics: [] };
+  } catch (error) {
+    const { error: text, diagnostic } = diagnose(error);
+    return { id: request.id, ok: false, error: text, diagnostics: [diagnostic] };
+  }
+}
+
+const input = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+input.on('line', (line) => {
+  let request;
+  try {
+    request = JSON.parse(line);
+  } catch (error) {
+    return;
+  }
+  process.stdout.write(JSON.stringify(check(request)) + '\n');
+});
+input.on('close', () => process.exit(0));
@@ -0,0 +1,391 @@
+"""
+JavaScript Syntax Worker Module
+This module supervises long-lived, sandboxed Node.js processes that parse JavaScript
+sent over a pipe, so syntax checks cost milliseconds instead of a container start.
+"""
+
+import itertools
+import json
+import os
+import re
+import resource
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+
+from .sandbox_reaper import sandbox_labels
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'js_syntax_worker.js')
+
+# Node.js flags of every worker; the parser needs little heap
+NODE_FLAGS = ["--max-old-space-size=128"]
+
+# Limits of a worker on the host, which parses untrusted code outside any container: a
+# lifetime CPU budget (parsing takes milliseconds, so only a runaway worker spends it) and
+# an address space well above what V8 reserves for a 128 MiB heap
+HOST_WORKER_CPU_SECONDS = 300
+HOST_WORKER_ADDRESS_SPACE = 1024 * 1024 * 1024
+
+# Limits of a worker container, and the label telling it apart from other helper sandboxes
+CONTAINER_WORKER_OPTIONS = {
+    'network_mode': 'none',
+    'mem_limit': '256m',
+    'nano_cpus': 500_000_000,
+    'pids_limit': 16,
+    'read_only': True,
+    'cap_drop': ['ALL'],
+}
+LABEL_ROLE = "edurun.role"
+
+
+def image_node_major(docker_image: str) -> Optional[int]:
+    """
+    Read the Node.js major version from an image tag such as "node:18-slim"
+
+    Args:
+        docker_image (str): Docker image tag
+
+    Returns:
+        int: Major version, or None if the tag does not name one
+    """
+    match = re.search(r'node:(\d+)', docker_image)
+    return int(match.group(1)) if match else None
+
+
+def host_node_major() -> Optional[int]:
+    """Get the major version of the `node` on the host PATH, if any"""
+    node = shutil.which("node")
+    if not node:
+        return None
+    try:
+        completed = subprocess.run([node, "--version"], capture_output=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.match(r'v(\d+)', completed.stdout.decode('utf-8', errors='replace'))
+    return int(match.group(1)) if match else None
+
+
+def host_worker_command(docker_image: str, script: str) -> Optional[List[str]]:
+    """
+    Build the command of a worker on the host, if the host `node` parses like the image
+
+    Args:
+        docker_image (str): Node.js image used for execution
+        script (str): Worker source code
+
+    Returns:
+        List[str]: Command line, or None if the host has no `node` of the image's major version
+    """
+    target = image_node_major(docker_image)
+    if target is not None and target == host_node_major():
+        return [shutil.which("node"), *NODE_FLAGS, "-e", script]
+    return None
+
+
+class NodeSyntaxWorker:
+    """
+    One Node.js worker process on the host; requests are multiplexed over its stdin/stdout by id
+    """
+
+    def __init__(self, command: List[str]):
+        """
+        Start the worker
+
+        Args:
+            command (List[str]): Node.js command line running the worker script
+        """
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.started = time.time()
+        self._launch(command)
+        self._reader = threading.Thread(target=self._read_loop, name="js-syntax-reader", daemon=True)
+        self._reader.start()
+
+    def _launch(self, command: List[str]):
+        """Start the process and limit it before it is sent any code"""
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env={'PATH': os.environ.get('PATH', '')}
+        )
+        try:
+            resource.prlimit(self.process.pid, resource.RLIMIT_CPU,
+                             (HOST_WORKER_CPU_SECONDS, HOST_WORKER_CPU_SECONDS + 5))
+            resource.prlimit(self.process.pid, resource.RLIMIT_AS,
+                             (HOST_WORKER_ADDRESS_SPACE, HOST_WORKER_ADDRESS_SPACE))
+        except (OSError, ValueError):
+            self.process.kill()
+            raise
+
+    def _output_lines(self) -> Iterator[bytes]:
+        """Iterate over the lines the worker writes to stdout, until it exits"""
+        return iter(self.process.stdout)
+
+    def _send(self, payload: bytes):
+        """Write to the worker's stdin"""
+        self.process.stdin.write(payload)
+        self.process.stdin.flush()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _read_loop(self):
+        """Resolve pending requests as responses arrive; fail them all if the process dies"""
+        for line in self._output_lines():
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue
+            with self._lock:
+                future = self._pending.pop(response.get('id'), None)
+            if future is not None:
+                future.set_result(response)
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError("JavaScript syntax worker exited"))
+
+    def check(self, js_code: str, timeout: float) -> Dict:
+        """
+        Send one source to the worker and wait for its diagnostics
+
+        Args:
+            js_code (str): JavaScript code to parse
+            timeout (float): Seconds to wait for the response
+
+        Returns:
+            Dict: The worker response {id, ok, error, diagnostics}
+        """
+        request_id = next(self._ids)
+        future = Future()
+        with self._lock:
+            self._pending[request_id] = future
+        payload = json.dumps({'id': request_id, 'source': js_code}) + "\n"
+        try:
+            with self._write_lock:
+                self._send(payload.encode('utf-8'))
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"JavaScript syntax worker did not answer within {timeout} seconds")
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    def stop(self):
+        """Terminate the worker process"""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+
+
+class ContainerSyntaxWorker(NodeSyntaxWorker):
+    """
+    One worker in a container of the Node.js image, started through the shared Docker client
+
+    The container is labeled as a helper sandbox, so the reaper removes it if this process dies.
+    """
+
+    def __init__(self, command: List[str], clients, docker_image: str):
+        """
+        Create, attach to and start the worker container
+
+        Args:
+            command (List[str]): Node.js command line running the worker script in the image
+            clients (DockerClientManager): Shared Docker client
+            docker_image (str): Node.js image to run the worker in
+        """
+        self.clients = clients
+        self.docker_image = docker_image
+        self.container = None
+        self._socket = None
+        self._exited = threading.Event()
+        super().__init__(command)
+
+    def _launch(self, command: List[str]):
+        client = self.clients.get_client()
+        with self.clients.guard():
+            self.container = client.containers.create(
+                image=self.docker_image,
+                command=command,
+                stdin_open=True,
+                labels={**sandbox_labels('helper'), LABEL_ROLE: 'js-syntax-worker'},
+                **CONTAINER_WORKER_OPTIONS
+            )
+            try:
+                # Attach before starting so no early output is missed
+                self._socket = self.container.attach_socket(params={'stdin': 1, 'stdout': 1, 'stream': 1})
+                self.container.start()
+            except Exception:
+                self.stop()
+                raise
+
+    def _output_lines(self) -> Iterator[bytes]:
+        from docker.utils.socket import STDOUT, frames_iter
+        buffer = b""
+        try:
+            for stream, data in frames_iter(self._socket, tty=False):
+                if stream != STDOUT:
+                    continue
+                *lines, buffer = (buffer + data).split(b"\n")
+                yield from lines
+        except OSError:
+            pass
+        finally:
+            self._exited.set()
+
+    def _send(self, payload: bytes):
+        # The attach socket is wrapped in a read-only file object; write to the socket beneath
+        getattr(self._socket, '_sock', self._socket).sendall(payload)
+
+    @property
+    def alive(self) -> bool:
+        return not self._exited.is_set()
+
+    def stop(self):
+        """Close the attach socket and remove the container"""
+        self._exited.set()
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+        if self.container is not None:
+            try:
+                self.clients.call(self.container.remove, force=True)
+            except Exception:
+                pass
+
+
+class NodeSyntaxWorkerPool:
+    """
+    Supervises a small pool of syntax workers, restarting them on crash and replacing them with age
+
+    A host `node` of the image's major version runs the workers directly; otherwise they run
+    in containers of the image, started through the shared Docker client.
+    """
+
+    def __init__(self, docker_image: str, size: int = 1, timeout: float = 5.0,
+                 max_restarts: int = 5, restart_window: float = 60.0,
+                 clients=None, max_lifetime: float = 600.0):
+        """
+        Initialize the pool; workers are started lazily on the first check
+
+        Args:
+            docker_image (str): Node.js image whose parser must be matched
+            size (int): Number of worker processes
+            timeout (float): Seconds to wait for a single check
+            max_restarts (int): Restarts allowed within restart_window before giving up
+            restart_window (float): Seconds over which restarts are counted
+            clients (DockerClientManager): Shared Docker client for worker containers, or None
+                to only use a host `node`
+            max_lifetime (float): Seconds an idle worker serves before it is replaced; keeps
+                worker containers younger than the reaper's age limit for helper sandboxes
+        """
+        self.docker_image = docker_image
+        self.size = size
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.clients = clients
+        self.max_lifetime = max_lifetime
+        self._workers: List[Optional[NodeSyntaxWorker]] = [None] * size
+        self._restarts: List[float] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        with open(WORKER_SCRIPT_PATH, 'r', encoding='utf-8') as f:
+            self._script = f.read()
+        self._command = host_worker_command(docker_image, self._script)
+        if self._command is None and self.clients is None:
+            logger.info("No Node.js launcher for syntax workers; syntax checks use the container")
+
+    @property
+    def available(self) -> bool:
+        """True if a worker can be launched"""
+        return (self._command is not None or self.clients is not None) and not self._closed
+
+    def _start_worker(self) -> NodeSyntaxWorker:
+        """Start a worker on the host if its `node` matches the image, else in a container"""
+        if self._command is not None:
+            return NodeSyntaxWorker(self._command)
+        return ContainerSyntaxWorker(["node", *NODE_FLAGS, "-e", self._script], self.clients, self.docker_image)
+
+    def _get_worker(self) -> NodeSyntaxWorker:
+        """Pick the least busy worker, (re)starting dead ones under the restart budget"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("JavaScript syntax worker pool is shut down")
+            now = time.time()
+            for i, worker in enumerate(self._workers):
+                if worker is not None and worker.alive:
+                    if worker.pending or now - worker.started < self.max_lifetime:
+                        continue
+                    worker.stop()  # Retired, not crashed
+                else:
+                    # Workers that failed to start count against the budget like crashed ones
+                    self._restarts = [t for t in self._restarts if now - t < self.restart_window]
+                    if len(self._restarts) >= self.max_restarts:
+                        raise RuntimeError("JavaScript syntax worker keeps crashing; restart budget exhausted")
+                    if worker is not None:
+                        worker.stop()
+                        self._restarts.append(now)
+                        logger.warning("Restarting crashed JavaScript syntax worker")
+                self._workers[i] = None
+                try:
+                    self._workers[i] = self._start_worker()
+                except Exception:
+                    self._restarts.append(now)
+                    raise
+            return min(self._workers, key=lambda w: w.pending)
+
+    def check(self, js_code: str) -> Tuple[bool, str, List[Dict]]:
+        """
+        Parse JavaScript without executing it
+
+        Args:
+            js_code (str): JavaScript code to check
+
+        Returns:
+            tuple: (valid, error text formatted like `node --check`, list of diagnostics)
+        """
+        worker = self._get_worker()
+        try:
+            response = worker.check(js_code, self.timeout)
+        except TimeoutError:
+            # A parser stuck on pathological input would block every later request
+            worker.stop()
+            raise
+        return response['ok'], response['error'], response['diagnostics']
+
+    def shutdown(self):
+        """Stop all worker processes"""
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, [None] * self.size
+        for worker in workers:
+            if worker is not None:
+                worker.stop()
@@ -0,0 +1,285 @@
+"""
+Test-Case Judging Module
+This module compiles or loads a submission once inside a single sandbox and runs it
+against many stdin test cases, returning a pass/fail/TLE/MLE/OLE/RE verdict and timing per case.
+"""
+
+import math
+import shlex
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+import logging
+
+from .container_pool import TIMEOUT_EXIT_CODES, privilege_drop_lines
+from .execution_backend import ExecutionBackend, INSTRUMENTATION_DIR
+from .execution_profiles import ExecutionProfile, SIGKILL_EXIT_CODE, MEMORY_ERROR_MARKERS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Directory inside /app the case inputs are delivered to
+JUDGE_INPUT_DIR = ".judge"
+# Root-only directory the inputs are moved to and outputs, status files and the artifact are written to
+JUDGE_DIR = f"{INSTRUMENTATION_DIR}/judge"
+
+
+class Verdict:
+    """Per-case verdicts"""
+    PASS = "pass"  # Exit code 0 and output matched (or no expected output given)
+    FAIL = "fail"  # Exit code 0 but output differed
+    TLE = "TLE"  # Killed at the time limit
+    MLE = "MLE"  # Killed by the memory limit (or failed to allocate under it)
+    OLE = "OLE"  # Wrote more output than the per-case cap
+    RE = "RE"  # Non-zero exit code
+    CE = "CE"  # The submission did not compile; no case was run
+
+
+@dataclass
+class TestCase:
+    """Data class to hold one judging input and its expected output"""
+    stdin: str = ""
+    expected_output: Optional[str] = None
+
+
+@dataclass
+class CaseResult:
+    """Data class to hold the outcome of one test case"""
+    index: int
+    verdict: str
+    exit_code: Optional[int]
+    time: float  # Wall time of the case in seconds, measured inside the sandbox
+    stdout: str = ""
+    stderr: str = ""
+    output_bytes: int = 0
+    truncated: bool = False
+
+
+@dataclass
+class JudgeResult:
+    """Data class to hold the outcome of a judging run"""
+    success: bool  # True if every case passed
+    passed: int
+    failed: int
+    cases: List[CaseResult] = field(default_factory=list)
+    compile_output: str = ""
+    compile_time: float = 0.0
+    total_time: float = 0.0
+    error: str = ""  # Set when the sandbox itself failed
+    # No resource usage: the cases share one sandbox, so its snapshots could not be told apart
+
+    def to_dict(self) -> Dict:
+        """Convert the result to a JSON-serializable dictionary"""
+        return asdict(self)
+
+
+def outputs_match(actual: str, expected: str) -> bool:
+    """Compare program output ignoring trailing whitespace on lines and trailing blank lines"""
+    def normalize(text: str) -> List[str]:
+        return [line.rstrip() for line in text.rstrip().splitlines()]
+    return normalize(actual) == normalize(expected)
+
+
+def build_judge_script(run_command: str, case_count: int, time_limit: float,
+                       parallelism: int, max_output_bytes: int,
+                       compile_command: Optional[str] = None,
+                       compile_timeout: float = 60.0,
+                       extract_path: Optional[str] = None) -> str:
+    """
+    Build the bash script that compiles once and runs every case in the sandbox
+
+    Each case writes <i>.out, <i>.err and <i>.status ("exit_code microseconds out_bytes
+    err_bytes") into JUDGE_DIR; a compile failure writes compile.status instead. The
+    submission only ever runs as the sandbox user, while the script stays root and owns
+    JUDGE_DIR, so a case cannot rewrite its own or another case's status. A container that
+    cannot drop privileges runs nothing. On the local backend JUDGE_DIR is under the run's
+    EDURUN_META directory instead, which the program's user can write (see LocalBackend).
+
+    Args:
+        run_command (str): Command that runs the submission
+        case_count (int): Number of cases; inputs are delivered as <i>.in in JUDGE_INPUT_DIR
+        time_limit (float): Seconds per case
+        parallelism (int): Cases run at once
+        max_output_bytes (int): Bytes of stdout/stderr kept per case
+        compile_command (str): Optional command run once before the cases
+        compile_timeout (float): Seconds allowed for compile_command
+        extract_path (str): File copied to JUDGE_DIR/artifact after a successful compile,
+            before any case can modify it
+
+    Returns:
+        str: The script
+    """
+    lines = privilege_drop_lines() + [
+        'if [ -z "$EDURUN_META" ] && [ -z "$__as_sandbox" ]; then',
+        '  echo "Judging needs a sandbox that can drop privileges (root with setpriv)" >&2',
+        '  exit 1',
+        'fi',
+        f'__meta=${{EDURUN_META:-{INSTRUMENTATION_DIR}}}',
+        'export -n EDURUN_META',  # Not advertised to the program
+        'J="$__meta/judge"',
+        'mkdir -p -m 700 "$__meta" "$J" || exit 1',
+        f'mv -- {JUDGE_INPUT_DIR}/*.in "$J"/ && rmdir {JUDGE_INPUT_DIR} || exit 1',
+    ]
+    if compile_command:
+        lines += [
+            "compile_start=$(date +%s%N)",
+            f"timeout -s KILL {compile_timeout}s bash -c {shlex.quote(compile_command)} "
+            "> \"$J/compile.out\" 2>&1",
+            "status=$?",
+            "echo $(( ($(date +%s%N) - compile_start) / 1000 )) > \"$J/compile.time\"",
+            f"truncate -s '<{max_output_bytes}' \"$J/compile.out\"",
+            "if [ $status -ne 0 ]; then echo $status > \"$J/compile.status\"; exit 0; fi",
+        ]
+    if extract_path:
+        lines.append(f'cp -- {shlex.quote(extract_path)} "$J/artifact"')
+    lines += [
+        "run_case() {",
+        "  local i=$1 start end code",
+        "  start=$(date +%s%N)",
+        f"  timeout -s KILL {time_limit}s $__as_sandbox {run_command} < \"$J/$i.in\" "
+        "> \"$J/$i.out\" 2> \"$J/$i.err\"",
+        "  code=$?",
+        "  end=$(date +%s%N)",
+        "  echo \"$code $(( (end - start) / 1000 )) $(stat -c %s \"$J/$i.out\") "
+        "$(stat -c %s \"$J/$i.err\")\" > \"$J/$i.status\"",
+        f"  truncate -s '<{max_output_bytes}' \"$J/$i.out\" \"$J/$i.err\"",
+        "}",
+        f"for i in $(seq 0 {case_count - 1}); do",
+        f"  while [ \"$(jobs -rp | wc -l)\" -ge {parallelism} ]; do wait -n; done",
+        "  run_case $i &",
+        "done",
+        "wait",
+    ]
+    return "\n".join(lines)
+
+
+def parse_judge_files(files: Dict[str, bytes], cases: List[TestCase],
+                      time_limit: float, max_output_bytes: int) -> JudgeResult:
+    """
+    Turn the judge directory contents into verdicts
+
+    Args:
+        files (Dict[str, bytes]): Files read back from the judge directory
+        cases (List[TestCase]): The cases that were run
+        time_limit (float): Seconds per case
+        max_output_bytes (int): Bytes of output kept per case
+
+    Returns:
+        JudgeResult: Per-case verdicts (total_time is filled in by the caller)
+    """
+    def text(name: str) -> str:
+        return files.get(name, b"").decode('utf-8', errors='replace')
+
+    compile_time = int(text('compile.time') or 0) / 1e6
+    if 'compile.status' in files:
+        results = [CaseResult(index=i, verdict=Verdict.CE, exit_code=None, time=0.0)
+                   for i in range(len(cases))]
+        return JudgeResult(success=False, passed=0, failed=len(cases), cases=results,
+                           compile_output=text('compile.out'), compile_time=compile_time)
+
+    results = []
+    for i, case in enumerate(cases):
+        status = text(f"{i}.status").split()
+        if len(status) != 4:
+            results.append(CaseResult(index=i, verdict=Verdict.RE, exit_code=None, time=0.0,
+                                      stderr="Case did not finish"))
+            continue
+        exit_code, elapsed = int(status[0]), int(status[1]) / 1e6
+        out_bytes, err_bytes = int(status[2]), int(status[3])
+        stdout, stderr = text(f"{i}.out"), text(f"{i}.err")
+
+        if exit_code in TIMEOUT_EXIT_CODES and elapsed >= time_limit:
+            verdict = Verdict.TLE
+        elif exit_code == SIGKILL_EXIT_CODE or (
+                exit_code != 0 and any(marker in stderr for marker in MEMORY_ERROR_MARKERS)):
+            # Killed before the time limit: only the OOM killer sends SIGKILL then
+            verdict = Verdict.MLE
+        elif out_bytes > max_output_bytes:
+            verdict = Verdict.OLE
+        elif exit_code != 0:
+            verdict = Verdict.RE
+        elif case.expected_output is not None and not outputs_match(stdout, case.expected_output):
+            verdict = Verdict.FAIL
+        else:
+            verdict = Verdict.PASS
+        results.append(CaseResult(
+            index=i,
+            verdict=verdict,
+            exit_code=exit_code,
+            time=elapsed,
+            stdout=stdout,
+            stderr=stderr,
+            output_bytes=out_bytes,
+            truncated=out_bytes > max_output_bytes or err_bytes > max_output_bytes
+        ))
+
+    passed = sum(1 for r in results if r.verdict == Verdict.PASS)
+    return JudgeResult(success=passed == len(cases), passed=passed,
+                       failed=len(cases) - passed, cases=results,
+                       compile_output=text('compile.out'), compile_time=compile_time)
+
+
+def judge_in_sandbox(backend: ExecutionBackend, files: Dict[str, bytes], cases: List[TestCase],
+                     run_command: str, time_limit: float = 2.0, parallelism: int = 1,
+                     compile_command: Optional[str] = None,
+                     compile_timeout: float = 60.0,
+                     max_output_bytes: int = 64 * 1024,
+                     executables: Optional[Dict[str, bytes]] = None,
+                     extract_path: Optional[str] = None,
+                     profile: Optional[ExecutionProfile] = None):
+    """
+    Compile once and run every test case inside one sandbox
+
+    Args:
+        backend (ExecutionBackend): Where the sandbox runs
+        files (Dict[str, bytes]): Source files copied into the working directory
+        cases (List[TestCase]): Test cases
+        run_command (str): Command that runs the submission from the working directory
+        time_limit (float): Seconds per case
+        parallelism (int): Cases run at once
+        compile_command (str): Optional command run once before the cases
+        compile_timeout (float): Seconds allowed for compile_command
+        max_output_bytes (int): Bytes of stdout/stderr kept per case
+        executables (Dict[str, bytes]): Extra files copied in with mode 0755
+        extract_path (str): File to read back after a successful compile (e.g. the binary),
+            copied before any case runs
+        profile (ExecutionProfile): Resource limits of the sandbox the cases share
+
+    Returns:
+        tuple: (JudgeResult, contents of extract_path or None)
+    """
+    start_time = time.time()
+    parallelism = max(1, min(parallelism, len(cases)))
+    script = build_judge_script(run_command, len(cases), time_limit, parallelism,
+                                max_output_bytes, compile_command, compile_timeout, extract_path)
+    inputs = {f"{JUDGE_INPUT_DIR}/{i}.in": case.stdin.encode('utf-8') for i, case in enumerate(cases)}
+    # Every batch of parallel cases may take the full time limit, plus process startup
+    budget = (compile_timeout if compile_command else 0) + \
+        math.ceil(len(cases) / parallelism) * (time_limit + 1) + 10
+
+    outcome = backend.run(
+        {**files, **inputs},
+        script,
+        budget,
+        executables=executables,
+        collect=[JUDGE_DIR],
+        profile=profile
+    )
+
+    prefix = f"{JUDGE_DIR}/"
+    judge_files = {name[len(prefix):]: data for name, data in outcome.files.items()
+                   if name.startswith(prefix)}
+    result = parse_judge_files(judge_files, cases, time_limit, max_output_bytes)
+    if outcome.timed_out:
+        result.error = f"Judging exceeded its overall budget of {budget:.0f} seconds"
+    elif not judge_files and outcome.exit_code != 0:
+        result.error = outcome.captured.stderr.strip() or "The judge sandbox failed to start"
+    extracted = None
+    compiled = not any(r.verdict == Verdict.CE for r in result.cases)
+    if extract_path and compiled and not outcome.timed_out:
+        extracted = judge_files.get('artifact')
+        if extracted is None:
+            logger.warning(f"Could not read {extract_path} back from the judge sandbox")
+    result.total_time = time.time() - start_time
+    return result, extracted
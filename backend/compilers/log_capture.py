@@ -0,0 +1,208 @@
+"""
+Log Capture Module
+This module reads a sandbox's stdout and stderr in a single demultiplexed pass,
+decoding incrementally and keeping at most a configured number of bytes and lines
+per stream so chatty programs cannot exhaust server memory.
+"""
+
+import codecs
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from .metrics import PhaseTimer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutputLimits:
+    """Data class to hold per-stream capture limits"""
+    max_bytes: int = 1024 * 1024  # Bytes kept per stream
+    max_lines: int = 10000  # Lines kept per stream
+
+
+class StreamCapture:
+    """
+    Accumulates one output stream up to a byte and line limit, counting what is dropped
+    """
+
+    def __init__(self, name: str, limits: OutputLimits):
+        self.name = name
+        self.limits = limits
+        self.total_bytes = 0  # Everything the program wrote, including dropped output
+        self.truncated = False
+        self._kept_bytes = 0
+        self._lines = 0
+        self._parts: List[str] = []
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def feed(self, chunk: bytes):
+        """Add a chunk of raw output"""
+        self.total_bytes += len(chunk)
+        if self.truncated:
+            return
+
+        piece = chunk[:self.limits.max_bytes - self._kept_bytes]
+        self._kept_bytes += len(piece)
+        if len(piece) < len(chunk):
+            self.truncated = True
+        text = self._decoder.decode(piece, final=self.truncated)
+
+        # Cut after the last newline allowed by the line limit
+        allowed = self.limits.max_lines - self._lines
+        if text.count('\n') >= allowed:
+            cut = 0
+            for _ in range(allowed):
+                cut = text.index('\n', cut) + 1
+            if cut < len(text):
+                text = text[:cut]
+                self.truncated = True
+        self._lines += text.count('\n')
+        self._parts.append(text)
+
+    def text(self) -> str:
+        """Get the captured text, ending with a marker if output was dropped"""
+        text = "".join(self._parts)
+        if self.truncated:
+            return text + (
+                f"\n... {self.name} truncated: limit is {self.limits.max_bytes} bytes "
+                f"or {self.limits.max_lines} lines, program wrote {self.total_bytes} bytes ...\n"
+            )
+        return text + self._decoder.decode(b"", final=True)
+
+
+@dataclass
+class CapturedOutput:
+    """Data class to hold captured stdout/stderr and how much of it was kept"""
+    stdout: str
+    stderr: str
+    stdout_bytes: int
+    stderr_bytes: int
+    truncated: bool
+
+    def stats(self) -> Dict:
+        """Get the capture counters as CompilerResult keyword arguments"""
+        return {
+            'output_bytes': self.stdout_bytes,
+            'error_bytes': self.stderr_bytes,
+            'truncated': self.truncated,
+        }
+
+
+class CaptureTimeout(TimeoutError):
+    """Raised when a container had to be killed at its time limit; carries what it wrote before"""
+
+    def __init__(self, message: str, captured: CapturedOutput):
+        super().__init__(message)
+        self.captured = captured
+
+
+def capture_frames(frames: Iterable[Tuple[Optional[bytes], Optional[bytes]]],
+                   limits: Optional[OutputLimits] = None) -> CapturedOutput:
+    """
+    Consume a demultiplexed (stdout, stderr) frame stream
+
+    Frames past the limits are still read (so the program is never blocked on a full
+    pipe) but only counted, not kept.
+
+    Args:
+        frames: Iterable of (stdout chunk, stderr chunk) pairs, either of which may be None
+        limits (OutputLimits): Per-stream byte and line limits
+
+    Returns:
+        CapturedOutput: The captured text and byte counts
+    """
+    limits = limits or OutputLimits()
+    stdout = StreamCapture('stdout', limits)
+    stderr = StreamCapture('stderr', limits)
+    for out_chunk, err_chunk in frames:
+        if out_chunk:
+            stdout.feed(out_chunk)
+        if err_chunk:
+            stderr.feed(err_chunk)
+    return CapturedOutput(
+        stdout=stdout.text(),
+        stderr=stderr.text(),
+        stdout_bytes=stdout.total_bytes,
+        stderr_bytes=stderr.total_bytes,
+        truncated=stdout.truncated or stderr.truncated
+    )
+
+
+def exec_and_capture(client, container, command: List[str], workdir: str,
+                     limits: Optional[OutputLimits] = None,
+                     phases: Optional[PhaseTimer] = None) -> Tuple[int, CapturedOutput]:
+    """
+    Run a command in a running container and capture its output in one streamed pass
+
+    The command must bound its own run time (e.g. with `timeout`).
+
+    Args:
+        client: Docker client
+        container: Running container
+        command (List[str]): Command to execute
+        workdir (str): Working directory for the command
+        limits (OutputLimits): Per-stream byte and line limits
+        phases (PhaseTimer): Receives the "start" (exec create) and "run" (output and exit) phases
+
+    Returns:
+        tuple: (exit code, CapturedOutput)
+    """
+    phases = phases or PhaseTimer()
+    with phases.phase('start'):
+        exec_id = client.api.exec_create(container.id, command, workdir=workdir)['Id']
+    with phases.phase('run'):
+        captured = capture_frames(client.api.exec_start(exec_id, stream=True, demux=True), limits)
+        exit_code = client.api.exec_inspect(exec_id)['ExitCode']
+    return exit_code, captured
+
+
+def run_and_capture(container, timeout: float, grace: float = 0,
+                    limits: Optional[OutputLimits] = None,
+                    phases: Optional[PhaseTimer] = None) -> Tuple[int, CapturedOutput]:
+    """
+    Start a created container and capture its output in one streamed pass
+
+    Args:
+        container: Container created but not yet started
+        timeout (float): Seconds the program may run
+        grace (float): Extra seconds (startup, compilation) before the container is killed
+        limits (OutputLimits): Per-stream byte and line limits
+        phases (PhaseTimer): Receives the "start" (attach and start) and "run" (output and exit) phases
+
+    Returns:
+        tuple: (exit code, CapturedOutput)
+
+    Raises:
+        CaptureTimeout: If the container had to be killed; its output up to the kill is attached
+    """
+    phases = phases or PhaseTimer()
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        try:
+            container.kill()
+        except Exception:
+            pass
+
+    timer = threading.Timer(timeout + grace, kill)
+    timer.daemon = True
+    with phases.phase('start'):
+        # Attach before starting so no early output is missed
+        frames = container.attach(stdout=True, stderr=True, stream=True, demux=True)
+        container.start()
+    timer.start()
+    try:
+        with phases.phase('run'):
+            captured = capture_frames(frames, limits)
+            exit_code = container.wait(timeout=timeout + grace)['StatusCode']
+    finally:
+        timer.cancel()
+    if timed_out.is_set():
+        raise CaptureTimeout(f"Execution timed out after {timeout} seconds", captured)
+    return exit_code, captured
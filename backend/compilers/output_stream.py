@@ -0,0 +1,169 @@
+"""
+Streaming Output Module
+This module runs a command in a sandbox container and yields its stdout/stderr as
+incremental events while it runs, with a cap on the total bytes forwarded.
+"""
+
+import codecs
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+import logging
+
+from .container_pool import ContainerPool, TIMEOUT_EXIT_CODES, build_archive
+from .sandbox_reaper import sandbox_labels
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default cap on stdout + stderr bytes forwarded for one streamed run
+DEFAULT_STREAM_MAX_BYTES = 1024 * 1024
+
+
+@dataclass
+class StreamEvent:
+    """Data class to hold one event of a streamed run"""
+    event: str  # "stdout", "stderr", "truncated", "exit" or "error"
+    data: Dict = field(default_factory=dict)
+
+    def to_sse(self) -> str:
+        """Format the event as a Server-Sent Events message"""
+        return f"event: {self.event}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class OutputCap:
+    """
+    Turns demuxed (stdout, stderr) byte frames into text events until max_bytes is reached
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_STREAM_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.truncated = False
+        # Incremental decoders so multi-byte characters split across frames survive
+        self._decoders = {
+            'stdout': codecs.getincrementaldecoder('utf-8')(errors='replace'),
+            'stderr': codecs.getincrementaldecoder('utf-8')(errors='replace'),
+        }
+
+    def feed(self, stdout: Optional[bytes], stderr: Optional[bytes]) -> Iterator[StreamEvent]:
+        """
+        Convert one frame into events, truncating at the byte cap
+
+        Args:
+            stdout (bytes): stdout chunk, or None
+            stderr (bytes): stderr chunk, or None
+
+        Yields:
+            StreamEvent: "stdout"/"stderr" chunks, then "truncated" once the cap is hit
+        """
+        for name, chunk in (('stdout', stdout), ('stderr', stderr)):
+            if not chunk or self.truncated:
+                continue
+            remaining = self.max_bytes - self.total_bytes
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+                self.truncated = True
+            self.total_bytes += len(chunk)
+            text = self._decoders[name].decode(chunk, final=self.truncated)
+            if text:
+                yield StreamEvent(name, {'data': text})
+            if self.truncated:
+                yield StreamEvent('truncated', {'max_bytes': self.max_bytes})
+
+    def flush(self) -> Iterator[StreamEvent]:
+        """Emit any bytes still held by the decoders"""
+        for name, decoder in self._decoders.items():
+            text = decoder.decode(b"", final=True)
+            if text:
+                yield StreamEvent(name, {'data': text})
+
+
+def stream_command(client, docker_image: str, pool: Optional[ContainerPool],
+                   files: Dict[str, bytes], command: str, timeout: int, grace: int = 5,
+                   max_bytes: int = DEFAULT_STREAM_MAX_BYTES,
+                   run_options: Optional[Dict] = None) -> Iterator[StreamEvent]:
+    """
+    Run a shell command in a pooled or fresh container and stream its output
+
+    Output is pulled from Docker only as fast as the consumer iterates, so a slow
+    client slows the program down instead of growing server memory. Closing the
+    generator early (e.g. on client disconnect) kills the run.
+
+    Args:
+        client: Docker client
+        docker_image (str): Image for a fresh container when no pool is given
+        pool (ContainerPool): Warm pool to run in, or None for a fresh container
+        files (Dict[str, bytes]): Files copied into /app before the command runs
+        command (str): Shell command to run in /app
+        timeout (int): Timeout in seconds the command enforces itself
+        grace (int): Extra seconds before the outer kill switch fires
+        max_bytes (int): Cap on stdout + stderr bytes forwarded
+        run_options (Dict): Extra options for `containers.create` (volumes, environment)
+
+    Yields:
+        StreamEvent: Output chunks, an optional "truncated" event, then one "exit" event
+    """
+    cap = OutputCap(max_bytes)
+    wrapped = ["timeout", "-s", "KILL", f"{timeout + grace}s", "bash", "-c", command]
+    start_time = time.time()
+    pooled = None
+    container = None
+    finished = False
+
+    try:
+        if pool:
+            pooled = pool.acquire()
+            pool.put_files(pooled, files)
+            exec_id = client.api.exec_create(pooled.container.id, wrapped,
+                                             workdir=pool.config.workdir)['Id']
+            frames = client.api.exec_start(exec_id, stream=True, demux=True)
+        else:
+            container = client.containers.create(
+                image=docker_image,
+                command=wrapped,
+                working_dir='/app',
+                labels=sandbox_labels('run'),
+                **(run_options or {})
+            )
+            if not container.put_archive('/app', build_archive(files)):
+                raise RuntimeError("Failed to copy code into sandbox container")
+            # Attach before starting so no early output is missed
+            frames = container.attach(stdout=True, stderr=True, stream=True, demux=True)
+            container.start()
+
+        for stdout, stderr in frames:
+            yield from cap.feed(stdout, stderr)
+            if cap.truncated:
+                break
+        yield from cap.flush()
+
+        if cap.truncated:
+            exit_code = -1
+        elif pooled:
+            exit_code = client.api.exec_inspect(exec_id)['ExitCode']
+        else:
+            exit_code = container.wait(timeout=grace)['StatusCode']
+        finished = not cap.truncated and exit_code not in TIMEOUT_EXIT_CODES
+
+        yield StreamEvent('exit', {
+            'success': exit_code == 0,
+            'exit_code': exit_code,
+            'execution_time': time.time() - start_time,
+            'truncated': cap.truncated,
+            'bytes': cap.total_bytes,
+        })
+    except Exception as e:
+        logger.error(f"Error during streamed execution: {e}")
+        yield StreamEvent('error', {'error': str(e)})
+    finally:
+        # Anything but a clean exit may leave the program running; kill it with the container
+        if pooled:
+            pool.release(pooled, reusable=finished)
+        if container:
+            try:
+                container.remove(force=True)
+            except:
+                pass
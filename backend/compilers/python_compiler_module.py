@@ -4,14 +4,28 @@ This module provides functionality to compile and run Python code using Docker c
 and capture the compiler/runtime messages for display.
 """
 
-import docker
-import tempfile
-import os
 import json
-from typing import Dict, Optional, Tuple
-from dataclasses import dataclass
+import shlex
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, asdict, field
 import logging
 
+from .result_cache import ResultCache, make_cache_key, is_cacheable_exit_code
+from .metrics import CACHE_LOOKUPS_TOTAL
+from .python_syntax import PythonSyntaxChecker, parse_syntax_error_text
+from .container_pool import PoolConfig
+from .output_stream import StreamEvent, DEFAULT_STREAM_MAX_BYTES
+from .log_capture import OutputLimits
+from .execution_backend import ExecutionBackend, DockerBackend
+from .docker_client import DockerClientManager
+from .execution_profiles import ExecutionProfile, ProfileSet, LimitVerdict, limit_verdict
+from .submission_files import normalize_submission_files, files_with_suffix
+from .judge import TestCase, JudgeResult, judge_in_sandbox
+from .timing import (INSTRUMENTATION_FILES, timed_script, sandboxed_script, build_timings, merge_timings,
+                     format_timings)
+from .resource_usage import build_resource_usage, format_resource_usage, usage_distributions
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,138 +38,210 @@ class CompilerResult:
     error: str
     exit_code: int
     execution_time: float
+    cached: bool = False  # True if served from the result cache
+    diagnostics: List[Dict] = field(default_factory=list)  # Structured syntax errors (line, column, message)
+    output_bytes: int = 0  # Bytes the program wrote to stdout, including any truncated part
+    error_bytes: int = 0  # Bytes the program wrote to stderr, including any truncated part
+    truncated: bool = False  # True if output exceeded the capture limits
+    timings: Dict[str, float] = field(default_factory=dict)  # Seconds per phase: setup, compile, run, capture, teardown
+    resource_usage: Dict = field(default_factory=dict)  # CPU time, peak memory, block I/O and processes of the run
+    profile: str = ""  # Execution profile the run was held to
+    verdict: str = ""  # OK, RE, CE, TLE, MLE or OLE; empty if the sandbox itself failed
+    file_transfer: Dict = field(default_factory=dict)  # How the files reached the sandbox: method, files, bytes, host_disk_bytes
 
 class PythonDockerCompiler:
     """
     A class to compile and run Python code using Docker containers
     """
     
-    def __init__(self, docker_image: str = "python:3.9-slim"):
+    entry_file = "code.py"  # Name of the submitted code in the sandbox; extra files sit next to it
+    
+    def __init__(self, docker_image: str = "python:3.9-slim",
+                 use_pool: bool = False,
+                 pool_config: Optional[PoolConfig] = None,
+                 result_cache: Optional[ResultCache] = None,
+                 fast_syntax_check: bool = True,
+                 output_limits: Optional[OutputLimits] = None,
+                 backend: Optional[ExecutionBackend] = None,
+                 profiles: Optional[ProfileSet] = None,
+                 docker_clients: Optional[DockerClientManager] = None):
         """
         Initialize the compiler with a Docker image
         
         Args:
             docker_image (str): Docker image to use for compilation/execution
+            use_pool (bool): If True, dispatch runs into warm pooled containers
+            pool_config (PoolConfig): Sizing and lifecycle settings for the pool
+            result_cache (ResultCache): Optional cache for deterministic run results
+            fast_syntax_check (bool): If True, check syntax without a container when the
+                host can match the image's Python grammar version
+            output_limits (OutputLimits): Per-stream byte and line limits for captured output;
+                overrides the execution profile's output caps
+            backend (ExecutionBackend): Where code runs; defaults to Docker containers of docker_image
+            profiles (ProfileSet): Execution profiles requests can select
+            docker_clients (DockerClientManager): Docker client shared with the other compilers
         """
         self.docker_image = docker_image
-        self.client = None
-        self._init_docker_client()
-    
-    def _init_docker_client(self):
-        """Initialize Docker client"""
-        try:
-            self.client = docker.from_env()
-            # Test if Docker is running
-            self.client.ping()
-            logger.info("Docker client initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Docker client: {e}")
-            raise ConnectionError("Docker is not running or not accessible")
+        self.result_cache = result_cache
+        self.syntax_checker = PythonSyntaxChecker(docker_image) if fast_syntax_check else None
+        self.output_limits = output_limits
+        self.profiles = profiles or ProfileSet()
+        self.backend = backend or DockerBackend(docker_image, language="python",
+                                                clients=docker_clients)
+        self.client = getattr(self.backend, 'client', None)
+        if use_pool and isinstance(self.backend, DockerBackend):
+            self.backend.start_pool(pool_config, self.profiles.get(None, "python"))
     
-    def _create_temp_file(self, code: str) -> str:
-        """
-        Create a temporary Python file with the provided code
-        
-        Args:
-            code (str): Python code to write to file
-            
-        Returns:
-            str: Path to the temporary file
-        """
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as f:
-            f.write(code)
-            return f.name
+    def _build_command(self, check_syntax_only: bool, has_stdin: bool = False,
+                       modules: Sequence[str] = ()) -> str:
+        """Build the shell command that checks (with any extra modules) or runs code.py in the sandbox working directory"""
+        if check_syntax_only:
+            return " ".join(["python -m py_compile code.py", *map(shlex.quote, modules)])
+        if has_stdin:
+            return "python code.py < input.txt"
+        return "python code.py"
     
-    def _cleanup_temp_file(self, file_path: str):
-        """Clean up temporary file"""
-        try:
-            os.unlink(file_path)
-        except OSError:
-            pass
+    def _cache_key(self, python_code: str, timeout: int, check_syntax_only: bool,
+                   stdin: Optional[str] = None, profile: Optional[ExecutionProfile] = None,
+                   extra_files: Optional[Dict[str, bytes]] = None) -> str:
+        """Build the result cache key for a run"""
+        return make_cache_key(
+            language="python",
+            image=self.backend.image_id(),
+            code=python_code,
+            flags=None,
+            stdin=stdin,
+            timeout=timeout,
+            syntax_only=check_syntax_only,
+            profile=profile.to_dict() if profile else None,
+            files={path: data.decode('utf-8') for path, data in (extra_files or {}).items()}
+        )
     
     def compile_and_run(self, 
                        python_code: str, 
-                       timeout: int = 30,
-                       check_syntax_only: bool = False) -> CompilerResult:
+                       timeout: Optional[int] = None,
+                       check_syntax_only: bool = False,
+                       use_cache: bool = True,
+                       stdin: Optional[str] = None,
+                       profile: Optional[str] = None,
+                       extra_files: Optional[Dict[str, str]] = None) -> CompilerResult:
         """
         Compile and run Python code in a Docker container
         
         Args:
             python_code (str): Python code to compile and run
-            timeout (int): Timeout in seconds for execution
+            timeout (int): Timeout in seconds for execution; defaults to the profile's and is
+                capped at its max_timeout
             check_syntax_only (bool): If True, only check syntax without execution
+            use_cache (bool): If False, bypass the result cache (for nondeterministic programs)
+            stdin (str): Text fed to the program's standard input
+            profile (str): Execution profile name; None for the default
+            extra_files (Dict[str, str]): Modules and data files placed next to code.py, by relative path
             
         Returns:
             CompilerResult: Object containing compilation/execution results
+            
+        Raises:
+            UnknownProfileError: If no profile has that name
+            SubmissionFileError: If extra_files is malformed or too large
         """
-        temp_file = None
-        container = None
+        limits = self.profiles.get(profile, "python")
+        timeout = limits.resolve_timeout(timeout)
+        extra = normalize_submission_files(extra_files, self.entry_file)
+        cache_key = None
+        if self.result_cache and use_cache:
+            cache_key = self._cache_key(python_code, timeout, check_syntax_only, stdin, limits, extra)
+            cached = self.result_cache.get(cache_key)
+            CACHE_LOOKUPS_TOTAL.inc(language="python", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                cached['cached'] = True
+                return CompilerResult(**cached)
+        
+        result = self._execute(python_code, timeout, check_syntax_only, stdin, limits, extra)
+        usage_distributions.record("python", result.resource_usage)
+        if cache_key and is_cacheable_exit_code(result.exit_code):
+            self.result_cache.put(cache_key, asdict(result))
+        return result
+    
+    def _check_syntax_fast(self, python_code: str, profile: ExecutionProfile) -> CompilerResult:
+        """Check syntax in-process or in a matching-version subprocess, without a container"""
+        start_time = time.perf_counter()
+        valid, error, diagnostics = self.syntax_checker.check(python_code)
+        elapsed = time.perf_counter() - start_time
+        return CompilerResult(
+            success=valid,
+            output="",
+            error=error,
+            exit_code=0 if valid else 1,  # Same exit code as `python -m py_compile`
+            execution_time=elapsed,
+            diagnostics=diagnostics,
+            timings=merge_timings({'compile': elapsed}),
+            profile=profile.name,
+            verdict=LimitVerdict.OK if valid else LimitVerdict.CE
+        )
+    
+    def _execute(self, python_code: str, timeout: int, check_syntax_only: bool,
+                 stdin: Optional[str], profile: ExecutionProfile,
+                 extra_files: Optional[Dict[str, bytes]] = None) -> CompilerResult:
+        """Run Python code without consulting the result cache"""
+        # The fast path checks code.py alone; extra modules are byte-compiled in the sandbox
+        if check_syntax_only and not extra_files and self.syntax_checker and self.syntax_checker.available:
+            try:
+                return self._check_syntax_fast(python_code, profile)
+            except Exception as e:
+                logger.warning(f"Fast syntax check failed, falling back to the container: {e}")
         
         try:
-            # Create temporary file with the code
-            temp_file = self._create_temp_file(python_code)
+            files = {**(extra_files or {}), 'code.py': python_code.encode('utf-8')}
+            if stdin is not None:
+                files['input.txt'] = stdin.encode('utf-8')
             
-            # Determine the command to run
-            if check_syntax_only:
-                command = f"python -m py_compile /app/code.py"
-            else:
-                command = f"python /app/code.py"
-            
-            # Run the container
-            import time
-            start_time = time.time()
-            
-            container = self.client.containers.run(
-                image=self.docker_image,
-                command=command,
-                volumes={temp_file: {'bind': '/app/code.py', 'mode': 'ro'}},
-                working_dir='/app',
-                detach=True,
-                stdout=True,
-                stderr=True,
-                remove=False  # Don't auto-remove so we can get logs
+            step = 'compile' if check_syntax_only else 'run'
+            outcome = self.backend.run(
+                files,
+                timed_script([(step, self._build_command(check_syntax_only, stdin is not None,
+                                                         files_with_suffix(extra_files or {}, ('.py',))))],
+                             self.backend.cgroup_stats),
+                timeout,
+                limits=self.output_limits or profile.output_limits(),
+                collect=INSTRUMENTATION_FILES,
+                profile=profile
             )
+            captured = outcome.captured
+            timings = build_timings(outcome, [step])
+            resource_usage = build_resource_usage(outcome.files, step, outcome.rusage)
             
-            # Wait for container to finish with timeout
-            try:
-                result = container.wait(timeout=timeout)
-                exit_code = result['StatusCode']
-            except Exception as e:
-                try:
-                    container.kill()
-                except:
-                    pass
-                raise TimeoutError(f"Execution timed out after {timeout} seconds")
-            
-            execution_time = time.time() - start_time
+            if outcome.timed_out:
+                return CompilerResult(
+                    success=False,
+                    output=captured.stdout,
+                    error=f"Execution timed out after {timeout} seconds",
+                    exit_code=-1,
+                    execution_time=outcome.execution_time,
+                    timings=timings,
+                    resource_usage=resource_usage,
+                    profile=profile.name,
+                    verdict=LimitVerdict.TLE,
+                    file_transfer=outcome.transfer,
+                    **captured.stats()
+                )
             
-            # Get output and error logs (get them before container is removed)
-            try:
-                logs = container.logs(stdout=True, stderr=True, stream=False).decode('utf-8')
-                # Split logs into stdout and stderr if possible
-                output = logs
-                error = ""
-                
-                # Try to get separate streams if available
-                try:
-                    output = container.logs(stdout=True, stderr=False, stream=False).decode('utf-8')
-                    error = container.logs(stdout=False, stderr=True, stream=False).decode('utf-8')
-                except:
-                    # If separate streams fail, use combined logs
-                    pass
-            except Exception as log_error:
-                logger.warning(f"Could not retrieve container logs: {log_error}")
-                output = ""
-                error = f"Could not retrieve logs: {str(log_error)}"
-            
-            success = exit_code == 0
+            success = outcome.exit_code == 0
             
             return CompilerResult(
                 success=success,
-                output=output,
-                error=error,
-                exit_code=exit_code,
-                execution_time=execution_time
+                output=captured.stdout,
+                error=captured.stderr,
+                exit_code=outcome.exit_code,
+                execution_time=outcome.execution_time,
+                diagnostics=parse_syntax_error_text(captured.stderr) if check_syntax_only and not success else [],
+                timings=timings,
+                resource_usage=resource_usage,
+                profile=profile.name,
+                verdict=limit_verdict(outcome.exit_code, False, captured.truncated, captured.stderr,
+                                      resource_usage, profile, compile_failed=check_syntax_only and not success),
+                file_transfer=outcome.transfer,
+                **captured.stats()
             )
             
         except Exception as e:
@@ -167,18 +253,6 @@ class PythonDockerCompiler:
                 exit_code=-1,
                 execution_time=0.0
             )
-        
-        finally:
-            # Cleanup
-            if temp_file:
-                self._cleanup_temp_file(temp_file)
-            
-            # Remove container if it exists
-            if container:
-                try:
-                    container.remove(force=True)
-                except:
-                    pass
     
     def check_syntax(self, python_code: str) -> CompilerResult:
         """
@@ -192,18 +266,93 @@ class PythonDockerCompiler:
         """
         return self.compile_and_run(python_code, check_syntax_only=True)
     
+    def judge(self, python_code: str, test_cases: List[TestCase], time_limit: float = 2.0,
+              parallelism: int = 1, profile: Optional[str] = None,
+              extra_files: Optional[Dict[str, str]] = None) -> JudgeResult:
+        """
+        Run Python code against many stdin test cases inside a single sandbox
+        
+        Args:
+            python_code (str): Python code to judge
+            test_cases (List[TestCase]): Inputs and expected outputs
+            time_limit (float): Seconds allowed per case
+            parallelism (int): Cases run at once inside the sandbox
+            profile (str): Execution profile name; None for the default
+            extra_files (Dict[str, str]): Modules and data files placed next to code.py, by relative path
+            
+        Returns:
+            JudgeResult: Per-case verdicts (pass/fail/TLE/MLE/OLE/RE, or CE on a syntax error) and timings
+            
+        Raises:
+            UnknownProfileError: If no profile has that name
+            SubmissionFileError: If extra_files is malformed or too large
+        """
+        limits = self.profiles.get(profile, "python")
+        extra = normalize_submission_files(extra_files, self.entry_file)
+        try:
+            result, _ = judge_in_sandbox(
+                self.backend,
+                files={**extra, 'code.py': python_code.encode('utf-8')},
+                cases=test_cases,
+                run_command="python code.py",
+                time_limit=time_limit,
+                parallelism=parallelism,
+                compile_command=self._build_command(True, modules=files_with_suffix(extra, ('.py',))),
+                profile=limits
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Error during Python judging: {e}")
+            return JudgeResult(success=False, passed=0, failed=len(test_cases), error=str(e))
+    
+    def stream_run(self, python_code: str, timeout: Optional[int] = None,
+                   max_output_bytes: int = DEFAULT_STREAM_MAX_BYTES,
+                   profile: Optional[str] = None,
+                   extra_files: Optional[Dict[str, str]] = None) -> Iterator[StreamEvent]:
+        """
+        Run Python code and yield its output incrementally instead of after it exits
+        
+        Args:
+            python_code (str): Python code to run
+            timeout (int): Timeout in seconds for execution; defaults to the profile's
+            max_output_bytes (int): Cap on stdout + stderr bytes forwarded, further capped by the profile
+            profile (str): Execution profile name; None for the default
+            extra_files (Dict[str, str]): Modules and data files placed next to code.py, by relative path
+            
+        Yields:
+            StreamEvent: stdout/stderr chunks, then an "exit" (or "error") event
+            
+        Raises:
+            UnknownProfileError: If no profile has that name
+            SubmissionFileError: If extra_files is malformed or too large
+        """
+        limits = self.profiles.get(profile, "python")
+        timeout = limits.resolve_timeout(timeout)
+        extra = normalize_submission_files(extra_files, self.entry_file)
+        # -u disables block buffering so prints reach the client as they happen
+        return self.backend.stream(
+            files={**extra, 'code.py': python_code.encode('utf-8')},
+            command=sandboxed_script([('run', f"timeout -s KILL {timeout}s python -u code.py")]),
+            timeout=timeout,
+            max_bytes=min(max_output_bytes, limits.max_output_bytes),
+            profile=limits
+        )
+    
     def get_available_images(self) -> list:
-        """Get list of available Python Docker images"""
+        """Get list of available Python Docker images from the cached local image index"""
         try:
-            images = self.client.images.list()
-            python_images = [
-                img.tags[0] for img in images 
-                if img.tags and any('python' in tag for tag in img.tags)
-            ]
-            return python_images
+            return [tag for tag in self.backend.image_tags() if 'python' in tag]
         except Exception as e:
             logger.error(f"Error getting images: {e}")
             return []
+    
+    def get_pool_stats(self) -> Optional[Dict]:
+        """Get warm container pool statistics, or None if pooling is disabled"""
+        return self.backend.get_stats()
+    
+    def shutdown(self):
+        """Release pooled containers and other backend resources held by this compiler"""
+        self.backend.shutdown()
 
 def format_compiler_output(result: CompilerResult) -> str:
     """
@@ -222,6 +371,8 @@ def format_compiler_output(result: CompilerResult) -> str:
     output_lines.append(f"=== COMPILATION RESULT: {status} ===")
     output_lines.append(f"Exit Code: {result.exit_code}")
     output_lines.append(f"Execution Time: {result.execution_time:.2f}s")
+    output_lines.extend(format_timings(result.timings))
+    output_lines.extend(format_resource_usage(result.resource_usage))
     output_lines.append("")
     
     # Standard Output
@@ -0,0 +1,203 @@
+"""
+Python Syntax Fast Path Module
+This module validates Python syntax without executing code and without a container,
+either in-process via compile() or in a hardened subprocess of the image's Python version.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import traceback
+from typing import Dict, List, Optional, Tuple
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# File name reported in diagnostics, matching the path used inside the container
+CODE_PATH = "/app/code.py"
+
+# Program run by the subprocess checker: reads source from stdin, prints JSON diagnostics
+_CHECK_SCRIPT = r"""
+import json, sys, traceback
+source = sys.stdin.buffer.read()
+try:
+    compile(source, %r, 'exec', dont_inherit=True)
+    print(json.dumps({'ok': True}))
+except (SyntaxError, ValueError) as e:
+    print(json.dumps({
+        'ok': False,
+        'error': ''.join(traceback.format_exception_only(type(e), e)),
+        'type': type(e).__name__,
+        'line': getattr(e, 'lineno', None),
+        'column': getattr(e, 'offset', None),
+        'end_line': getattr(e, 'end_lineno', None),
+        'end_column': getattr(e, 'end_offset', None),
+        'message': getattr(e, 'msg', None) or str(e),
+    }))
+""" % CODE_PATH
+
+
+def image_python_version(docker_image: str) -> Optional[Tuple[int, int]]:
+    """
+    Read the Python version from an image tag such as "python:3.9-slim"
+
+    Args:
+        docker_image (str): Docker image tag
+
+    Returns:
+        tuple: (major, minor), or None if the tag does not name a version
+    """
+    match = re.search(r'python:(\d+)\.(\d+)', docker_image)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def _limit_subprocess_resources():
+    """Apply CPU and memory rlimits to the checker subprocess (POSIX only)"""
+    import resource
+    resource.setrlimit(resource.RLIMIT_CPU, (5, 5))
+    resource.setrlimit(resource.RLIMIT_AS, (512 * 1024 * 1024, 512 * 1024 * 1024))
+
+
+class PythonSyntaxChecker:
+    """
+    Checks Python syntax for the grammar version of a configured Docker image
+    """
+
+    def __init__(self, docker_image: str, timeout: float = 5.0):
+        """
+        Initialize the checker and pick the in-process or subprocess strategy
+
+        Args:
+            docker_image (str): Image whose Python grammar must be matched
+            timeout (float): Seconds allowed for a subprocess check
+        """
+        self.docker_image = docker_image
+        self.timeout = timeout
+        self.target_version = image_python_version(docker_image)
+        self.interpreter = None
+        self.mode = None  # "in-process", "subprocess" or None (use the container)
+
+        if self.target_version is None:
+            logger.info(f"Cannot tell Python version of {docker_image}; syntax checks use the container")
+        elif self.target_version == sys.version_info[:2]:
+            self.mode = "in-process"
+        else:
+            self.interpreter = self._find_interpreter()
+            if self.interpreter:
+                self.mode = "subprocess"
+            else:
+                logger.info(
+                    f"Host Python {sys.version_info[0]}.{sys.version_info[1]} does not match "
+                    f"{docker_image} and no matching interpreter was found; "
+                    f"syntax checks use the container"
+                )
+
+    def _find_interpreter(self) -> Optional[str]:
+        """Locate a host interpreter of the target version and resolve wrappers (e.g. pyenv shims)"""
+        candidate = shutil.which("python%d.%d" % self.target_version)
+        if not candidate:
+            return None
+        try:
+            completed = subprocess.run(
+                [candidate, "-c", "import sys; print(sys.executable)"],
+                capture_output=True, timeout=self.timeout
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        executable = completed.stdout.decode('utf-8', errors='replace').strip()
+        return executable if completed.returncode == 0 and executable else None
+
+    @property
+    def available(self) -> bool:
+        """True if checks can run without a container"""
+        return self.mode is not None
+
+    def check(self, python_code: str) -> Tuple[bool, str, List[Dict]]:
+        """
+        Check syntax without executing the code
+
+        Args:
+            python_code (str): Python code to check
+
+        Returns:
+            tuple: (valid, error text formatted like py_compile, list of diagnostics)
+        """
+        if self.mode == "in-process":
+            return self._check_in_process(python_code)
+        if self.mode == "subprocess":
+            return self._check_subprocess(python_code)
+        raise RuntimeError("No matching Python interpreter for the fast syntax path")
+
+    def _check_in_process(self, python_code: str) -> Tuple[bool, str, List[Dict]]:
+        """Compile (never execute) the code in this interpreter"""
+        try:
+            compile(python_code, CODE_PATH, 'exec', dont_inherit=True)
+            return True, "", []
+        except (SyntaxError, ValueError) as e:
+            error = "".join(traceback.format_exception_only(type(e), e))
+            return False, error, [{
+                'type': type(e).__name__,
+                'line': getattr(e, 'lineno', None),
+                'column': getattr(e, 'offset', None),
+                'end_line': getattr(e, 'end_lineno', None),
+                'end_column': getattr(e, 'end_offset', None),
+                'message': getattr(e, 'msg', None) or str(e),
+            }]
+        except (RecursionError, MemoryError) as e:
+            message = f"{type(e).__name__}: code is too deeply nested or too large to compile"
+            return False, message, [{
+                'type': type(e).__name__, 'line': None, 'column': None,
+                'end_line': None, 'end_column': None, 'message': message,
+            }]
+
+    def _check_subprocess(self, python_code: str) -> Tuple[bool, str, List[Dict]]:
+        """Compile the code in an isolated, resource-limited interpreter of the image's version"""
+        completed = subprocess.run(
+            [self.interpreter, "-I", "-S", "-c", _CHECK_SCRIPT],
+            input=python_code.encode('utf-8'),
+            capture_output=True,
+            timeout=self.timeout,
+            env={},
+            cwd="/" if os.name == 'posix' else None,
+            preexec_fn=_limit_subprocess_resources if os.name == 'posix' else None
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.decode('utf-8', errors='replace').strip()
+                               or f"Syntax checker exited with {completed.returncode}")
+        report = json.loads(completed.stdout)
+        if report['ok']:
+            return True, "", []
+        error = report.pop('error')
+        report.pop('ok')
+        return False, error, [report]
+
+
+def parse_syntax_error_text(error: str) -> List[Dict]:
+    """
+    Extract a diagnostic from py_compile / traceback text produced inside a container
+
+    Args:
+        error (str): stderr of `python -m py_compile`
+
+    Returns:
+        List[Dict]: Zero or one diagnostic in the same shape as PythonSyntaxChecker.check
+    """
+    lines = re.findall(r'File "[^"]*", line (\d+)', error)
+    message_match = re.search(r'^\s*(?:[\w.]+\.)?(\w*Error): (.*)$', error, re.MULTILINE)
+    if not lines and not message_match:
+        return []
+    return [{
+        'type': message_match.group(1) if message_match else None,
+        'line': int(lines[-1]) if lines else None,
+        'column': None,
+        'end_line': None,
+        'end_column': None,
+        'message': message_match.group(2).strip() if message_match else error.strip(),
+    }]
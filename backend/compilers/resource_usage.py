@@ -0,0 +1,363 @@
+"""
+Resource Usage Module
+This module snapshots CPU time, cgroup memory/I/O/process counters and CPU pressure around a
+sandbox step, turns the snapshots into a per-run usage report, and keeps per-language
+distributions of those reports for tuning limits.
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Deque, Dict, List, Optional, Tuple
+import logging
+
+from .execution_backend import INSTRUMENTATION_DIR
+from .metrics import registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# File the snapshots are appended to, next to the step timings (see timing.TIMING_FILE). Only
+# timing.timed_script takes snapshots, so the program cannot forge them in a container; judge
+# and streamed runs take none and their results carry no usage report
+USAGE_NAME = ".edurun-usage"
+USAGE_FILE = f"{INSTRUMENTATION_DIR}/{USAGE_NAME}"
+
+# cgroup files read inside a container, relative to /sys/fs/cgroup where the container's own
+# cgroup is mounted; v2 names first, then the cgroup v1 equivalents Docker exposes on older hosts
+CGROUP_FILES = (
+    "cpu.stat", "cpu.pressure", "io.stat", "memory.peak", "memory.events", "pids.peak",
+    "cpu/cpu.stat", "memory/memory.max_usage_in_bytes", "memory/memory.oom_control",
+    "blkio/blkio.throttle.io_service_bytes",
+)
+
+CPU_SECONDS = registry.histogram(
+    'edurun_run_cpu_seconds', 'User + system CPU time of the program per run', ['language']
+)
+PEAK_MEMORY_BYTES = registry.histogram(
+    'edurun_run_peak_memory_bytes', 'Peak memory of the sandbox per run', ['language'],
+    buckets=tuple(2 ** power * 1024 * 1024 for power in range(0, 12))  # 1 MiB .. 2 GiB
+)
+IO_BYTES = registry.histogram(
+    'edurun_run_io_bytes', 'Block I/O of the program per run', ['language', 'direction'],
+    buckets=(0, 4096, 65536, 1024 ** 2, 16 * 1024 ** 2, 256 * 1024 ** 2, 1024 ** 3)
+)
+PROCESSES = registry.histogram(
+    'edurun_run_processes', 'Peak number of processes in the sandbox per run', ['language'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+CPU_WAIT_SECONDS = registry.histogram(
+    'edurun_run_cpu_wait_seconds', 'Time the program was runnable but waiting for a CPU (host contention)',
+    ['language']
+)
+
+
+@dataclass
+class ResourceUsage:
+    """Data class to hold the resources one program run used"""
+    cpu_user_time: float = 0.0  # Seconds of user CPU time of the program and its children
+    cpu_system_time: float = 0.0  # Seconds of system CPU time
+    peak_memory_bytes: Optional[int] = None  # None when the sandbox cannot attribute a peak to this run
+    io_read_bytes: Optional[int] = None
+    io_write_bytes: Optional[int] = None
+    processes: Optional[int] = None  # Peak number of processes in the sandbox
+    cpu_wait_time: Optional[float] = None  # Seconds runnable but stalled waiting for a CPU (cgroup PSI)
+    cpu_throttled_time: Optional[float] = None  # Seconds held back by the sandbox's CPU quota
+    oom_kills: Optional[int] = None  # Processes the kernel killed for exceeding the memory limit
+    source: str = "shell"  # "cgroup", "rusage" or "shell" (CPU times only)
+
+
+def snapshot_command(step: str, when: str, cgroup_stats: bool) -> str:
+    """
+    Build the bash line that appends a usage snapshot for one side of a step
+
+    Only builtins are used (`times`, `read`), so snapshotting starts no process. The line
+    writes to `$__meta`, set up by timing.timed_script, and records nothing if it is empty.
+    Do not add it to a script whose program runs with the script's own privileges: the
+    program could then rewrite the snapshots.
+
+    Args:
+        step (str): Step name, e.g. "run"
+        when (str): "before" or "after"
+        cgroup_stats (bool): Also dump the sandbox's cgroup v2 counters; only meaningful
+            when the sandbox has its own cgroup (a container)
+    """
+    parts = [f"echo '@{step} {when}'", "times"]
+    if cgroup_stats:
+        for name in CGROUP_FILES:
+            path = f"/sys/fs/cgroup/{name}"
+            parts.append(
+                f"[ -r {path} ] && {{ echo '#{name}'; "
+                f"while IFS= read -r __line || [ -n \"$__line\" ]; do echo \"$__line\"; done < {path}; }}"
+            )
+    return '[ -n "$__meta" ] && { ' + "; ".join(parts) + f'; }} >> "$__meta/{USAGE_NAME}" 2>/dev/null'
+
+
+def _parse_clock(value: str) -> float:
+    """Parse a `times` field such as 0m0.012s"""
+    minutes, seconds = value.rstrip('s').split('m')
+    return int(minutes) * 60 + float(seconds)
+
+
+def parse_usage_file(data: Optional[bytes]) -> Dict[Tuple[str, str], Dict]:
+    """
+    Parse the snapshots into {(step, when): {"children_cpu": (user, sys), "<cgroup file>": [lines]}}
+    """
+    snapshots: Dict[Tuple[str, str], Dict] = {}
+    current = section = None
+    times_lines = 0
+    for line in (data or b"").decode('utf-8', errors='replace').splitlines():
+        if line.startswith('@'):
+            step, _, when = line[1:].partition(' ')
+            current = snapshots.setdefault((step, when), {})
+            section, times_lines = None, 0
+        elif current is None:
+            continue
+        elif line.startswith('#'):
+            section = line[1:]
+            current[section] = []
+        elif section:
+            current[section].append(line)
+        else:
+            # `times` prints the shell's own times, then its children's
+            times_lines += 1
+            fields = line.split()
+            if times_lines == 2 and len(fields) == 2:
+                try:
+                    current['children_cpu'] = (_parse_clock(fields[0]), _parse_clock(fields[1]))
+                except ValueError:
+                    pass
+    return snapshots
+
+
+def _keyed(lines: List[str]) -> Dict[str, int]:
+    """Parse "key value" lines such as cpu.stat"""
+    values = {}
+    for line in lines:
+        fields = line.split()
+        if len(fields) == 2 and fields[1].isdigit():
+            values[fields[0]] = int(fields[1])
+    return values
+
+
+def _io_totals(lines: List[str]) -> Tuple[int, int]:
+    """Sum rbytes and wbytes over every device in io.stat"""
+    read = written = 0
+    for line in lines:
+        for field in line.split()[1:]:
+            key, _, value = field.partition('=')
+            if key == 'rbytes':
+                read += int(value)
+            elif key == 'wbytes':
+                written += int(value)
+    return read, written
+
+
+def _blkio_totals(lines: List[str]) -> Tuple[int, int]:
+    """Sum the Read and Write lines of a cgroup v1 blkio.throttle.io_service_bytes"""
+    read = written = 0
+    for line in lines:
+        fields = line.split()
+        if len(fields) == 3 and fields[2].isdigit():
+            if fields[1] == 'Read':
+                read += int(fields[2])
+            elif fields[1] == 'Write':
+                written += int(fields[2])
+    return read, written
+
+
+def _pressure_total(lines: List[str]) -> Optional[int]:
+    """Get the cumulative "some" stall microseconds from cpu.pressure"""
+    for line in lines:
+        if line.startswith('some'):
+            for field in line.split():
+                if field.startswith('total='):
+                    return int(field[len('total='):])
+    return None
+
+
+def _single(lines: Optional[List[str]]) -> Optional[int]:
+    """Parse a single-value file such as memory.peak"""
+    if lines and lines[0].strip().isdigit():
+        return int(lines[0])
+    return None
+
+
+def _peak(before: Optional[int], after: Optional[int]) -> Optional[int]:
+    """
+    A cgroup peak covers the sandbox's whole lifetime, so it belongs to this step only if the
+    step raised it (or no earlier value exists)
+    """
+    if after is None:
+        return None
+    if before is None or after > before:
+        return after
+    return None
+
+
+def build_resource_usage(files: Dict[str, bytes], step: str = 'run',
+                         rusage: Optional[Dict[str, int]] = None) -> Dict:
+    """
+    Turn the snapshots around a step (and optional process rusage) into a usage report
+
+    Args:
+        files (Dict[str, bytes]): Files collected from the sandbox (USAGE_FILE is read)
+        step (str): Step whose usage is reported
+        rusage (Dict[str, int]): Whole-command counters the backend measured on the host
+            (max_rss_bytes, io_read_bytes, io_write_bytes); when given they are reported
+            instead of any cgroup counters in the snapshots
+
+    Returns:
+        Dict: ResourceUsage fields, or an empty dict if nothing was measured
+    """
+    snapshots = parse_usage_file(files.get(USAGE_FILE))
+    before, after = snapshots.get((step, 'before')), snapshots.get((step, 'after'))
+    if not after and not rusage:
+        return {}
+    usage = ResourceUsage()
+    before = before or {}
+    after = after or {}
+
+    if 'children_cpu' in after:
+        user_before, system_before = before.get('children_cpu', (0.0, 0.0))
+        usage.cpu_user_time = max(0.0, after['children_cpu'][0] - user_before)
+        usage.cpu_system_time = max(0.0, after['children_cpu'][1] - system_before)
+
+    if rusage:
+        # Measured on the host, where the snapshots read no cgroup of the run's own; trust only the CPU times
+        after = {'children_cpu': after['children_cpu']} if 'children_cpu' in after else {}
+    if any(name in after for name in CGROUP_FILES):
+        usage.source = "cgroup"
+    if 'cpu.stat' in after:
+        stat_before, stat_after = _keyed(before.get('cpu.stat', [])), _keyed(after['cpu.stat'])
+        if 'throttled_usec' in stat_after:
+            usage.cpu_throttled_time = (stat_after['throttled_usec'] -
+                                        stat_before.get('throttled_usec', 0)) / 1e6
+    elif 'cpu/cpu.stat' in after:
+        stat_before, stat_after = _keyed(before.get('cpu/cpu.stat', [])), _keyed(after['cpu/cpu.stat'])
+        if 'throttled_time' in stat_after:
+            usage.cpu_throttled_time = (stat_after['throttled_time'] -
+                                        stat_before.get('throttled_time', 0)) / 1e9
+    for name, totals in (('io.stat', _io_totals), ('blkio/blkio.throttle.io_service_bytes', _blkio_totals)):
+        if name in after:
+            read_before, written_before = totals(before.get(name, []))
+            read_after, written_after = totals(after[name])
+            usage.io_read_bytes = read_after - read_before
+            usage.io_write_bytes = written_after - written_before
+            break
+    if 'cpu.pressure' in after:
+        stalled_after = _pressure_total(after['cpu.pressure'])
+        if stalled_after is not None:
+            usage.cpu_wait_time = (stalled_after - (_pressure_total(before.get('cpu.pressure', [])) or 0)) / 1e6
+    events_file = 'memory.events' if 'memory.events' in after else 'memory/memory.oom_control'
+    if events_file in after:
+        kills_after = _keyed(after[events_file]).get('oom_kill')
+        if kills_after is not None:
+            usage.oom_kills = kills_after - _keyed(before.get(events_file, [])).get('oom_kill', 0)
+    peak_file = 'memory.peak' if 'memory.peak' in after else 'memory/memory.max_usage_in_bytes'
+    usage.peak_memory_bytes = _peak(_single(before.get(peak_file)), _single(after.get(peak_file)))
+    usage.processes = _peak(_single(before.get('pids.peak')), _single(after.get('pids.peak')))
+
+    if rusage:
+        usage.source = "rusage"
+        usage.peak_memory_bytes = rusage.get('max_rss_bytes')
+        usage.io_read_bytes = rusage.get('io_read_bytes')
+        usage.io_write_bytes = rusage.get('io_write_bytes')
+    return asdict(usage)
+
+
+def format_bytes(size: int) -> str:
+    """Format a byte count with a binary unit"""
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def format_resource_usage(usage: Dict) -> List[str]:
+    """
+    Format a usage report for the text output of format_*_compiler_output
+
+    Returns:
+        List[str]: Display lines, empty if nothing was measured
+    """
+    if not usage:
+        return []
+    parts = [f"CPU {usage['cpu_user_time'] * 1000:.1f} ms user + {usage['cpu_system_time'] * 1000:.1f} ms sys"]
+    if usage.get('peak_memory_bytes') is not None:
+        parts.append(f"peak memory {format_bytes(usage['peak_memory_bytes'])}")
+    if usage.get('io_read_bytes') is not None and usage.get('io_write_bytes') is not None:
+        parts.append(f"I/O {format_bytes(usage['io_read_bytes'])} read / "
+                     f"{format_bytes(usage['io_write_bytes'])} written")
+    if usage.get('processes') is not None:
+        parts.append(f"{usage['processes']} process{'' if usage['processes'] == 1 else 'es'}")
+    lines = [f"Resource Usage: {', '.join(parts)}"]
+    if usage.get('cpu_wait_time'):
+        lines.append(f"CPU Wait (host contention): {usage['cpu_wait_time'] * 1000:.1f} ms")
+    return lines
+
+
+class UsageDistributions:
+    """
+    Keeps the most recent usage reports per language and summarizes them as percentiles
+    """
+
+    FIELDS = ('cpu_time', 'peak_memory_bytes', 'io_read_bytes', 'io_write_bytes', 'processes',
+              'cpu_wait_time')
+
+    def __init__(self, window: int = 1000):
+        """
+        Initialize the distributions
+
+        Args:
+            window (int): Reports kept per language
+        """
+        self.window = window
+        self._samples: Dict[str, Deque[Dict]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, language: str, usage: Dict):
+        """Add one run's usage report to the language's window and the metrics histograms"""
+        if not usage:
+            return
+        sample = dict(usage, cpu_time=usage['cpu_user_time'] + usage['cpu_system_time'])
+        with self._lock:
+            self._samples.setdefault(language, deque(maxlen=self.window)).append(sample)
+
+        CPU_SECONDS.observe(sample['cpu_time'], language=language)
+        if usage['peak_memory_bytes'] is not None:
+            PEAK_MEMORY_BYTES.observe(usage['peak_memory_bytes'], language=language)
+        if usage['io_read_bytes'] is not None:
+            IO_BYTES.observe(usage['io_read_bytes'], language=language, direction='read')
+        if usage['io_write_bytes'] is not None:
+            IO_BYTES.observe(usage['io_write_bytes'], language=language, direction='write')
+        if usage['processes'] is not None:
+            PROCESSES.observe(usage['processes'], language=language)
+        if usage['cpu_wait_time'] is not None:
+            CPU_WAIT_SECONDS.observe(usage['cpu_wait_time'], language=language)
+
+    def summary(self) -> Dict:
+        """Get p50/p90/p99/max of each field per language over the window"""
+        with self._lock:
+            samples = {language: list(window) for language, window in self._samples.items()}
+        result = {}
+        for language, reports in samples.items():
+            fields = {}
+            for name in self.FIELDS:
+                values = sorted(report[name] for report in reports if report.get(name) is not None)
+                if not values:
+                    continue
+                fields[name] = {
+                    'p50': values[int(0.50 * (len(values) - 1))],
+                    'p90': values[int(0.90 * (len(values) - 1))],
+                    'p99': values[int(0.99 * (len(values) - 1))],
+                    'max': values[-1],
+                }
+            result[language] = {'runs': len(reports), **fields}
+        return result
+
+
+# Process-wide distributions, shared by all compilers
+usage_distributions = UsageDistributions()
@@ -0,0 +1,259 @@
+"""
+Result Cache Module
+This module provides a content-addressed cache for deterministic compile/run results,
+with an in-memory LRU + TTL tier and an optional on-disk SQLite tier.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import logging
+
+from .container_pool import TIMEOUT_EXIT_CODES
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(**parts) -> str:
+    """
+    Build a content-addressed cache key from the inputs that determine a run's result
+
+    Args:
+        **parts: Language, image id, code, flags, stdin, timeout, syntax_only, ...
+
+    Returns:
+        str: Hex SHA-256 digest of the canonical JSON encoding of the parts
+    """
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def is_cacheable_exit_code(exit_code: int) -> bool:
+    """
+    Check whether a run's outcome is deterministic enough to cache
+
+    Infrastructure errors (-1) and timeouts depend on host load, not on the code.
+    """
+    return exit_code != -1 and exit_code not in TIMEOUT_EXIT_CODES
+
+
+def resolve_image_id(client, docker_image: str) -> str:
+    """
+    Resolve a Docker image tag to its local image id so cache keys change when the tag moves
+
+    Args:
+        client: Docker client
+        docker_image (str): Image tag, e.g. "python:3.9-slim"
+
+    Returns:
+        str: The image id, or the tag itself if it cannot be resolved
+    """
+    try:
+        return client.images.get(docker_image).id
+    except Exception as e:
+        logger.warning(f"Could not resolve image id for {docker_image}: {e}")
+        return docker_image
+
+
+@dataclass
+class CacheStats:
+    """Data class to hold result cache counters"""
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    def to_dict(self) -> Dict:
+        """Convert the counters to a JSON-serializable dictionary"""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            'hits': hits,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_ratio': (hits / lookups) if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class ResultCache:
+    """
+    A thread-safe LRU + TTL cache of serialized compiler results
+    """
+
+    def __init__(self,
+                 max_entries: int = 1000,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 3600.0,
+                 sqlite_path: Optional[str] = None,
+                 max_disk_entries: int = 100000):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries (int): Maximum entries held in memory
+            max_bytes (int): Maximum serialized bytes held in memory
+            ttl (float): Seconds an entry stays valid
+            sqlite_path (str): Optional SQLite database file for the on-disk tier
+            max_disk_entries (int): Maximum entries kept in the on-disk tier
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if sqlite_path:
+            self._init_db(sqlite_path)
+
+    def _init_db(self, sqlite_path: str):
+        """Open (and create if needed) the on-disk SQLite tier"""
+        try:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results(last_access)")
+            self._db.commit()
+            logger.info(f"Result cache disk tier opened at {sqlite_path}")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open result cache database {sqlite_path}: {e}")
+            self._db = None
+
+    def _store_memory(self, key: str, value: str, created_at: float):
+        """Insert into the memory tier and evict LRU entries over the limits (caller holds the lock)"""
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key)[0])
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, created_at)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.stats.evictions += 1
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached result
+
+        Args:
+            key (str): Key from make_cache_key()
+
+        Returns:
+            Dict: The cached result fields, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    return json.loads(value)
+                self._entries.pop(key)
+                self._bytes -= len(value)
+                self.stats.expirations += 1
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created_at FROM results WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        value, created_at = row
+                        if now - created_at <= self.ttl:
+                            self._db.execute(
+                                "UPDATE results SET last_access = ? WHERE key = ?", (now, key)
+                            )
+                            self._db.commit()
+                            self._store_memory(key, value, created_at)
+                            self.stats.disk_hits += 1
+                            return json.loads(value)
+                        self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                        self._db.commit()
+                        self.stats.expirations += 1
+                except sqlite3.Error as e:
+                    logger.warning(f"Result cache disk lookup failed: {e}")
+
+            self.stats.misses += 1
+            return None
+
+    def put(self, key: str, result: Dict):
+        """
+        Store a result
+
+        Args:
+            key (str): Key from make_cache_key()
+            result (Dict): JSON-serializable result fields
+        """
+        value = json.dumps(result)
+        now = time.time()
+        with self._lock:
+            self._store_memory(key, value, now)
+            self.stats.stores += 1
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO results (key, value, created_at, last_access) "
+                        "VALUES (?, ?, ?, ?)", (key, value, now, now)
+                    )
+                    count = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                    if count > self.max_disk_entries:
+                        self._db.execute(
+                            "DELETE FROM results WHERE key IN ("
+                            "SELECT key FROM results ORDER BY last_access LIMIT ?)",
+                            (count - self.max_disk_entries,)
+                        )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Result cache disk store failed: {e}")
+
+    def clear(self):
+        """Drop every cached entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def get_stats(self) -> Dict:
+        """Get hit ratio, entry counts and bytes held"""
+        with self._lock:
+            stats = self.stats.to_dict()
+            stats.update({
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+            })
+            if self._db is not None:
+                try:
+                    count, size = self._db.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM results"
+                    ).fetchone()
+                    stats.update({'disk_entries': count, 'disk_bytes': size})
+                except sqlite3.Error:
+                    pass
+        return stats
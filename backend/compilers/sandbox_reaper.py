@@ -0,0 +1,342 @@
+"""
+Sandbox Reaper Module
+This module labels every sandbox container and local run directory with the process that
+created it and when, and removes the ones nobody will clean up: those of a process that died
+between creating and removing them, and those older than any run or pooled container lives.
+"""
+
+import os
+import re
+import shutil
+import signal
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from .metrics import registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SANDBOXES_REAPED_TOTAL = registry.counter(
+    'edurun_sandboxes_reaped_total',
+    'Leaked sandboxes removed by the reaper, by resource (container or directory) and reason (orphaned or expired)',
+    ['resource', 'reason'])
+
+# Labels on every sandbox container
+LABEL_OWNER = "edurun.owner"  # "<host>:<pid>:<process start time>" of the process that created it
+LABEL_CREATED = "edurun.created"  # Unix time of creation
+LABEL_KIND = "edurun.kind"  # "run" (one run), "helper" (maintenance command) or "pool" (warm container)
+
+# Local directories: edurun-<kind>-<pid>-<process start time>-<language>-<random>
+SCRATCH_PATTERN = re.compile(r'^edurun-(run|bin)-(\d+)-(\d+)-')
+
+# Reap reasons
+ORPHANED = "orphaned"  # The owning process on this host is gone
+EXPIRED = "expired"  # Older than the kind of sandbox may live, whoever owns it
+
+_owner_lock = threading.Lock()
+_owner: Tuple[int, str, str] = (0, "", "")  # (pid, owner id, process start time) of this process
+
+
+def process_start_time(pid: int) -> Optional[str]:
+    """
+    Get when a process started, in clock ticks since boot, from /proc
+
+    Together with the pid this identifies a process even after its pid is reused.
+
+    Returns:
+        str: The start time, or None if the process is gone or /proc is not available
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The command name in parentheses may contain spaces; fields after it are fixed
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _identity() -> Tuple[str, str]:
+    """Get (owner id, process start time) for this process, recomputed after a fork"""
+    global _owner
+    pid = os.getpid()
+    with _owner_lock:
+        if _owner[0] != pid:
+            start = process_start_time(pid) or "0"
+            _owner = (pid, f"{socket.gethostname()}:{pid}:{start}", start)
+        return _owner[1], _owner[2]
+
+
+def owner_id() -> str:
+    """Get the owner id this process labels its sandboxes with"""
+    return _identity()[0]
+
+
+def sandbox_labels(kind: str) -> Dict[str, str]:
+    """
+    Build the labels a sandbox container is created with
+
+    Args:
+        kind (str): "run", "helper" or "pool"
+
+    Returns:
+        Dict[str, str]: Owner, creation time and kind labels
+    """
+    return {
+        LABEL_OWNER: owner_id(),
+        LABEL_CREATED: str(int(time.time())),
+        LABEL_KIND: kind,
+    }
+
+
+def scratch_prefix(kind: str, language: str) -> str:
+    """
+    Build the `tempfile.mkdtemp` prefix of a local directory so the reaper can tell its owner
+
+    Args:
+        kind (str): "run" (one run's working directory) or "bin" (a backend's tool shims)
+        language (str): Language label
+    """
+    return f"edurun-{kind}-{os.getpid()}-{_identity()[1]}-{language}-"
+
+
+def owner_alive(pid: int, start: str, host: Optional[str] = None) -> Optional[bool]:
+    """
+    Tell whether the process that created a sandbox is still running
+
+    Args:
+        pid (int): Owner process id
+        start (str): Owner process start time, "0" if it was not known
+        host (str): Owner host name; None for this host
+
+    Returns:
+        bool: None if the owner runs on another host and cannot be checked
+    """
+    if host is not None and host != socket.gethostname():
+        return None
+    if pid == os.getpid():
+        return start == _identity()[1]
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, owned by another user
+    if start == "0":
+        return True
+    current = process_start_time(pid)
+    return current is None or current == start  # A different start time means the pid was reused
+
+
+def parse_owner(owner: str) -> Optional[Tuple[str, int, str]]:
+    """Split an owner label into (host, pid, start time), or None if it is malformed"""
+    host, _, rest = owner.rpartition(':')
+    host, _, pid = host.rpartition(':')
+    if not host or not pid.isdigit():
+        return None
+    return host, int(pid), rest
+
+
+def kill_processes_in(directory: str) -> int:
+    """
+    Kill the processes whose working directory is inside a directory
+
+    Commands of a local run run in their own session; when the server dies they keep running
+    in the run directory until killed.
+
+    Returns:
+        int: Processes killed
+    """
+    directory = os.path.realpath(directory)
+    killed = 0
+    try:
+        pids = [int(entry) for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return 0
+    for pid in pids:
+        if pid == os.getpid():
+            continue
+        try:
+            cwd = os.readlink(f"/proc/{pid}/cwd")
+        except OSError:
+            continue
+        if cwd == directory or cwd.startswith(directory + os.sep):
+            try:
+                os.kill(pid, signal.SIGKILL)
+                killed += 1
+            except OSError:
+                pass
+    return killed
+
+
+@dataclass
+class ReaperConfig:
+    """Data class to hold sandbox reaper settings"""
+    enabled: bool = True
+    interval: float = 60.0  # Seconds between passes; the first pass runs at start-up
+    max_age: float = 900.0  # Seconds a run or helper sandbox may exist; longer than any run takes
+    pool_max_age: float = 4500.0  # Seconds a pooled container may exist; longer than the pool's max_lifetime
+    scratch_dirs: List[str] = field(default_factory=list)  # Directories local run and shim directories are created in
+
+
+class SandboxReaper:
+    """
+    Periodically removes leaked sandbox containers and local run directories
+
+    A sandbox is reaped if its owner process ran on this host and is gone (however young the
+    sandbox), or if it is older than its kind may live (whoever owns it: an owner on another
+    host cannot be checked). Sandboxes a live owner is still using are never old enough.
+    """
+
+    def __init__(self, config: Optional[ReaperConfig] = None, clients=None):
+        """
+        Initialize the reaper
+
+        Args:
+            config (ReaperConfig): Interval, age limits and directories to scan
+            clients (DockerClientManager): Shared Docker client, or None to only reap local directories
+        """
+        self.config = config or ReaperConfig()
+        self.clients = clients
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._reaped: Dict[Tuple[str, str], int] = {}
+        self._passes = 0
+        self._recovered = None  # Sandboxes removed by the start-up pass
+        self._last_pass = None
+        self._last_error = None
+
+    def start(self):
+        """Launch the background thread; its first pass recovers what a crashed process left behind"""
+        if not self.config.enabled or self._thread:
+            return
+        self._thread = threading.Thread(target=self._loop, name="sandbox-reaper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after its current pass"""
+        self._stop_event.set()
+
+    def _loop(self):
+        recovered = self.reap()
+        with self._lock:
+            self._recovered = recovered
+        if recovered:
+            logger.info(f"Start-up recovery removed {recovered} sandboxes left by earlier processes")
+        while not self._stop_event.wait(self.config.interval):
+            self.reap()
+
+    def reap(self) -> int:
+        """
+        Run one pass over the labeled containers and the scratch directories
+
+        Returns:
+            int: Sandboxes removed
+        """
+        start = time.time()
+        error = None
+        reaped = self._reap_directories(start)
+        if self.clients is not None:
+            try:
+                reaped += self._reap_containers(start)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                logger.warning(f"Could not reap sandbox containers: {e}")
+        with self._lock:
+            self._passes += 1
+            self._last_pass = {'time': round(start), 'seconds': round(time.time() - start, 3), 'reaped': reaped}
+            self._last_error = error
+        return reaped
+
+    def _reason(self, owner: Optional[Tuple[str, int, str]], age: float, max_age: float) -> Optional[str]:
+        """Decide whether a sandbox is reaped, and why"""
+        if owner and owner_alive(owner[1], owner[2], owner[0]) is False:
+            return ORPHANED
+        if age > max_age:
+            return EXPIRED
+        return None
+
+    def _count(self, resource: str, reason: str):
+        SANDBOXES_REAPED_TOTAL.inc(resource=resource, reason=reason)
+        with self._lock:
+            self._reaped[(resource, reason)] = self._reaped.get((resource, reason), 0) + 1
+
+    def _reap_containers(self, now: float) -> int:
+        """Kill and remove stale labeled containers"""
+        import docker
+        client = self.clients.get_client()
+        # The low-level list carries the labels; the high-level one inspects every container
+        containers = self.clients.call(client.api.containers, all=True, filters={'label': LABEL_OWNER})
+        reaped = 0
+        for container in containers:
+            labels = container.get('Labels') or {}
+            created = labels.get(LABEL_CREATED, '')
+            age = now - int(created) if created.isdigit() else now - container.get('Created', now)
+            max_age = self.config.pool_max_age if labels.get(LABEL_KIND) == 'pool' else self.config.max_age
+            reason = self._reason(parse_owner(labels.get(LABEL_OWNER, '')), age, max_age)
+            if reason is None:
+                continue
+            try:
+                self.clients.call(client.api.remove_container, container['Id'], force=True)
+            except docker.errors.NotFound:
+                continue  # Removed meanwhile, e.g. by another worker's reaper
+            except docker.errors.APIError as e:
+                if e.status_code == 409:
+                    continue  # Removal already in progress
+                raise
+            logger.info(f"Reaped {reason} {labels.get(LABEL_KIND, 'sandbox')} container {container['Id'][:12]} "
+                        f"(owner {labels.get(LABEL_OWNER)}, {age:.0f}s old)")
+            self._count('container', reason)
+            reaped += 1
+        return reaped
+
+    def _reap_directories(self, now: float) -> int:
+        """Kill what still runs in stale local run directories and remove them with the stale shim directories"""
+        reaped = 0
+        for directory in dict.fromkeys(self.config.scratch_dirs):
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                match = SCRATCH_PATTERN.match(entry.name)
+                if not match or not entry.is_dir(follow_symlinks=False):
+                    continue
+                kind, pid, start = match.group(1), int(match.group(2)), match.group(3)
+                try:
+                    age = now - entry.stat(follow_symlinks=False).st_mtime
+                except OSError:
+                    continue
+                # A live backend keeps its shim directory for its whole life
+                max_age = float('inf') if kind == 'bin' else self.config.max_age
+                reason = self._reason((socket.gethostname(), pid, start), age, max_age)
+                if reason is None:
+                    continue
+                killed = kill_processes_in(entry.path)
+                shutil.rmtree(entry.path, ignore_errors=True)
+                if os.path.exists(entry.path):
+                    continue
+                logger.info(f"Reaped {reason} {kind} directory {entry.path} ({age:.0f}s old"
+                            + (f", killed {killed} processes)" if killed else ")"))
+                self._count('directory', reason)
+                reaped += 1
+        return reaped
+
+    def get_stats(self) -> Dict:
+        """Get reaped counts by resource and reason, and the last pass"""
+        with self._lock:
+            reaped = {f"{resource}_{reason}": count for (resource, reason), count in sorted(self._reaped.items())}
+            return {
+                'enabled': self.config.enabled,
+                'interval': self.config.interval,
+                'passes': self._passes,
+                'recovered_at_startup': self._recovered,
+                'reaped': reaped,
+                'last_pass': self._last_pass,
+                'last_error': self._last_error,
+            }
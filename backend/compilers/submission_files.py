@@ -0,0 +1,86 @@
+"""
+Submission Files Module
+This module validates the extra files of a multi-file submission (modules, headers,
+additional sources, data files), which are delivered into the sandbox next to the
+entry file in the same in-memory archive.
+"""
+
+import posixpath
+from typing import Dict, List, Optional
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_SUBMISSION_FILES = 32
+MAX_SUBMISSION_BYTES = 1024 * 1024
+
+# Names the sandbox scripts write or read themselves (stdin, the C++ binary and object, judge inputs)
+RESERVED_NAMES = frozenset({'input.txt', 'program', 'code.o', '.judge'})
+
+# Prefix of the timing and usage files the instrumented scripts leave behind
+RESERVED_PREFIX = ".edurun"
+
+
+class SubmissionFileError(ValueError):
+    """Raised when the extra files of a submission are malformed or too large"""
+
+
+def normalize_submission_files(files: Optional[Dict[str, str]], entry_file: str,
+                               max_files: int = MAX_SUBMISSION_FILES,
+                               max_bytes: int = MAX_SUBMISSION_BYTES) -> Dict[str, bytes]:
+    """
+    Validate the extra files of a submission and encode them for the sandbox
+
+    Args:
+        files (Dict[str, str]): Relative POSIX paths (e.g. "utils.py", "include/grid.h") mapped
+            to file contents; None or empty for a single-file submission
+        entry_file (str): Name the compiler gives the main source, which may not be replaced
+        max_files (int): Maximum number of extra files
+        max_bytes (int): Maximum total size of the extra files, in bytes
+
+    Returns:
+        Dict[str, bytes]: The files keyed by normalized path, UTF-8 encoded
+
+    Raises:
+        SubmissionFileError: If a path is absolute, escapes the working directory or is
+            reserved, a path or content is not a string of valid Unicode, or the limits are exceeded
+    """
+    if not files:
+        return {}
+    if not isinstance(files, dict):
+        raise SubmissionFileError("'files' must be an object mapping file paths to contents")
+    if len(files) > max_files:
+        raise SubmissionFileError(f"Too many files ({len(files)}); the limit is {max_files}")
+
+    normalized = {}
+    total_bytes = 0
+    for name, content in files.items():
+        if not isinstance(name, str) or not isinstance(content, str):
+            raise SubmissionFileError("File paths and contents must be strings")
+        try:
+            name.encode('utf-8')
+            data = content.encode('utf-8')
+        except UnicodeEncodeError:
+            # JSON can carry unpaired surrogates ("\ud800"), which no UTF-8 file can hold
+            raise SubmissionFileError("File paths and contents must be valid Unicode text")
+        path = posixpath.normpath(name)
+        parts = path.split('/')
+        if not name or path.startswith('/') or '..' in parts or path == '.':
+            raise SubmissionFileError(f"Invalid file path '{name}': must be relative to the working directory")
+        if path == entry_file or parts[0] in RESERVED_NAMES or any(part.startswith(RESERVED_PREFIX) for part in parts):
+            raise SubmissionFileError(f"File path '{name}' is reserved")
+        if path in normalized:
+            raise SubmissionFileError(f"Duplicate file path '{name}'")
+        total_bytes += len(data)
+        normalized[path] = data
+
+    if total_bytes > max_bytes:
+        raise SubmissionFileError(f"Files total {total_bytes} bytes; the limit is {max_bytes}")
+    return normalized
+
+
+def files_with_suffix(files: Dict[str, bytes], suffixes: tuple) -> List[str]:
+    """Get the paths ending in one of the suffixes, in a stable order (e.g. extra C++ sources)"""
+    return sorted(path for path in files if path.endswith(suffixes))
@@ -0,0 +1,185 @@
+"""
+Phase Timing Module
+This module wraps sandbox commands so each step (compile, run) is timed inside the sandbox,
+and combines those step times with the backend's own phases into a per-result breakdown:
+setup, compile, run, capture and teardown.
+"""
+
+import shlex
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+from .container_pool import privilege_drop_lines
+from .execution_backend import ExecutionOutcome, INSTRUMENTATION_DIR
+from .resource_usage import USAGE_FILE, USAGE_NAME, snapshot_command
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# File the timed script appends "<step> <microseconds> <status>" lines to, outside the working
+# directory so the program cannot forge it in a container (on the local backend it can; see
+# LocalBackend); it is collected under this path
+TIMING_NAME = ".edurun-timing"
+TIMING_FILE = f"{INSTRUMENTATION_DIR}/{TIMING_NAME}"
+
+# Steps that execute the submitted program. In a container the script runs as root and these
+# run as the sandbox user (see container_pool.privilege_drop_lines), which cannot write
+# INSTRUMENTATION_DIR; compile steps only read the submission and keep root for the compiler caches.
+PROGRAM_STEPS = ('run',)
+
+# Files a timed script leaves behind; compilers collect these from the sandbox
+INSTRUMENTATION_FILES = [TIMING_FILE, USAGE_FILE]
+
+# Backend phases that happen before the command starts running
+SETUP_PHASES = ('acquire', 'create', 'copy', 'start')
+
+# Keys of a timing breakdown, in display order
+TIMING_KEYS = ('setup', 'compile', 'run', 'capture', 'teardown')
+
+
+def _step_command(name: str, command: str) -> str:
+    """Run a program step under $__as_sandbox when it is set"""
+    if name not in PROGRAM_STEPS:
+        return command
+    return f'if [ -n "$__as_sandbox" ]; then $__as_sandbox bash -c {shlex.quote(command)}; else\n{command}\nfi'
+
+
+def sandboxed_script(steps: Sequence[Tuple[str, str]]) -> str:
+    """
+    Build a bash script that runs steps in order like timed_script, without recording anything
+
+    Used for streamed runs; program steps still run as the sandbox user in a container.
+
+    Args:
+        steps: (name, shell command) pairs
+
+    Returns:
+        str: The script; it exits with the status of the last step that ran
+    """
+    lines = privilege_drop_lines() + ["__status=0"]
+    for name, command in steps:
+        lines += [_step_command(name, command), "__status=$?", "[ $__status -ne 0 ] && exit $__status"]
+    lines.append("exit $__status")
+    return "\n".join(lines)
+
+
+def timed_script(steps: Sequence[Tuple[str, str]], cgroup_stats: bool = False) -> str:
+    """
+    Build a bash script that runs steps in order, timing each one, and stops at the first failure
+
+    Uses bash's $EPOCHREALTIME so timing a step costs no extra process. Each step is also
+    bracketed by resource usage snapshots (see resource_usage.snapshot_command), taken
+    outside the timed window.
+
+    Records go to INSTRUMENTATION_DIR (EDURUN_META on the local backend). In a container,
+    program steps run unprivileged via `setpriv` so they cannot rewrite them; if the image
+    lacks `setpriv`, nothing is recorded rather than recording what the program could forge.
+    The local backend never drops privileges, so its records are advisory only.
+
+    Args:
+        steps: (name, shell command) pairs, e.g. [("compile", "g++ ..."), ("run", "./program")]
+        cgroup_stats (bool): Include the sandbox's cgroup counters in the usage snapshots
+
+    Returns:
+        str: The script; it exits with the status of the last step that ran
+    """
+    lines = ["__status=0", f"__meta=${{EDURUN_META:-{INSTRUMENTATION_DIR}}}"]
+    if any(name in PROGRAM_STEPS for name, _ in steps):
+        lines += privilege_drop_lines()
+        lines.append('[ -z "$EDURUN_META" ] && [ -z "$__as_sandbox" ] && __meta=')
+    lines += [
+        f'[ -n "$__meta" ] && mkdir -p -m 700 "$__meta" && : > "$__meta/{TIMING_NAME}" && : > "$__meta/{USAGE_NAME}"',
+        'export -n EDURUN_META',  # Not advertised to the program
+    ]
+    for name, command in steps:
+        lines += [
+            snapshot_command(name, 'before', cgroup_stats),
+            "__start=${EPOCHREALTIME/./}",
+            _step_command(name, command),
+            "__status=$?",
+            f'[ -n "$__meta" ] && echo {shlex.quote(name)} $(( ${{EPOCHREALTIME/./}} - __start )) $__status '
+            f'>> "$__meta/{TIMING_NAME}"',
+            snapshot_command(name, 'after', cgroup_stats),
+            "[ $__status -ne 0 ] && exit $__status",
+        ]
+    lines.append("exit $__status")
+    return "\n".join(lines)
+
+
+def parse_step_times(data: Optional[bytes]) -> Dict[str, Tuple[float, int]]:
+    """Parse the timing file into (seconds, exit status) per step; unreadable lines are skipped"""
+    steps = {}
+    for line in (data or b"").decode('utf-8', errors='replace').splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[1].isdigit() and parts[2].isdigit():
+            steps[parts[0]] = (int(parts[1]) / 1e6, int(parts[2]))
+    return steps
+
+
+def build_timings(outcome: ExecutionOutcome, steps: Sequence[str] = ('run',)) -> Dict[str, float]:
+    """
+    Break one sandbox run down into setup, compile, run, capture and teardown seconds
+
+    The backend's "run" phase covers everything between starting the command and its exit;
+    the steps timed inside the sandbox are carved out of it, and what remains (shell start-up,
+    draining output, reading files back) is reported as capture. A step that started but
+    never reported (e.g. killed at the timeout) is given the remainder of the run phase.
+
+    Args:
+        outcome (ExecutionOutcome): Outcome of a run made with timed_script and TIMING_FILE collected
+        steps (Sequence[str]): Step names the script ran, in order
+
+    Returns:
+        Dict[str, float]: Seconds per key in TIMING_KEYS
+    """
+    phases = outcome.phases
+    measured = parse_step_times(outcome.files.get(TIMING_FILE))
+    remaining = phases.get('run', 0.0)
+    timings = dict.fromkeys(TIMING_KEYS, 0.0)
+    for step in steps:
+        if step not in measured:
+            timings[step] += remaining
+            remaining = 0.0
+            break
+        seconds, status = measured[step]
+        timings[step] += seconds
+        remaining = max(0.0, remaining - seconds)
+        if status != 0:
+            break  # Later steps never ran
+    timings['setup'] = sum(phases.get(name, 0.0) for name in SETUP_PHASES)
+    timings['capture'] = remaining + phases.get('collect', 0.0)
+    timings['teardown'] = phases.get('teardown', 0.0)
+    return timings
+
+
+def merge_timings(*breakdowns: Dict[str, float]) -> Dict[str, float]:
+    """Add up the breakdowns of several sandbox runs that produced one result"""
+    merged = dict.fromkeys(TIMING_KEYS, 0.0)
+    for breakdown in breakdowns:
+        for key, seconds in breakdown.items():
+            merged[key] = merged.get(key, 0.0) + seconds
+    return merged
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as milliseconds below one second, else seconds"""
+    if seconds < 1:
+        return f"{seconds * 1000:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+def format_timings(timings: Dict[str, float]) -> List[str]:
+    """
+    Format a breakdown for the text output of format_*_compiler_output
+
+    Returns:
+        List[str]: Display lines, empty if there is no breakdown
+    """
+    if not timings:
+        return []
+    parts = [f"{key} {format_duration(timings[key])}" for key in TIMING_KEYS if timings.get(key)]
+    return [
+        f"Program Run Time: {format_duration(timings.get('run', 0.0))}",
+        f"Timing Breakdown: {', '.join(parts)}",
+    ]
@@ -6,7 +6,6 @@ Provides a command-line interface to compile and run Python code using Docker
 import argparse
 import sys
 from pathlib import Path
-from compilers.python_compiler_module import PythonDockerCompiler, format_compiler_output
 
 def read_code_from_file(file_path: str) -> str:
     """Read Python code from a file"""
@@ -20,8 +19,10 @@ def read_code_from_file(file_path: str) -> str:
         print(f"Error reading file '{file_path}': {e}")
         sys.exit(1)
 
-def interactive_mode(compiler: PythonDockerCompiler):
+def interactive_mode(compiler):
     """Interactive mode for entering Python code"""
+    from compilers.python_compiler_module import format_compiler_output
+    
     print("=== Interactive Python Compiler ===")
     print("Enter your Python code (press Ctrl+Z then Enter on Windows, or Ctrl+D on Unix to finish):")
     print()
@@ -91,6 +92,9 @@ Examples:
     
     args = parser.parse_args()
     
+    # Import the compiler (and the Docker SDK) only once the arguments are valid
+    from compilers.python_compiler_module import PythonDockerCompiler, format_compiler_output
+    
     # Initialize compiler
     try:
         compiler = PythonDockerCompiler(docker_image=args.image)